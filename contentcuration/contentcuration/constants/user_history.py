@@ -1,9 +1,13 @@
 DELETION = "soft-deletion"
 RECOVERY = "soft-recovery"
 RELATED_DATA_HARD_DELETION = "related-data-hard-deletion"
+CSV_EXPORT = "csv-export"
+CSV_EXPORT_DELETION = "csv-export-deletion"
 
 choices = (
     (DELETION, "User soft deletion"),
     (RECOVERY, "User soft deletion recovery"),
     (RELATED_DATA_HARD_DELETION, "User related data hard deletion"),
+    (CSV_EXPORT, "User data CSV export"),
+    (CSV_EXPORT_DELETION, "User data CSV export deletion"),
 )
@@ -1,9 +1,12 @@
 from django.db.models import BooleanField
 from django.db.models import F
+from django.db.models import JSONField
 from django.db.models import Q
 from django.db.models import Value
 from django.db.models.expressions import CombinedExpression
 from django.db.models.expressions import Func
+from django.db.models.functions import Cast
+from django.db.models.functions import Coalesce
 from django.db.models.sql.where import WhereNode
 
 
@@ -65,3 +68,27 @@ class Array(Func):
     template = "%(function)s[%(expressions)s]"
     arg_joiner = ", "
     arity = None
+
+
+def json_object_update(field_name, set_values, remove_keys=()):
+    """
+    Creates an expression that sets and removes keys of a JSONB object column, treating NULL as
+    an empty object, so that the same update can be applied to many rows in one UPDATE statement
+
+    Example:
+        json_object_update("my_field_name", {"a": True}, ["b"])
+        -> ((COALESCE(my_field_name, '{}'::jsonb) || '{"a": true}'::jsonb) - 'b')
+    """
+    expression = Coalesce(F(field_name), Cast(Value({}, JSONField()), JSONField()))
+    if set_values:
+        expression = CombinedExpression(
+            expression,
+            "||",
+            Cast(Value(set_values, JSONField()), JSONField()),
+            output_field=JSONField(),
+        )
+    for key in remove_keys:
+        expression = CombinedExpression(
+            expression, "-", Value(key), output_field=JSONField()
+        )
+    return expression
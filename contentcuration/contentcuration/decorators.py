@@ -1,3 +1,4 @@
+import threading
 from contextlib import ContextDecorator
 
 from django.conf import settings
@@ -67,30 +68,40 @@ def cache_no_user_data(view_func):
 class DelayUserStorageCalculation(ContextDecorator):
     """
     Decorator class that will dedupe and delay requests to enqueue storage calculation tasks for users
-    until after the wrapped function has exited
+    until after the wrapped function has exited. The requests are tracked per thread, so that
+    concurrent requests don't flush or drop each other's.
     """
 
-    depth = 0
-    queue = []
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def depth(self):
+        return getattr(self._local, "depth", 0)
+
+    @property
+    def queue(self):
+        if not hasattr(self._local, "queue"):
+            self._local.queue = set()
+        return self._local.queue
 
     @property
     def is_active(self):
         return self.depth > 0
 
     def add(self, user_id):
-        if user_id not in self.queue:
-            self.queue.append(user_id)
+        self.queue.add(user_id)
 
     def __enter__(self):
-        self.depth += 1
+        self._local.depth = self.depth + 1
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         from contentcuration.utils.user import calculate_user_storage
 
-        self.depth -= 1
+        self._local.depth = self.depth - 1
         if not self.is_active:
-            user_ids = set(self.queue)
-            self.queue = []
+            user_ids = self.queue
+            self._local.queue = set()
             for user_id in user_ids:
                 calculate_user_storage(user_id)
 
@@ -2272,23 +2272,26 @@ export const File = new Resource({
   tableName: TABLE_NAMES.FILE,
   urlName: 'file',
   indexFields: ['contentnode'],
-  uploadUrl({ checksum, size, type, name, file_format, preset, duration = null }) {
+  uploadUrls(files) {
     return client
-      .post(this.getUrlFunction('upload_url')(), {
-        checksum,
-        size,
-        type,
-        name,
-        file_format,
-        preset,
-        duration,
-      })
+      .post(
+        this.getUrlFunction('upload_urls')(),
+        files.map(({ checksum, size, type, name, file_format, preset, duration = null }) => ({
+          checksum,
+          size,
+          type,
+          name,
+          file_format,
+          preset,
+          duration,
+        })),
+      )
       .then(response => {
         if (!response) {
           return Promise.reject(fileErrors.UPLOAD_FAILED);
         }
         return this.transaction({ mode: 'rw' }, () => {
-          return this.table.put(response.data.file).then(() => {
+          return this.table.bulkPut(response.data.map(data => data.file)).then(() => {
             return response.data;
           });
         });
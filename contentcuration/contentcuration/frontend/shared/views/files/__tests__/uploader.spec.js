@@ -10,7 +10,7 @@ jest.mock('../../../vuex/file/validation', () => ({
 
 function makeWrapper(propsData = {}) {
   const handleFiles = jest.spyOn(Uploader.methods, 'handleFiles');
-  const uploadFile = jest.spyOn(Uploader.methods, 'uploadFile');
+  const uploadFiles = jest.spyOn(Uploader.methods, 'uploadFiles');
 
   const wrapper = mount(Uploader, {
     store: storeFactory(),
@@ -25,7 +25,7 @@ function makeWrapper(propsData = {}) {
     },
   });
 
-  return [wrapper, { handleFiles, uploadFile }];
+  return [wrapper, { handleFiles, uploadFiles }];
 }
 
 describe('uploader', () => {
@@ -34,7 +34,7 @@ describe('uploader', () => {
   afterEach(() => {
     wrapper && wrapper.destroy();
     mocks && mocks.handleFiles.mockRestore();
-    mocks && mocks.uploadFile.mockRestore();
+    mocks && mocks.uploadFiles.mockRestore();
   });
 
   describe('props', () => {
@@ -46,9 +46,9 @@ describe('uploader', () => {
 
     it('readonly should disable dropping files', async () => {
       [wrapper, mocks] = makeWrapper({ readonly: true });
-      mocks.uploadFile.mockImplementation(() => Promise.resolve());
+      mocks.uploadFiles.mockImplementation(() => Promise.resolve([]));
       await wrapper.vm.handleFiles([{ name: 'test.png' }]);
-      expect(mocks.uploadFile).not.toHaveBeenCalled();
+      expect(mocks.uploadFiles).not.toHaveBeenCalled();
     });
 
     it('readonly should not highlight dropzone', async () => {
@@ -162,6 +162,17 @@ describe('uploader', () => {
         await wrapper.vm.handleFiles(testFiles);
         expect(wrapper.vm.showStorageExceededAlert).toBe(true);
       });
+
+      it('should upload all the files together', async () => {
+        mocks.uploadFiles.mockImplementation(() => Promise.resolve([]));
+        const testFiles = [
+          { name: 'file.mp3', size: 10 },
+          { name: 'file.mp4', size: 10 },
+        ];
+        await wrapper.vm.handleFiles(testFiles);
+        expect(mocks.uploadFiles).toHaveBeenCalledTimes(1);
+        expect(mocks.uploadFiles.mock.calls[0][0].files).toEqual(testFiles);
+      });
     });
   });
 });
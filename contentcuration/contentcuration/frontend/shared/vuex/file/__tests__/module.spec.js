@@ -3,6 +3,7 @@ import { getH5PMetadata } from '../utils';
 import storeFactory from 'shared/vuex/baseStore';
 import { File, injectVuexStore } from 'shared/data/resources';
 import client from 'shared/client';
+import { fileErrors } from 'shared/constants';
 import { mockChannelScope, resetMockChannelScope } from 'shared/utils/testing';
 
 jest.mock('shared/vuex/connectionPlugin');
@@ -144,6 +145,54 @@ describe('file store', () => {
           client.post.mockRestore();
         });
       });
+
+      describe('uploadFiles', () => {
+        let files;
+        beforeEach(() => {
+          files = ['a', 'b'].map(
+            content =>
+              new global.File([content], `${content}.pdf`, { type: 'application/pdf' }),
+          );
+        });
+
+        it('should request the upload urls for all the files at once', async () => {
+          const uploadUrls = jest.spyOn(File, 'uploadUrls').mockImplementation(payloads =>
+            Promise.resolve(
+              payloads.map((payload, i) => ({
+                uploadURL: `url${i}`,
+                mimetype: 'application/pdf',
+                might_skip: false,
+                file: { id: `file${i}`, checksum: payload.checksum },
+              })),
+            ),
+          );
+          const uploads = await store.dispatch('file/uploadFiles', { files });
+          expect(uploadUrls).toHaveBeenCalledTimes(1);
+          expect(uploadUrls.mock.calls[0][0].map(payload => payload.name)).toEqual([
+            'a.pdf',
+            'b.pdf',
+          ]);
+          expect(uploads.map(upload => upload.fileObject.id)).toEqual(['file0', 'file1']);
+          await Promise.all(uploads.map(upload => upload.uploadPromise));
+          expect(client.put.mock.calls.map(call => call[0])).toEqual(['url0', 'url1']);
+          uploadUrls.mockRestore();
+        });
+
+        it('should fail all the files when there is not enough space', async () => {
+          const uploadUrls = jest
+            .spyOn(File, 'uploadUrls')
+            .mockImplementation(() => Promise.reject({ response: { status: 412 } }));
+          const uploads = await store.dispatch('file/uploadFiles', { files });
+          for (const upload of uploads) {
+            await expect(upload.uploadPromise).rejects.toBe(fileErrors.NO_STORAGE);
+          }
+          expect(uploads.map(upload => upload.fileObject.error)).toEqual([
+            fileErrors.NO_STORAGE,
+            fileErrors.NO_STORAGE,
+          ]);
+          uploadUrls.mockRestore();
+        });
+      });
     });
     describe('H5P content file extract metadata', () => {
       it('getH5PMetadata should check for h5p.json file', () => {
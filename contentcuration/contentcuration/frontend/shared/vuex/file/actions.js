@@ -1,3 +1,4 @@
+import chunk from 'lodash/chunk';
 import { cleanFile } from './clean';
 import { getHash, extractMetadata, storageUrl } from './utils';
 import { File } from 'shared/data/resources';
@@ -165,102 +166,159 @@ export function uploadFileToStorage(
     });
 }
 
+// The maximum number of files to request upload URLs for at once, the limit of the endpoint
+export const MAX_UPLOAD_URLS = 1000;
+
 /**
- * @return {Promise<{uploadPromise: Promise, fileObject: Object}>}
+ * Cleans, hashes and extracts the metadata of a file to upload
+ * @return {Promise<Object>} The upload, with an error set if it failed
  */
-export async function uploadFile(context, { file, preset = null } = {}) {
-  const file_format = file.name.split('.').pop().toLowerCase();
-  file = await cleanFile(file, preset);
-  const hashPromise = getHash(file).catch(() => Promise.reject(fileErrors.CHECKSUM_HASH_FAILED));
-  let checksum,
-    metadata = {};
-
-  return Promise.all([hashPromise, extractMetadata(file, preset)])
-    .then(([fileChecksum, fileMetadata]) => {
-      checksum = fileChecksum;
-      metadata = fileMetadata;
-
-      // 2. Get the upload url
-      return File.uploadUrl({
-        checksum,
-        size: file.size,
-        type: file.type,
-        name: file.name,
-        file_format,
-        ...metadata,
-      }).catch(error => {
-        let errorType = fileErrors.UPLOAD_FAILED;
-        if (error.response && error.response.status === 412) {
-          errorType = fileErrors.NO_STORAGE;
-        }
-        return Promise.reject(errorType);
-      }); // End get upload url
+function prepareUpload(file, preset) {
+  const upload = {
+    file,
+    file_format: file.name.split('.').pop().toLowerCase(),
+    checksum: undefined,
+    metadata: {},
+  };
+  return cleanFile(file, preset)
+    .then(cleanedFile => {
+      upload.file = cleanedFile;
+      const hashPromise = getHash(cleanedFile).catch(() =>
+        Promise.reject(fileErrors.CHECKSUM_HASH_FAILED),
+      );
+      return Promise.all([hashPromise, extractMetadata(cleanedFile, preset)]);
     })
-    .then(data => {
-      data.file.metadata = metadata;
-      const fileObject = {
-        ...data.file,
-        loaded: 0,
-        total: file.size,
-      };
-      context.commit('ADD_FILE', fileObject);
+    .then(([checksum, metadata]) => {
+      upload.checksum = checksum;
+      upload.metadata = metadata;
+      return upload;
+    })
+    .catch(error => {
+      upload.error = error;
+      return upload;
+    });
+}
 
-      // Asynchronously generate file preview
-      setTimeout(() => {
-        const reader = new FileReader();
-        reader.readAsDataURL(file);
-        reader.onloadend = () => {
-          if (reader.result) {
-            context.commit('ADD_FILE', {
-              id: data.file.id,
-              previewSrc: reader.result,
-            });
-          }
-        };
-      }, 0);
+/**
+ * Gets the upload urls for a batch of uploads with a single request
+ */
+function getUploadUrls(uploads) {
+  return File.uploadUrls(
+    uploads.map(({ file, file_format, checksum, metadata }) => ({
+      checksum,
+      size: file.size,
+      type: file.type,
+      name: file.name,
+      file_format,
+      ...metadata,
+    })),
+  ).catch(error => {
+    let errorType = fileErrors.UPLOAD_FAILED;
+    if (error.response && error.response.status === 412) {
+      errorType = fileErrors.NO_STORAGE;
+    }
+    return Promise.reject(errorType);
+  });
+}
 
-      // 3. Upload file
-      const uploadPromise = context
-        .dispatch('uploadFileToStorage', {
-          id: fileObject.id,
-          checksum,
-          file,
-          file_format,
-          url: data['uploadURL'],
-          contentType: data['mimetype'],
-          mightSkip: data['might_skip'],
-        })
-        .then(() => fileObject)
-        .catch(() => {
-          // Update vuex with failure
-          context.commit('ADD_FILE', {
-            id: fileObject.id,
-            loaded: 0,
-            error: fileErrors.UPLOAD_FAILED,
-          });
-          return Promise.reject(fileErrors.UPLOAD_FAILED);
+function startUpload(context, { file, file_format, checksum, metadata, data }) {
+  data.file.metadata = metadata;
+  const fileObject = {
+    ...data.file,
+    loaded: 0,
+    total: file.size,
+  };
+  context.commit('ADD_FILE', fileObject);
+
+  // Asynchronously generate file preview
+  setTimeout(() => {
+    const reader = new FileReader();
+    reader.readAsDataURL(file);
+    reader.onloadend = () => {
+      if (reader.result) {
+        context.commit('ADD_FILE', {
+          id: data.file.id,
+          previewSrc: reader.result,
         });
-      // End upload file
-      return { fileObject, uploadPromise };
-    })
-    .catch(error => {
-      // If error isn't one of defined error constants, raise it
-      if (!Object.values(fileErrors).includes(error)) {
-        throw error;
       }
-      const fileObject = {
-        checksum,
+    };
+  }, 0);
+
+  // 3. Upload file
+  const uploadPromise = context
+    .dispatch('uploadFileToStorage', {
+      id: fileObject.id,
+      checksum,
+      file,
+      file_format,
+      url: data['uploadURL'],
+      contentType: data['mimetype'],
+      mightSkip: data['might_skip'],
+    })
+    .then(() => fileObject)
+    .catch(() => {
+      // Update vuex with failure
+      context.commit('ADD_FILE', {
+        id: fileObject.id,
         loaded: 0,
-        total: file.size,
-        file_size: file.size,
-        original_filename: file.name,
-        file_format,
-        preset: metadata.preset,
-        error,
-      };
-      context.commit('ADD_FILE', fileObject);
-      return { fileObject, uploadPromise: Promise.reject(error) };
+        error: fileErrors.UPLOAD_FAILED,
+      });
+      return Promise.reject(fileErrors.UPLOAD_FAILED);
     });
+  // End upload file
+  return { fileObject, uploadPromise };
+}
+
+function failUpload(context, { file, file_format, checksum, metadata, error }) {
+  const fileObject = {
+    checksum,
+    loaded: 0,
+    total: file.size,
+    file_size: file.size,
+    original_filename: file.name,
+    file_format,
+    preset: metadata.preset,
+    error,
+  };
+  context.commit('ADD_FILE', fileObject);
+  return { fileObject, uploadPromise: Promise.reject(error) };
+}
+
+/**
+ * Uploads files, requesting the upload urls for all of them together, rather than one request
+ * per file, so that the space for the whole selection is checked at once.
+ * @return {Promise<Array<{uploadPromise: Promise, fileObject: Object}|null>>} The uploads in the
+ * same order as the files, null for any file that failed with an unexpected error
+ */
+export async function uploadFiles(context, { files, preset = null } = {}) {
+  // 1. Clean and hash the files
+  const uploads = await Promise.all([...files].map(file => prepareUpload(file, preset)));
+
+  // 2. Get the upload urls
+  const readyUploads = uploads.filter(upload => !upload.error);
+  for (const batch of chunk(readyUploads, MAX_UPLOAD_URLS)) {
+    try {
+      const data = await getUploadUrls(batch);
+      batch.forEach((upload, i) => {
+        upload.data = data[i];
+      });
+    } catch (error) {
+      for (const upload of batch) {
+        upload.error = error;
+      }
+    }
+  }
+
+  return uploads.map(upload => {
+    if (!upload.error) {
+      return startUpload(context, upload);
+    }
+    // If error isn't one of defined error constants, don't attempt to upload the file
+    if (!Object.values(fileErrors).includes(upload.error)) {
+      return null;
+    }
+    return failUpload(context, upload);
+  });
 }
 
 export function getAudioData(context, url) {
@@ -2,7 +2,10 @@
 
 - ContentNodes older than 2 weeks, whose parents are in the designated "garbage
 tree" (i.e. `settings.ORPHANAGE_ROOT_ID`). Also delete the associated Files in the
-database and in object storage.
+database, and in object storage when `--delete-storage-files` is passed.
+
+It also deletes users' data CSV exports from object storage once they are older than
+`settings.USER_CSV_EXPORT_RETENTION` days.
 """
 import logging as logmodule
 
@@ -14,16 +17,36 @@ from contentcuration.utils.garbage_collect import clean_up_feature_flags
 from contentcuration.utils.garbage_collect import clean_up_soft_deleted_users
 from contentcuration.utils.garbage_collect import clean_up_stale_files
 from contentcuration.utils.garbage_collect import clean_up_tasks
+from contentcuration.utils.garbage_collect import clean_up_user_csv_exports
 
 
 logging = logmodule.getLogger("command")
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            dest="dry_run",
+            default=False,
+            help="Report what would be deleted, and how many bytes reclaimed from storage, without deleting anything",
+        )
+        parser.add_argument(
+            "--delete-storage-files",
+            action="store_true",
+            dest="delete_storage_files",
+            default=False,
+            help="Permanently delete files of orphaned nodes from object storage, when they are not used by any other "
+            "file or published content",
+        )
+
     def handle(self, *args, **options):
         """
         Actual logic for garbage collection.
         """
+        if options["dry_run"]:
+            return self.handle_dry_run()
 
         # Clean up users that are soft deleted and are older than ACCOUNT_DELETION_BUFFER (90 days).
         # Also clean contentnodes, files and file objects on storage that are associated
@@ -34,7 +57,7 @@ class Command(BaseCommand):
         clean_up_soft_deleted_users()
 
         logging.info("Cleaning up contentnodes from the orphan tree")
-        clean_up_contentnodes()
+        clean_up_contentnodes(delete_storage_files=options["delete_storage_files"])
 
         logging.info("Cleaning up deleted chef nodes")
         clean_up_deleted_chefs()
@@ -47,3 +70,23 @@ class Command(BaseCommand):
 
         logging.info("Cleaning up tasks")
         clean_up_tasks()
+
+        logging.info("Cleaning up user data CSV exports")
+        clean_up_user_csv_exports()
+
+    def handle_dry_run(self):
+        logging.info("Dry run, nothing will be deleted")
+
+        logging.info(
+            "Skipping soft deleted users and feature flags, which cannot be reported on"
+        )
+
+        report = clean_up_contentnodes(dry_run=True)
+        logging.info("Would clean up from the orphan tree: {}".format(report))
+
+        report = clean_up_deleted_chefs(dry_run=True)
+        logging.info("Would clean up from the deleted chefs tree: {}".format(report))
+
+        clean_up_stale_files(dry_run=True)
+        clean_up_tasks(dry_run=True)
+        clean_up_user_csv_exports(dry_run=True)
@@ -1,17 +1,32 @@
 import logging as logmodule
 import subprocess
 import time
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
 
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
+from django.db.models import Case
+from django.db.models import IntegerField
+from django.db.models import Value
+from django.db.models import When
 
 from contentcuration.models import File
 from contentcuration.models import MEDIA_PRESETS
+from contentcuration.utils.storage_common import open_downloaded
 
 logging = logmodule.getLogger("command")
 
 
 CHUNKSIZE = 10000
 
+CHECKPOINT_KEY = "set_file_duration_last_checksum"
+
+
+def _parse_ffprobe_duration(result):
+    return int(float(result.decode("utf-8").strip()))
+
 
 def extract_duration_of_media(f_in, extension):  # noqa C901
     """
@@ -35,9 +50,8 @@ def extract_duration_of_media(f_in, extension):  # noqa C901
         ],
         stdin=f_in,
     )
-    result = result.decode("utf-8").strip()
     try:
-        return int(float(result))
+        return _parse_ffprobe_duration(result)
     except ValueError:
         # This can happen if ffprobe returns N/A for the duration
         # So instead we try to stream the entire file to get the value
@@ -75,7 +89,117 @@ def extract_duration_of_media(f_in, extension):  # noqa C901
         return (hours * 60 + minutes) * 60 + seconds
 
 
+def extract_duration_of_media_url(url, extension):
+    """
+    Probes the duration of media from a URL, letting ffprobe do HTTP range requests so that
+    normally only the container header (and index, if it is at the end of the file) is read.
+    :return: The duration in seconds, or None if it could not be determined from the header
+    """
+    result = subprocess.check_output(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            "-loglevel",
+            "panic",
+            "-f",
+            extension,
+            url,
+        ],
+        timeout=60,
+    )
+    try:
+        return _parse_ffprobe_duration(result)
+    except ValueError:
+        return None
+
+
+def get_duration(file_on_disk, extension, from_url=False):
+    """
+    :param file_on_disk: The storage name of the file
+    :param extension: The file extension, used as the ffprobe input format
+    :param from_url: Try probing the storage URL with range requests before downloading the file
+    """
+    if from_url:
+        try:
+            duration = extract_duration_of_media_url(
+                default_storage.url(file_on_disk), extension
+            )
+            if duration:
+                return duration
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            pass
+    # ffprobe reads the file from stdin, which needs a real file descriptor
+    with open_downloaded(file_on_disk) as f:
+        return extract_duration_of_media(f, extension)
+
+
+def bulk_set_durations(durations):
+    """
+    Sets the duration on all media files matching each checksum in one UPDATE.
+    :param durations: A dict of durations keyed by checksum
+    :return: The number of files updated
+    """
+    if not durations:
+        return 0
+    return File.objects.filter(
+        checksum__in=list(durations.keys()),
+        preset_id__in=MEDIA_PRESETS,
+        duration__isnull=True,
+    ).update(
+        duration=Case(
+            *[
+                When(checksum=checksum, then=Value(duration))
+                for checksum, duration in durations.items()
+            ],
+            output_field=IntegerField()
+        )
+    )
+
+
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            dest="workers",
+            default=1,
+            help="The number of files to probe concurrently",
+        )
+        parser.add_argument(
+            "--chunksize", type=int, dest="chunksize", default=CHUNKSIZE
+        )
+        parser.add_argument(
+            "--from-url",
+            action="store_true",
+            dest="from_url",
+            default=False,
+            help="Probe files through their storage URL with range requests, before falling back to a download",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            dest="restart",
+            default=False,
+            help="Ignore the checkpoint left by an interrupted run",
+        )
+
+    def _probe(self, file, from_url):
+        try:
+            return get_duration(
+                file["file_on_disk"], file["file_format_id"], from_url=from_url
+            )
+        except FileNotFoundError:
+            logging.warning("File {} not found".format(file["file_on_disk"]))
+        except (subprocess.CalledProcessError, RuntimeError):
+            logging.warning(
+                "File {} could not be read for duration".format(file["file_on_disk"])
+            )
+
     def handle(self, *args, **options):
         start = time.time()
 
@@ -83,42 +207,62 @@ class Command(BaseCommand):
             "Setting default duration for media presets: {}".format(MEDIA_PRESETS)
         )
 
-        excluded_files = set()
+        if options["restart"]:
+            cache.delete(CHECKPOINT_KEY)
+        last_checksum = cache.get(CHECKPOINT_KEY)
+        if last_checksum is not None:
+            logging.info("Resuming after checksum {}".format(last_checksum))
 
-        null_duration = File.objects.filter(
-            preset_id__in=MEDIA_PRESETS, duration__isnull=True
+        # Files with the same checksum have the same duration, so only probe one of them
+        null_duration = (
+            File.objects.filter(preset_id__in=MEDIA_PRESETS, duration__isnull=True)
+            .exclude(file_on_disk="")
+            .order_by("checksum")
+            .distinct("checksum")
+            .values("checksum", "file_on_disk", "file_format_id")
         )
-        null_duration_count = null_duration.count()
+
         updated_count = 0
+        probed_count = 0
 
-        i = 0
-
-        while i < null_duration_count:
-            for file in null_duration[i : i + CHUNKSIZE]:
-                if file.file_on_disk.name in excluded_files:
-                    continue
-                file.refresh_from_db()
-                if file.duration is not None:
-                    continue
-                try:
-                    with file.file_on_disk.open() as f:
-                        duration = extract_duration_of_media(
-                            f, file.file_format.extension
-                        )
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                chunk_queryset = null_duration
+                if last_checksum is not None:
+                    chunk_queryset = chunk_queryset.filter(checksum__gt=last_checksum)
+                chunk = list(chunk_queryset[: options["chunksize"]])
+                if not chunk:
+                    break
+
+                chunk_start = time.time()
+                futures = {
+                    executor.submit(self._probe, file, options["from_url"]): file
+                    for file in chunk
+                }
+                durations = {}
+                for future in as_completed(futures):
+                    duration = future.result()
                     if duration:
-                        updated_count += File.objects.filter(
-                            checksum=file.checksum, preset_id__in=MEDIA_PRESETS
-                        ).update(duration=duration)
-                except FileNotFoundError:
-                    logging.warning("File {} not found".format(file))
-                    excluded_files.add(file.file_on_disk.name)
-                except (subprocess.CalledProcessError, RuntimeError):
-                    logging.warning(
-                        "File {} could not be read for duration".format(file)
+                        durations[futures[future]["checksum"]] = duration
+
+                updated_count += bulk_set_durations(durations)
+                probed_count += len(chunk)
+                last_checksum = chunk[-1]["checksum"]
+                cache.set(CHECKPOINT_KEY, last_checksum, None)
+
+                elapsed = time.time() - start
+                logging.info(
+                    "Probed {} checksums in {:.1f} seconds ({:.2f} per second overall), "
+                    "found {} durations, updated {} files in total".format(
+                        len(chunk),
+                        time.time() - chunk_start,
+                        probed_count / elapsed if elapsed else 0,
+                        len(durations),
+                        updated_count,
                     )
-                    excluded_files.add(file.file_on_disk.name)
+                )
 
-            i += CHUNKSIZE
+        cache.delete(CHECKPOINT_KEY)
 
         logging.info(
             "Finished setting all null duration for {} files in {} seconds".format(
@@ -0,0 +1,22 @@
+from contentcuration.utils.profiling import profile
+
+
+class QueryProfilerMiddleware(object):
+    """
+    Profiles the queries, cache lookups and time spent handling each request, aggregating them per view
+    in Redis. Only enabled when the QUERY_PROFILER_ENABLED environment variable is set.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profile("{} unresolved".format(request.method)) as query_profile:
+            response = self.get_response(request)
+            # the view is only known once the request has been resolved
+            resolver_match = getattr(request, "resolver_match", None)
+            if resolver_match is not None:
+                query_profile.name = "{} {}".format(
+                    request.method, resolver_match.view_name
+                )
+        return response
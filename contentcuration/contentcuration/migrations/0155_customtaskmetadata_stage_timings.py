@@ -0,0 +1,18 @@
+# Generated by Django 3.2.24 on 2026-10-18 22:52
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contentcuration", "0154_alter_assessmentitem_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customtaskmetadata",
+            name="stage_timings",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.24 on 2026-10-19 01:22
+from django.db import migrations
+from django.db import models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contentcuration", "0155_customtaskmetadata_stage_timings"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userhistory",
+            name="action",
+            field=models.CharField(
+                choices=[
+                    ("soft-deletion", "User soft deletion"),
+                    ("soft-recovery", "User soft deletion recovery"),
+                    ("related-data-hard-deletion", "User related data hard deletion"),
+                    ("csv-export", "User data CSV export"),
+                    ("csv-export-deletion", "User data CSV export deletion"),
+                ],
+                max_length=32,
+            ),
+        ),
+    ]
@@ -76,6 +76,8 @@ from contentcuration.db.models.functions import Unnest
 from contentcuration.db.models.manager import CustomContentNodeTreeManager
 from contentcuration.db.models.manager import CustomManager
 from contentcuration.utils.cache import delete_public_channel_cache_keys
+from contentcuration.utils.cache import get_details_revision
+from contentcuration.utils.cache import UserStorageCache
 from contentcuration.utils.parser import load_json_string
 from contentcuration.viewsets.sync.constants import ALL_CHANGES
 from contentcuration.viewsets.sync.constants import ALL_TABLES
@@ -329,15 +331,74 @@ class User(AbstractBaseUser, PermissionsMixin):
         )
 
     def check_space(self, size, checksum):
+        """
+        Checks the user has space to upload a file, reserving the space for it if so.
+        See `check_files_space`.
+        """
+        return self.check_files_space({checksum: size})
+
+    def check_files_space(self, sizes):
+        """
+        Checks the user has space to upload files, reserving the space for them if so.
+
+        Rather than recalculating the storage used, this checks against the stored
+        `disk_space_used` plus the space reserved by uploads of files that aren't yet among
+        the user's active files, and the cached checksums of the user's active files.
+
+        :param sizes: A dict of file sizes keyed by checksum
+        :return: True if all the files are already among the user's active files
+        :raises: PermissionDenied if the user doesn't have enough space
+        """
+        from contentcuration.utils.user import calculate_user_storage
+
         if self.is_admin:
             return True
 
+        storage_cache = UserStorageCache(self.pk)
+        if storage_cache.redis_client is None:
+            return self._check_files_space_from_files(sizes)
+
+        checksums = list(sizes.keys())
+        existing_checksums = storage_cache.get_cached_checksums(checksums)
+        if existing_checksums is None:
+            # the checksums aren't cached, so recalculate in the background to cache them
+            existing_checksums = set(
+                self.get_user_active_files()
+                .filter(checksum__in=checksums)
+                .values_list("checksum", flat=True)
+            )
+            calculate_user_storage(self.pk)
+
+        new_sizes = {
+            checksum: size
+            for checksum, size in sizes.items()
+            if checksum not in existing_checksums
+        }
+        if not new_sizes:
+            return True
+
+        if not storage_cache.reserve(new_sizes, self.disk_space - self.disk_space_used):
+            raise PermissionDenied(
+                _("Not enough space. Check your storage under Settings page.")
+            )
+
+    def _check_files_space_from_files(self, sizes):
         active_files = self.get_user_active_files()
-        if active_files.filter(checksum=checksum).exists():
+        existing_checksums = set(
+            active_files.filter(checksum__in=list(sizes.keys())).values_list(
+                "checksum", flat=True
+            )
+        )
+        new_size = sum(
+            size
+            for checksum, size in sizes.items()
+            if checksum not in existing_checksums
+        )
+        if len(existing_checksums) == len(sizes):
             return True
 
         space = self.get_available_space(active_files=active_files)
-        if space < size:
+        if space < new_size:
             raise PermissionDenied(
                 _("Not enough space. Check your storage under Settings page.")
             )
@@ -419,13 +480,30 @@ class User(AbstractBaseUser, PermissionsMixin):
         )
 
     def get_space_used(self, active_files=None):
-        active_files = active_files or self.get_user_active_files()
+        if active_files is None:
+            active_files = self.get_user_active_files()
         files = active_files.aggregate(total_used=Sum("file_size"))
         return float(files["total_used"] or 0)
 
     def set_space_used(self):
-        self.disk_space_used = self.get_space_used()
+        active_files = self.get_user_active_files()
+        self.disk_space_used = self.get_space_used(active_files=active_files)
         self.save()
+
+        storage_cache = UserStorageCache(self.pk)
+        if storage_cache.has_cached_checksums() is False:
+            storage_cache.reset(active_files.values_list("checksum", flat=True))
+        else:
+            # Only files that had space reserved for their upload need to be added to the cached
+            # checksums, rather than fetching all of the user's checksums again. Checksums of files
+            # that are no longer active are dropped when the cached checksums expire.
+            reserved_checksums = storage_cache.get_reserved_checksums()
+            if reserved_checksums:
+                storage_cache.activate(
+                    active_files.filter(checksum__in=reserved_checksums).values_list(
+                        "checksum", flat=True
+                    )
+                )
         return self.disk_space_used
 
     def get_space_used_by_kind(self):
@@ -1512,6 +1590,82 @@ NODE_MODIFIED_DESC_INDEX_NAME = "node_modified_desc_idx"
 CONTENTNODE_TREE_ID_CACHE_KEY = "contentnode_{pk}__tree_id"
 
 
+# Filter for assessment items that are complete enough for their exercise to be complete:
+COMPLETE_ASSESSMENT_ITEM_Q = (
+    # Item with non-blank raw data
+    ~Q(raw_data="")
+    | (
+        # A non-blank question
+        ~Q(question="")
+        # Non-blank answers, unless it is a free response question
+        # (which is allowed to have no answers)
+        & (~Q(answers="[]") | Q(type=exercises.FREE_RESPONSE))
+        # With either an input or free response question or one answer marked as correct
+        & (
+            Q(type=exercises.INPUT_QUESTION)
+            | Q(type=exercises.FREE_RESPONSE)
+            | Q(answers__iregex=r'"correct":\s*true')
+        )
+    )
+)
+
+
+def get_completion_errors(  # noqa C901
+    node, license, has_default_file, has_complete_assessment_item
+):
+    """
+    Evaluate the completeness rules for a single content node.
+    The file and assessment item checks are passed as callables so that they are
+    only evaluated when the node kind requires them.
+    :param node: Object with title, parent_id, kind_id, license_description,
+    copyright_holder and extra_fields attributes
+    :param license: The License of the node, or None
+    :param has_default_file: Callable returning whether the node has a non-supplementary file
+    :param has_complete_assessment_item: Callable returning whether the node has
+    an assessment item matching COMPLETE_ASSESSMENT_ITEM_Q
+    :return: A list of error strings, empty if the node is complete
+    """
+    errors = []
+    # Is complete if title is falsy but only if not a root node.
+    if not (bool(node.title) or node.parent_id is None):
+        errors.append("Empty title")
+    if node.kind_id != content_kinds.TOPIC:
+        if not license:
+            errors.append("Missing license")
+        if license and license.is_custom and not node.license_description:
+            errors.append("Missing license description for custom license")
+        if license and license.copyright_holder_required and not node.copyright_holder:
+            errors.append("Missing required copyright holder")
+        if node.kind_id != content_kinds.EXERCISE and not has_default_file():
+            errors.append("Missing default file")
+        if node.kind_id == content_kinds.EXERCISE:
+            # Check to see if the exercise has at least one assessment item that has:
+            if not has_complete_assessment_item():
+                errors.append("No questions with question text and complete answers")
+            # Check that it has a mastery model set
+            # Either check for the previous location for the mastery model, or rely on our completion criteria validation
+            # that if it has been set, then it has been set correctly.
+            extra_fields = node.extra_fields or {}
+            criterion = extra_fields.get("options", {}).get("completion_criteria")
+            if not (extra_fields.get("mastery_model") or criterion):
+                errors.append("Missing mastery criterion")
+            if criterion:
+                try:
+                    completion_criteria.validate(criterion, kind=content_kinds.EXERCISE)
+                except completion_criteria.ValidationError:
+                    errors.append("Mastery criterion is defined but is invalid")
+        else:
+            criterion = node.extra_fields and node.extra_fields.get("options", {}).get(
+                "completion_criteria", {}
+            )
+            if criterion:
+                try:
+                    completion_criteria.validate(criterion, kind=node.kind_id)
+                except completion_criteria.ValidationError:
+                    errors.append("Completion criterion is defined but is invalid")
+    return errors
+
+
 class ContentNode(MPTTModel, models.Model):
     """
     By default, all nodes have a title and can be used as a topic.
@@ -1965,8 +2119,13 @@ class ContentNode(MPTTModel, models.Model):
         if not channel:
             channel = self.get_channel()
 
+        # Read the revision before calculating, so that changes applied during the calculation
+        # still mark the details as outdated
+        revision = get_details_revision(channel.id) if channel else None
+
         if not resources.exists():
             data = {
+                "revision": revision,
                 "last_update": pytz.utc.localize(datetime.now()).strftime(
                     settings.DATE_TIME_FORMAT
                 ),
@@ -2188,6 +2347,7 @@ class ContentNode(MPTTModel, models.Model):
         }
         # Serialize data
         data = {
+            "revision": revision,
             "last_update": pytz.utc.localize(datetime.now()).strftime(
                 settings.DATE_TIME_FORMAT
             ),
@@ -2239,73 +2399,13 @@ class ContentNode(MPTTModel, models.Model):
         for editor in self.files.values_list("uploaded_by_id", flat=True).distinct():
             calculate_user_storage(editor)
 
-    def mark_complete(self):  # noqa C901
-        errors = []
-        # Is complete if title is falsy but only if not a root node.
-        if not (bool(self.title) or self.parent_id is None):
-            errors.append("Empty title")
-        if self.kind_id != content_kinds.TOPIC:
-            if not self.license:
-                errors.append("Missing license")
-            if self.license and self.license.is_custom and not self.license_description:
-                errors.append("Missing license description for custom license")
-            if (
-                self.license
-                and self.license.copyright_holder_required
-                and not self.copyright_holder
-            ):
-                errors.append("Missing required copyright holder")
-            if (
-                self.kind_id != content_kinds.EXERCISE
-                and not self.files.filter(preset__supplementary=False).exists()
-            ):
-                errors.append("Missing default file")
-            if self.kind_id == content_kinds.EXERCISE:
-                # Check to see if the exercise has at least one assessment item that has:
-                if not self.assessment_items.filter(
-                    # Item with non-blank raw data
-                    ~Q(raw_data="")
-                    | (
-                        # A non-blank question
-                        ~Q(question="")
-                        # Non-blank answers, unless it is a free response question
-                        # (which is allowed to have no answers)
-                        & (~Q(answers="[]") | Q(type=exercises.FREE_RESPONSE))
-                        # With either an input or free response question or one answer marked as correct
-                        & (
-                            Q(type=exercises.INPUT_QUESTION)
-                            | Q(type=exercises.FREE_RESPONSE)
-                            | Q(answers__iregex=r'"correct":\s*true')
-                        )
-                    )
-                ).exists():
-                    errors.append(
-                        "No questions with question text and complete answers"
-                    )
-                # Check that it has a mastery model set
-                # Either check for the previous location for the mastery model, or rely on our completion criteria validation
-                # that if it has been set, then it has been set correctly.
-                criterion = self.extra_fields.get("options", {}).get(
-                    "completion_criteria"
-                )
-                if not (self.extra_fields.get("mastery_model") or criterion):
-                    errors.append("Missing mastery criterion")
-                if criterion:
-                    try:
-                        completion_criteria.validate(
-                            criterion, kind=content_kinds.EXERCISE
-                        )
-                    except completion_criteria.ValidationError:
-                        errors.append("Mastery criterion is defined but is invalid")
-            else:
-                criterion = self.extra_fields and self.extra_fields.get(
-                    "options", {}
-                ).get("completion_criteria", {})
-                if criterion:
-                    try:
-                        completion_criteria.validate(criterion, kind=self.kind_id)
-                    except completion_criteria.ValidationError:
-                        errors.append("Completion criterion is defined but is invalid")
+    def mark_complete(self):
+        errors = get_completion_errors(
+            self,
+            self.license,
+            lambda: self.files.filter(preset__supplementary=False).exists(),
+            lambda: self.assessment_items.filter(COMPLETE_ASSESSMENT_ITEM_Q).exists(),
+        )
         self.complete = not errors
         return errors
 
@@ -3290,6 +3390,8 @@ class CustomTaskMetadata(models.Model):
     progress = models.IntegerField(
         null=True, blank=True, validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
+    # Seconds taken by each completed stage of the task, keyed by stage name
+    stage_timings = JSONField(null=True, blank=True)
     # A hash of the task name and kwargs for identifying repeat tasks
     signature = models.CharField(null=True, blank=False, max_length=32)
     date_created = models.DateTimeField(
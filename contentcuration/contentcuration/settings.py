@@ -147,6 +147,14 @@ if os.getenv("GCLOUD_ERROR_REPORTING"):
         "contentcuration.middleware.error_reporting.ErrorReportingMiddleware",
     ) + MIDDLEWARE
 
+# Opt-in profiling of queries per view and task, viewable by admins at /api/query_profiles/
+QUERY_PROFILER_ENABLED = bool(os.getenv("QUERY_PROFILER_ENABLED"))
+
+if QUERY_PROFILER_ENABLED:
+    MIDDLEWARE = (
+        "contentcuration.middleware.query_profiler.QueryProfilerMiddleware",
+    ) + MIDDLEWARE
+
 SUPPORTED_BROWSERS = [
     "Chrome",
     "Firefox",
@@ -318,6 +326,10 @@ POLICY_EMAIL = "legal@learningequality.org"
 # has to undo accidentally deleting account.
 ACCOUNT_DELETION_BUFFER = 90
 
+# Used to determine how many days a user's data
+# CSV export is kept in storage to be downloaded.
+USER_CSV_EXPORT_RETENTION = 7
+
 DEFAULT_LICENSE = 1
 
 SERVER_EMAIL = "curation-errors@learningequality.org"
@@ -374,6 +386,14 @@ GCS_STORAGE_SERVICE_ACCOUNT_KEY_PATH = os.getenv(
     "GOOGLE_CLOUD_STORAGE_SERVICE_ACCOUNT_CREDENTIALS"
 )
 
+# content databases are gzipped as they are streamed to GCS, in chunks of this many bytes,
+# which must be a multiple of 256KB
+GCS_DATABASE_UPLOAD_CHUNK_SIZE = int(
+    os.getenv("GCS_DATABASE_UPLOAD_CHUNK_SIZE") or 8 * 1024 * 1024
+)
+# the gzip compression level, from 1 (fastest) to 9 (smallest), for content databases
+GCS_DATABASE_COMPRESSION_LEVEL = int(os.getenv("GCS_DATABASE_COMPRESSION_LEVEL") or 9)
+
 # GOOGLE DRIVE SETTINGS
 GOOGLE_AUTH_JSON = "credentials/client_secret.json"
 GOOGLE_STORAGE_REQUEST_SHEET = "16X6zcFK8FS5t5tFaGpnxbWnWTXP88h4ccpSpPbyLeA8"
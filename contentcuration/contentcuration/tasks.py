@@ -5,18 +5,31 @@ the tasks.
 """
 import logging
 import time
+from smtplib import SMTPException
 
 from celery.utils.log import get_task_logger
 from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.cache import cache
 from django.core.mail import EmailMessage
+from django.core.mail import get_connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.template.loader import get_template
 from django.template.loader import render_to_string
 from django.utils.translation import override
+from postmark.core import PMMailInactiveRecipientException
+from postmark.core import PMMailServerErrorException
+from postmark.core import PMMailUnauthorizedException
+from postmark.core import PMMailURLException
 
 from contentcuration.celery import app
 from contentcuration.models import Change
 from contentcuration.models import ContentNode
+from contentcuration.models import CustomTaskMetadata
 from contentcuration.models import User
-from contentcuration.utils.csv_writer import write_user_csv
+from contentcuration.utils.cache import PendingUserStorageCache
+from contentcuration.utils.csv_writer import write_user_csv_to_storage
 from contentcuration.utils.nodes import calculate_resource_size
 from contentcuration.utils.nodes import generate_diff
 from contentcuration.viewsets.user import AdminUserFilter
@@ -24,6 +37,17 @@ from contentcuration.viewsets.user import AdminUserFilter
 
 logger = get_task_logger(__name__)
 
+# custom emails are sent by subtasks to batches of this many recipients, over one connection each
+CUSTOM_EMAIL_BATCH_SIZE = 200
+# the rate at which each worker starts sending batches, to stay within the limits of the email service
+CUSTOM_EMAIL_BATCH_RATE_LIMIT = "30/m"
+CUSTOM_EMAIL_BATCH_MAX_RETRIES = 5
+# the delay in seconds before the first retry of a batch, which doubles with each retry
+CUSTOM_EMAIL_BATCH_RETRY_DELAY = 60
+# the number of recipients sent to so far, counted by the batches to report the progress of the fan out task
+CUSTOM_EMAIL_SENT_CACHE_KEY = "custom_email:{task_id}:sent"
+CUSTOM_EMAIL_SENT_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 @app.task(bind=True, name="apply_user_changes")
 def apply_user_changes_task(self, user_id):
@@ -81,7 +105,7 @@ class CustomEmailMessage(EmailMessage):
 def generateusercsv_task(user_id, language=settings.LANGUAGE_CODE):
     with override(language):
         user = User.objects.get(pk=user_id)
-        csv_path = write_user_csv(user)
+        write_user_csv_to_storage(user)
         subject = render_to_string("export/user_csv_email_subject.txt", {})
         subject = "".join(subject.splitlines())
         message = render_to_string(
@@ -89,8 +113,10 @@ def generateusercsv_task(user_id, language=settings.LANGUAGE_CODE):
             {
                 "legal_email": settings.POLICY_EMAIL,
                 "user": user,
+                "domain": "https://{}".format(Site.objects.get_current().domain),
                 "edit_channels": user.editable_channels.values("name", "id"),
                 "view_channels": user.view_only_channels.values("name", "id"),
+                "retention_days": settings.USER_CSV_EXPORT_RETENTION,
             },
         )
 
@@ -98,7 +124,6 @@ def generateusercsv_task(user_id, language=settings.LANGUAGE_CODE):
             subject, message, settings.DEFAULT_FROM_EMAIL, [user.email]
         )
         email.encoding = "utf-8"
-        email.attach_file(csv_path, mimetype="text/csv")
 
         email.send()
 
@@ -132,6 +157,17 @@ def calculate_user_storage_task(user_id):
         )
 
 
+@app.task(name="calculate_pending_user_storage_task")
+def calculate_pending_user_storage_task():
+    """
+    Recalculates the storage used by the users pending recalculation,
+    which is scheduled by `calculate_user_storage` at most once per interval
+    """
+    user_ids = PendingUserStorageCache().pop()
+    for user in User.objects.filter(pk__in=user_ids, is_admin=False):
+        user.set_space_used()
+
+
 @app.task(name="calculate_resource_size_task")
 def calculate_resource_size_task(node_id, channel_id):
     node = ContentNode.objects.get(pk=node_id)
@@ -139,23 +175,141 @@ def calculate_resource_size_task(node_id, channel_id):
     return size
 
 
-@app.task(name="sendcustomemails_task")
-def sendcustomemails_task(subject, message, query):
+@app.task(bind=True, name="sendcustomemails_task")
+def sendcustomemails_task(self, subject, message, query):
+    """
+    Fans out sending a custom email to the users matching the query, paging through them by
+    primary key and enqueuing a subtask for each batch of recipients. The batches report the
+    progress of this task as they send the emails
+
+    :type self: contentcuration.utils.celery.tasks.CeleryTask
+    """
     subject = render_to_string(
         "registration/custom_email_subject.txt", {"subject": subject}
     )
     subject = "".join(subject.splitlines())
-    recipients = AdminUserFilter(data=query).qs.distinct()
+    recipients = (
+        AdminUserFilter(data=query)
+        .qs.distinct()
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
 
-    for recipient in recipients:
-        text = message.format(
-            current_date=time.strftime("%A, %B %d"),
-            current_time=time.strftime("%H:%M %Z"),
-            **recipient.__dict__
+    task_metadata = CustomTaskMetadata.objects.get(task_id=self.request.id)
+    total = recipients.count()
+    cache.set(
+        CUSTOM_EMAIL_SENT_CACHE_KEY.format(task_id=self.request.id),
+        0,
+        CUSTOM_EMAIL_SENT_CACHE_TIMEOUT,
+    )
+
+    recipient_ids = list(recipients[:CUSTOM_EMAIL_BATCH_SIZE])
+    while recipient_ids:
+        sendcustomemailsbatch_task.enqueue(
+            task_metadata.user,
+            subject=subject,
+            message=message,
+            recipient_ids=recipient_ids,
+            progress_task_id=self.request.id,
+            total=total,
         )
-        text = render_to_string("registration/custom_email.txt", {"message": text})
-        recipient.email_user(
-            subject,
-            text,
-            settings.DEFAULT_FROM_EMAIL,
+        recipient_ids = list(
+            recipients.filter(pk__gt=recipient_ids[-1])[:CUSTOM_EMAIL_BATCH_SIZE]
         )
+
+
+@app.task(
+    bind=True,
+    name="sendcustomemailsbatch_task",
+    rate_limit=CUSTOM_EMAIL_BATCH_RATE_LIMIT,
+    max_retries=CUSTOM_EMAIL_BATCH_MAX_RETRIES,
+)
+def sendcustomemailsbatch_task(
+    self, subject, message, recipient_ids, progress_task_id=None, total=None
+):
+    """
+    Sends a custom email to a batch of recipients over a single connection, retrying with
+    those that haven't been sent to yet if sending fails
+
+    :type self: contentcuration.utils.celery.tasks.CeleryTask
+    :param recipient_ids: The ids of the recipients, in ascending order
+    :param progress_task_id: The id of the fan out task, whose progress to report
+    :param total: The total number of recipients of the fan out task
+    """
+    template = get_template("registration/custom_email.txt")
+    current_date = time.strftime("%A, %B %d")
+    current_time = time.strftime("%H:%M %Z")
+
+    # the number of recipients this attempt is done with, whether or not the email could be delivered
+    done = 0
+    # the id of the last recipient this attempt is done with, so that a retry starts after it
+    last_done_pk = None
+    try:
+        # the connection is opened within the retried block, as the SMTP backend opens it on entry
+        with get_connection() as connection:
+            for recipient in User.objects.filter(pk__in=recipient_ids).order_by("pk"):
+                text = message.format(
+                    current_date=current_date,
+                    current_time=current_time,
+                    **recipient.__dict__
+                )
+                email = EmailMessage(
+                    subject,
+                    template.render({"message": text}),
+                    settings.DEFAULT_FROM_EMAIL,
+                    [recipient.email],
+                    connection=connection,
+                )
+                try:
+                    email.send()
+                except (
+                    PMMailInactiveRecipientException,
+                    PMMailUnauthorizedException,
+                ) as e:
+                    logging.error(str(e))
+                last_done_pk = recipient.pk
+        # recipients that no longer exist are done with as well
+        done = len(recipient_ids)
+    except (
+        SMTPException,
+        OSError,
+        PMMailServerErrorException,
+        PMMailURLException,
+    ) as e:
+        unsent_ids = [
+            pk for pk in recipient_ids if last_done_pk is None or pk > last_done_pk
+        ]
+        done = len(recipient_ids) - len(unsent_ids)
+        if unsent_ids:
+            raise self.retry(
+                exc=e,
+                countdown=CUSTOM_EMAIL_BATCH_RETRY_DELAY * 2 ** self.request.retries,
+                kwargs={
+                    "subject": subject,
+                    "message": message,
+                    "recipient_ids": unsent_ids,
+                    "progress_task_id": progress_task_id,
+                    "total": total,
+                },
+            )
+        # every email was sent before closing the connection failed
+        logging.error(str(e))
+    finally:
+        _report_custom_email_progress(progress_task_id, total, done)
+
+
+def _report_custom_email_progress(task_id, total, done):
+    """
+    Adds the recipients a batch is done with to those of the fan out task, and updates its progress
+    """
+    if not task_id or not total or not done:
+        return
+    try:
+        count = cache.incr(CUSTOM_EMAIL_SENT_CACHE_KEY.format(task_id=task_id), done)
+    except ValueError:
+        # the count has expired, so the progress can no longer be reported
+        return
+    # batches can finish concurrently, so never move the progress backwards
+    CustomTaskMetadata.objects.filter(task_id=task_id).update(
+        progress=Greatest(F("progress"), min(100 * count // total, 100))
+    )
@@ -1,7 +1,11 @@
+from contextlib import contextmanager
 from importlib import import_module
 
 import mock
 from celery import states
+from django.db import connections
+from django.db import DEFAULT_DB_ALIAS
+from django.test.utils import CaptureQueriesContext
 from django_celery_results.models import TaskResult
 from search.models import ContentNodeFullTextSearch
 
@@ -15,6 +19,7 @@ def clear_tasks(except_task_id=None):
     :param except_task_id: A task to exclude from revocation
     """
     from contentcuration.celery import app
+    from contentcuration.utils.cache import delete_cache_keys
 
     # remove any other tasks
     qs = TaskResult.objects.all()
@@ -23,6 +28,7 @@ def clear_tasks(except_task_id=None):
     for task_id in qs.values_list("task_id", flat=True):
         app.control.revoke(task_id, terminate=True)
     qs.update(status=states.REVOKED)
+    delete_cache_keys("task_signature:*")
 
 
 def mock_class_instance(target):
@@ -53,3 +59,30 @@ def mock_class_instance(target):
             return mock.Mock(spec_set=cls)
 
     return MockClass()
+
+
+@contextmanager
+def assert_query_budget(test_case, budget, using=DEFAULT_DB_ALIAS):
+    """
+    Asserts that the body runs at most `budget` queries, so that N+1 query regressions fail tests.
+    Unlike `assertNumQueries`, the budget can be set with some headroom over the current count.
+
+    :param test_case: The TestCase making the assertion
+    :param budget: The maximum number of queries allowed
+    :param using: The database alias to capture queries on
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    executed = len(context)
+    test_case.assertLessEqual(
+        executed,
+        budget,
+        "{} queries executed, over the budget of {}\nCaptured queries were:\n{}".format(
+            executed,
+            budget,
+            "\n".join(
+                "{}. {}".format(i, query["sql"])
+                for i, query in enumerate(context.captured_queries, start=1)
+            ),
+        ),
+    )
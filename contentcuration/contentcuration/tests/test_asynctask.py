@@ -2,17 +2,23 @@ import threading
 import time
 import uuid
 
+import mock
 import pytest
 from celery import states
 from celery.result import allow_join_result
 from celery.utils.log import get_task_logger
+from django.core.cache import cache
 from django.core.management import call_command
 from django.test import TransactionTestCase
 from django_celery_results.models import TaskResult
 
 from . import testdata
+from .base import StudioTestCase
 from .helpers import clear_tasks
 from contentcuration.celery import app
+from contentcuration.models import CustomTaskMetadata
+from contentcuration.utils.celery.tasks import CeleryTask
+from contentcuration.utils.celery.tasks import TASK_SIGNATURE_CACHE_KEY
 
 logger = get_task_logger(__name__)
 
@@ -273,3 +279,87 @@ class AsyncTaskTestCase(TransactionTestCase):
             TaskResult.objects.get(task_id=async_result.task_id, status=states.REVOKED)
         except TaskResult.DoesNotExist:
             self.fail("Missing revoked task result")
+
+
+class FetchOrEnqueueCacheTestCase(StudioTestCase):
+    """
+    Tests the cache of incomplete tasks that lets `fetch_or_enqueue` skip the database,
+    without sending the tasks to a worker
+    """
+
+    def setUp(self):
+        super(FetchOrEnqueueCacheTestCase, self).setUp()
+        self.user = testdata.user()
+        clear_tasks()
+        patcher = mock.patch.object(
+            CeleryTask, "apply_async", autospec=True, side_effect=self._apply_async
+        )
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cache.delete(self._cache_key())
+        super(FetchOrEnqueueCacheTestCase, self).tearDown()
+
+    def _apply_async(self, task, task_id=None, **kwargs):
+        TaskResult.objects.create(
+            task_id=task_id, task_name=task.name, status=states.PENDING
+        )
+        return task.AsyncResult(task_id)
+
+    def _cache_key(self):
+        return TASK_SIGNATURE_CACHE_KEY.format(
+            test_task.generate_signature({"is_test": True})
+        )
+
+    def _finish(self, async_result):
+        TaskResult.objects.filter(task_id=async_result.task_id).update(
+            status=states.SUCCESS
+        )
+        test_task.after_return(
+            states.SUCCESS, 42, async_result.task_id, (), {"is_test": True}, None
+        )
+
+    def test_fetch_or_enqueue__cached(self):
+        async_result = test_task.fetch_or_enqueue(self.user, is_test=True)
+        self.assertEqual(cache.get(self._cache_key()), async_result.task_id)
+
+        with self.assertNumQueries(0):
+            cached_result = test_task.fetch_or_enqueue(self.user, is_test=True)
+        self.assertEqual(cached_result.task_id, async_result.task_id)
+
+    def test_fetch_or_enqueue__finished(self):
+        async_result = test_task.fetch_or_enqueue(self.user, is_test=True)
+        self._finish(async_result)
+        self.assertIsNone(cache.get(self._cache_key()))
+
+        next_result = test_task.fetch_or_enqueue(self.user, is_test=True)
+        self.assertNotEqual(next_result.task_id, async_result.task_id)
+        self.assertEqual(cache.get(self._cache_key()), next_result.task_id)
+
+    def test_fetch_or_enqueue__not_cached(self):
+        async_result = test_task.fetch_or_enqueue(self.user, is_test=True)
+        # as if the cache entry had expired
+        cache.delete(self._cache_key())
+
+        fetched_result = test_task.fetch_or_enqueue(self.user, is_test=True)
+        self.assertEqual(fetched_result.task_id, async_result.task_id)
+        self.assertEqual(cache.get(self._cache_key()), async_result.task_id)
+
+    def test_enqueue__countdown(self):
+        async_result = test_task.enqueue(self.user, countdown=60, is_test=True)
+        self.assertEqual(self.apply_async.call_args[1]["countdown"], 60)
+        self.assertEqual(self.apply_async.call_args[1]["kwargs"], {"is_test": True})
+        self.assertTrue(
+            CustomTaskMetadata.objects.filter(
+                task_id=async_result.task_id,
+                user=self.user,
+                signature=test_task.generate_signature({"is_test": True}),
+            ).exists()
+        )
+
+    def test_revoke__clears_cache(self):
+        test_task.fetch_or_enqueue(self.user, is_test=True)
+        with mock.patch.object(app.control, "revoke"):
+            test_task.revoke(is_test=True)
+        self.assertIsNone(cache.get(self._cache_key()))
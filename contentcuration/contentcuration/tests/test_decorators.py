@@ -1,8 +1,11 @@
 import mock
 
 from contentcuration.decorators import delay_user_storage_calculation
+from contentcuration.tasks import calculate_pending_user_storage_task
 from contentcuration.tests.base import StudioTestCase
 from contentcuration.tests.base import testdata
+from contentcuration.utils.cache import PendingUserStorageCache
+from contentcuration.utils.cache import USER_STORAGE_CALCULATION_INTERVAL
 from contentcuration.utils.user import calculate_user_storage
 
 
@@ -10,9 +13,52 @@ class DecoratorsTestCase(StudioTestCase):
     def setUp(self):
         super(DecoratorsTestCase, self).setUp()
         self.user = testdata.user()
+        # clear any recalculation left pending by other tests
+        PendingUserStorageCache().pop()
 
-    @mock.patch("contentcuration.utils.user.calculate_user_storage_task")
+    def tearDown(self):
+        PendingUserStorageCache().pop()
+        super(DecoratorsTestCase, self).tearDown()
+
+    @mock.patch("contentcuration.utils.user.calculate_pending_user_storage_task")
     def test_delay_storage_calculation(self, mock_task):
+        @delay_user_storage_calculation
+        def do_test():
+            calculate_user_storage(self.user.id)
+            calculate_user_storage(self.user.id)
+            mock_task.enqueue.assert_not_called()
+
+        do_test()
+        mock_task.enqueue.assert_called_once_with(
+            self.user, countdown=USER_STORAGE_CALCULATION_INTERVAL
+        )
+        self.assertEqual([self.user.id], PendingUserStorageCache().pop())
+
+    @mock.patch("contentcuration.utils.user.calculate_pending_user_storage_task")
+    def test_calculate_user_storage__debounced(self, mock_task):
+        other_user = testdata.user(email="other@test.com")
+        calculate_user_storage(self.user.id)
+        calculate_user_storage(other_user.id)
+        calculate_user_storage(self.user.id)
+        mock_task.enqueue.assert_called_once_with(
+            self.user, countdown=USER_STORAGE_CALCULATION_INTERVAL
+        )
+
+        with mock.patch(
+            "contentcuration.models.User.set_space_used", autospec=True
+        ) as set_space_used:
+            calculate_pending_user_storage_task()
+        self.assertEqual(
+            {self.user.id, other_user.id},
+            {call[0][0].id for call in set_space_used.call_args_list},
+        )
+        self.assertEqual(set_space_used.call_count, 2)
+
+    @mock.patch("contentcuration.utils.user.PendingUserStorageCache.add")
+    @mock.patch("contentcuration.utils.user.calculate_user_storage_task")
+    def test_calculate_user_storage__not_redis(self, mock_task, mock_add):
+        mock_add.return_value = None
+
         @delay_user_storage_calculation
         def do_test():
             calculate_user_storage(self.user.id)
@@ -4,6 +4,7 @@ import random
 import string
 import tempfile
 import uuid
+from collections import OrderedDict
 
 import pytest
 from celery import states
@@ -22,6 +23,7 @@ from le_utils.constants.labels import levels
 from le_utils.constants.labels import needs
 from le_utils.constants.labels import resource_type
 from le_utils.constants.labels import subjects
+from mock import Mock
 from mock import patch
 
 from .base import StudioTestCase
@@ -36,6 +38,7 @@ from contentcuration import models as cc
 from contentcuration.models import CustomTaskMetadata
 from contentcuration.utils.assessment.qti.archive import hex_to_qti_id
 from contentcuration.utils.celery.tasks import generate_task_signature
+from contentcuration.utils.celery.tasks import ProgressTracker
 from contentcuration.utils.publish import ChannelIncompleteError
 from contentcuration.utils.publish import convert_channel_thumbnail
 from contentcuration.utils.publish import create_content_database
@@ -45,7 +48,9 @@ from contentcuration.utils.publish import map_prerequisites
 from contentcuration.utils.publish import MIN_SCHEMA_VERSION
 from contentcuration.utils.publish import NoneContentNodeTreeError
 from contentcuration.utils.publish import publish_channel
+from contentcuration.utils.publish import PUBLISH_STAGES
 from contentcuration.utils.publish import set_channel_icon_encoding
+from contentcuration.utils.publish import TreeMapper
 from contentcuration.viewsets.base import create_change_tracker
 
 pytestmark = pytest.mark.django_db
@@ -726,6 +731,47 @@ class ChannelExportUtilityFunctionTestCase(StudioTestCase):
             )
             self.assertEqual("this is a test", convert_channel_thumbnail(channel))
 
+    def test_prefetch_thumbnail_encodings__only_mapped_nodes(self):
+        channel = cc.Channel.objects.create(actor_id=self.admin_user.id)
+        root = channel.main_tree
+        root.complete = True
+        root.save()
+
+        def add_node(kind_id, parent, complete=True, thumbnail=None, **kwargs):
+            node = cc.ContentNode.objects.create(
+                kind_id=kind_id, parent=parent, complete=complete, **kwargs
+            )
+            if thumbnail:
+                cc.File.objects.create(
+                    contentnode=node,
+                    checksum=thumbnail * 32,
+                    file_format_id="png",
+                    preset_id="{}_thumbnail".format(kind_id),
+                )
+            return node
+
+        add_node("video", root, thumbnail="a")
+        add_node(
+            "video",
+            root,
+            thumbnail="b",
+            thumbnail_encoding=json.dumps({"base64": "data:image/png;base64,b"}),
+        )
+        add_node("video", root, complete=False, thumbnail="c")
+        incomplete_topic = add_node("topic", root, complete=False)
+        add_node("video", incomplete_topic, thumbnail="d")
+        add_node("topic", root, thumbnail="e")
+        topic = add_node("topic", root, thumbnail="f")
+        add_node("video", topic, thumbnail="a")
+
+        mapper = TreeMapper(root, None, channel.id, channel.name)
+        with patch(
+            "contentcuration.utils.publish.cache_thumbnail_encodings"
+        ) as cache_thumbnail_encodings:
+            mapper._prefetch_thumbnail_encodings()
+        filenames = list(cache_thumbnail_encodings.call_args[0][0])
+        self.assertCountEqual(filenames, ["a" * 32 + ".png", "f" * 32 + ".png"])
+
     def test_create_slideshow_manifest(self):
         ccnode = cc.ContentNode.objects.create(
             kind_id=slideshow(), extra_fields={}, complete=True
@@ -826,6 +872,42 @@ class PublishFailCleansUpTaskObjects(StudioTestCase):
             assert new_custom_task_metadata.task_id == new_task_result.task_id
 
 
+class ChangeTrackerStageTimingsTestCase(StudioTestCase):
+    def setUp(self):
+        super(ChangeTrackerStageTimingsTestCase, self).setUpBase()
+        self.pk = uuid.uuid4().hex
+
+    def test_finished_task_kept_with_stage_timings(self):
+        with create_change_tracker(
+            self.pk, "channel", self.channel.id, self.user, "export-channel"
+        ) as progress_tracker:
+            progress_tracker.set_stages(OrderedDict([("first", 1), ("second", 1)]))
+            with progress_tracker.stage("first"):
+                pass
+            with progress_tracker.stage("second"):
+                pass
+
+        metadata = CustomTaskMetadata.objects.get(task_id=progress_tracker.task_id)
+        self.assertEqual(["first", "second"], list(metadata.stage_timings))
+        self.assertEqual(
+            TaskResult.objects.get(task_id=progress_tracker.task_id).status,
+            states.SUCCESS,
+        )
+
+    def test_finished_task_removed_without_stage_timings(self):
+        with create_change_tracker(
+            self.pk, "channel", self.channel.id, self.user, "export-channel"
+        ) as progress_tracker:
+            progress_tracker.increment(100)
+
+        self.assertFalse(
+            CustomTaskMetadata.objects.filter(task_id=progress_tracker.task_id).exists()
+        )
+        self.assertFalse(
+            TaskResult.objects.filter(task_id=progress_tracker.task_id).exists()
+        )
+
+
 class PublishStagingTreeTestCase(StudioTestCase):
     @classmethod
     def setUpClass(cls):
@@ -929,6 +1011,23 @@ class PublishStagingTreeTestCase(StudioTestCase):
             True,
         )
 
+    def test_progress_tracked_by_stage(self):
+        send_event = Mock()
+        progress_tracker = ProgressTracker("abc123", send_event)
+        publish_channel(
+            self.admin_user.id,
+            self.content_channel.id,
+            progress_tracker=progress_tracker,
+            use_staging_tree=True,
+        )
+        self.assertEqual(100, progress_tracker.task_progress)
+        self.assertEqual(
+            list(PUBLISH_STAGES), list(progress_tracker.stage_timings.keys())
+        )
+        send_event.assert_called_with(
+            progress=100, stage_timings=dict(progress_tracker.stage_timings)
+        )
+
     def test_main_tree_not_impacted(self):
         self.assertFalse(self.content_channel.main_tree.published)
         self.run_publish_channel()
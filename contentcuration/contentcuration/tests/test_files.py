@@ -4,6 +4,7 @@ from uuid import uuid4
 
 import mock
 import pytest
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.core.files.storage import default_storage
 from django.db.models import Exists
@@ -24,6 +25,7 @@ from contentcuration.models import File
 from contentcuration.models import generate_object_storage_name
 from contentcuration.models import StagedFile
 from contentcuration.models import User
+from contentcuration.utils.files import cache_thumbnail_encodings
 from contentcuration.utils.files import create_thumbnail_from_base64
 from contentcuration.utils.files import get_thumbnail_encoding
 from contentcuration.utils.nodes import map_files_to_node
@@ -43,10 +45,36 @@ class FileThumbnailTestCase(BaseAPITestCase):
         with default_storage.open(filepath, "rb") as fobj:
             self.thumbnail_contents = fobj.read()
 
+    def tearDown(self):
+        super(FileThumbnailTestCase, self).tearDown()
+        cache.clear()
+
     def test_get_thumbnail_encoding(self):
         encoding = get_thumbnail_encoding(str(self.thumbnail_fobj))
         self.assertEqual(encoding, generated_base64encoding())
 
+    def test_get_thumbnail_encoding__cached(self):
+        get_thumbnail_encoding(str(self.thumbnail_fobj))
+        with patch("contentcuration.utils.files.default_storage.open") as open_mock:
+            encoding = get_thumbnail_encoding(str(self.thumbnail_fobj))
+        open_mock.assert_not_called()
+        self.assertEqual(encoding, generated_base64encoding())
+
+    def test_cache_thumbnail_encodings(self):
+        missing = "{}.png".format(uuid4().hex)
+        with patch("contentcuration.utils.files.THUMBNAIL_ENCODING_CHUNK_SIZE", 1):
+            encoded = cache_thumbnail_encodings(
+                iter([str(self.thumbnail_fobj), missing])
+            )
+        self.assertEqual(encoded, 1)
+        with patch("contentcuration.utils.files.default_storage.open") as open_mock:
+            self.assertEqual(
+                get_thumbnail_encoding(str(self.thumbnail_fobj)),
+                generated_base64encoding(),
+            )
+            self.assertEqual(cache_thumbnail_encodings([str(self.thumbnail_fobj)]), 0)
+        open_mock.assert_not_called()
+
     @patch("contentcuration.api.default_storage.save")
     @patch("contentcuration.api.default_storage.exists", return_value=True)
     def test_existing_thumbnail_is_not_created(
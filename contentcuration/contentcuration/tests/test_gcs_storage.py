@@ -1,6 +1,8 @@
+import gzip
 from io import BytesIO
 
 import mock
+from django.conf import settings
 from django.core.files import File
 from django.test import TestCase
 from google.cloud.storage import Bucket
@@ -74,20 +76,29 @@ class GoogleCloudStorageSaveTestCase(TestCase):
         self.storage.save(filename, self.content, blob_object=self.blob_obj)
         assert "private" in self.blob_obj.cache_control
 
-    @mock.patch("contentcuration.utils.gcs_storage.BytesIO")
-    @mock.patch(
-        "contentcuration.utils.gcs_storage.GoogleCloudStorage._is_file_empty",
-        return_value=False,
-    )
-    def test_gzip_if_content_database(self, bytesio_mock, file_empty_mock):
+    def test_gzip_if_content_database(self):
         """
-        Check that if we're uploading a gzipped content database and
-        if the BytesIO object has been closed.
+        Check that if we're uploading a content database, it is streamed gzipped
+        to a resumable upload.
         """
+        buffer = UnclosableBytesIO()
+        self.blob_obj.open.return_value = buffer
+        content = BytesIO(b"content" * 1024 * 1024)
         filename = "content/databases/myfile.sqlite3"
-        self.storage.save(filename, self.content, blob_object=self.blob_obj)
+        self.storage.save(filename, content, blob_object=self.blob_obj)
         assert self.blob_obj.content_encoding == "gzip"
-        assert bytesio_mock.called
+        self.blob_obj.open.assert_called_once_with(
+            "wb",
+            chunk_size=settings.GCS_DATABASE_UPLOAD_CHUNK_SIZE,
+            content_type="application/vnd.sqlite3",
+        )
+        self.blob_obj.upload_from_file.assert_not_called()
+        assert gzip.decompress(buffer.getvalue()) == content.getvalue()
+
+
+class UnclosableBytesIO(BytesIO):
+    def close(self):
+        pass
 
 
 class GoogleCloudStorageOpenTestCase(TestCase):
@@ -121,9 +132,11 @@ class GoogleCloudStorageOpenTestCase(TestCase):
 
     def test_calls_blob_download_to_file(self):
         """
-        Check that open() eventually calls blob.download_to_file().
+        Check that open() eventually calls blob.download_to_file() when downloading is requested.
         """
-        self.storage.open(self.local_file.filename, blob_object=self.blob_obj)
+        self.storage.open(
+            self.local_file.filename, blob_object=self.blob_obj, download=True
+        )
 
         # assert that we called download_from_file
         self.blob_obj.download_to_file.assert_called()
@@ -132,12 +145,57 @@ class GoogleCloudStorageOpenTestCase(TestCase):
         """
         Test that we return a Django File instance.
         """
-        f = self.storage.open(self.local_file.filename, blob_object=self.blob_obj)
+        f = self.storage.open(
+            self.local_file.filename, blob_object=self.blob_obj, download=True
+        )
 
         assert isinstance(f, File)
         # This checks that an actual temp file was written on disk for the file.git
         assert f.name
 
+    def _mock_blob_contents(self, contents):
+        self.blob_obj.size = len(contents)
+        self.blob_obj.content_encoding = None
+        self.blob_obj.download_as_bytes.side_effect = (
+            lambda start, end, checksum: contents[start : end + 1]
+        )
+
+    def test_reads_lazily_with_ranged_requests(self):
+        """
+        Check that open() doesn't download the blob, and only requests the ranges that are read.
+        """
+        contents = bytes(range(256)) * 4096
+        self._mock_blob_contents(contents)
+
+        f = self.storage.open(self.local_file.filename, blob_object=self.blob_obj)
+
+        assert isinstance(f, File)
+        assert f.name == self.local_file.filename
+        self.blob_obj.download_to_file.assert_not_called()
+        self.blob_obj.download_as_bytes.assert_not_called()
+
+        f.seek(-22, 2)
+        assert f.read(22) == contents[-22:]
+        f.seek(10)
+        assert f.read(4) == contents[10:14]
+        # the second read is served from the read ahead buffer
+        assert f.read(4) == contents[14:18]
+        assert self.blob_obj.download_as_bytes.call_count == 2
+        assert f.read() == contents[18:]
+        assert f.read(1) == b""
+        assert f.size == len(contents)
+
+    def test_downloads_gzip_encoded_blob(self):
+        """
+        Check that open() downloads gzip encoded blobs, which can't be read by range.
+        """
+        self.blob_obj.content_encoding = "gzip"
+
+        self.storage.open(self.local_file.filename, blob_object=self.blob_obj)
+
+        self.blob_obj.download_to_file.assert_called()
+        self.blob_obj.download_as_bytes.assert_not_called()
+
 
 class CompositeGCSTestCase(TestCase):
     """
@@ -204,6 +262,14 @@ class CompositeGCSTestCase(TestCase):
         self.storage.delete("blob")
         mock_blob.delete.assert_called()
 
+    def test_delete_many(self):
+        names = ["blob{}".format(i) for i in range(150)]
+        self.storage.delete_many(["/contentworkshop_content/blob0"] + names[1:])
+        self.assertEqual(self.mock_default_client.batch.call_count, 2)
+        self.mock_default_bucket.delete_blob.assert_has_calls(
+            [mock.call(name) for name in names]
+        )
+
     def test_exists(self):
         self.mock_default_bucket.get_blob.return_value = self.blob_cls("blob", "blob")
         self.assertTrue(self.storage.exists("blob"))
@@ -4,6 +4,7 @@ import mock
 import pytest
 from django.conf import settings
 from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
 from django.core.exceptions import ValidationError
 from django.db.models import Q
 from django.db.utils import IntegrityError
@@ -32,6 +33,7 @@ from contentcuration.models import User
 from contentcuration.models import UserHistory
 from contentcuration.tests import testdata
 from contentcuration.tests.base import StudioTestCase
+from contentcuration.utils.cache import UserStorageCache
 from contentcuration.viewsets.sync.constants import DELETED
 
 
@@ -1106,6 +1108,87 @@ class UserTestCase(StudioTestCase):
 
         self.assertEqual(user.get_server_rev(), 2)
 
+    def _create_user_with_file(self, disk_space):
+        user = self._create_user("{}@tester.com".format(uuid.uuid4().hex))
+        user.disk_space = disk_space
+        user.save()
+        # user ids are reused between test runs, so clear anything cached for the id
+        storage_cache = UserStorageCache(user.pk)
+        storage_cache.redis_client.delete(
+            storage_cache.reserved_key, storage_cache.checksums_key
+        )
+        channel = testdata.channel()
+        channel.editors.add(user)
+        checksum = self._create_active_file(user, channel, 400)
+        user.set_space_used()
+        return user, checksum
+
+    def _create_active_file(self, user, channel, size, checksum=None):
+        checksum = checksum or uuid.uuid4().hex
+        File.objects.create(
+            contentnode=channel.main_tree.get_descendants().first(),
+            checksum=checksum,
+            file_size=size,
+            uploaded_by=user,
+        )
+        return checksum
+
+    def test_check_space__reserves_space(self):
+        user, _ = self._create_user_with_file(1000)
+        new_checksum = uuid.uuid4().hex
+
+        user.check_space(500, new_checksum)
+        with self.assertRaises(PermissionDenied):
+            user.check_space(500, uuid.uuid4().hex)
+        # an upload of a file that has already reserved space doesn't reserve it again
+        user.check_space(500, new_checksum)
+
+    def test_check_space__existing_checksum(self):
+        user, checksum = self._create_user_with_file(400)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(user.check_space(400, checksum))
+        with self.assertRaises(PermissionDenied):
+            user.check_space(1, uuid.uuid4().hex)
+
+    def test_check_space__checksums_not_cached(self):
+        user, checksum = self._create_user_with_file(1000)
+        UserStorageCache(user.pk).redis_client.delete(
+            UserStorageCache(user.pk).checksums_key
+        )
+
+        with mock.patch(
+            "contentcuration.utils.user.calculate_user_storage"
+        ) as calculate_user_storage:
+            self.assertTrue(user.check_space(400, checksum))
+            calculate_user_storage.assert_called_once_with(user.pk)
+
+    def test_set_space_used__releases_reservations_of_active_files(self):
+        user, _ = self._create_user_with_file(1000)
+        channel = user.editable_channels.first()
+        active_checksum = uuid.uuid4().hex
+        user.check_space(200, active_checksum)
+        user.check_space(200, uuid.uuid4().hex)
+        self._create_active_file(user, channel, 200, checksum=active_checksum)
+
+        user.set_space_used()
+        self.assertEqual(600, user.disk_space_used)
+        user.check_space(200, uuid.uuid4().hex)
+        with self.assertRaises(PermissionDenied):
+            user.check_space(1, uuid.uuid4().hex)
+
+    def test_set_space_used__only_fetches_checksums_when_not_cached(self):
+        user, checksum = self._create_user_with_file(1000)
+        storage_cache = UserStorageCache(user.pk)
+
+        with mock.patch.object(UserStorageCache, "reset") as reset:
+            user.set_space_used()
+            reset.assert_not_called()
+
+        storage_cache.redis_client.delete(storage_cache.checksums_key)
+        user.set_space_used()
+        self.assertEqual({checksum}, storage_cache.get_cached_checksums([checksum]))
+
 
 class ChannelHistoryTestCase(StudioTestCase):
     def setUp(self):
@@ -0,0 +1,163 @@
+import subprocess
+
+import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from le_utils.constants import format_presets
+
+from contentcuration.management.commands import set_file_duration
+from contentcuration.management.commands.set_file_duration import bulk_set_durations
+from contentcuration.management.commands.set_file_duration import CHECKPOINT_KEY
+from contentcuration.management.commands.set_file_duration import (
+    extract_duration_of_media,
+)
+from contentcuration.management.commands.set_file_duration import get_duration
+from contentcuration.models import File
+from contentcuration.tests.base import StudioTestCase
+
+
+CHECKSUM_A = "a" * 32
+CHECKSUM_B = "b" * 32
+CHECKSUM_C = "c" * 32
+
+
+def create_file(checksum, preset=format_presets.VIDEO_HIGH_RES, duration=None):
+    return File.objects.create(
+        checksum=checksum,
+        file_size=10,
+        file_format_id="mp4",
+        preset_id=preset,
+        duration=duration,
+        file_on_disk="storage/{}/{}/{}.mp4".format(checksum[0], checksum[1], checksum),
+    )
+
+
+class BulkSetDurationsTestCase(StudioTestCase):
+    def test_bulk_set_durations__shared_checksums(self):
+        shared_files = [create_file(CHECKSUM_A), create_file(CHECKSUM_A)]
+        other_file = create_file(CHECKSUM_B)
+        with_duration = create_file(CHECKSUM_A, duration=5)
+        not_media = create_file(CHECKSUM_A, preset=format_presets.DOCUMENT)
+
+        updated = bulk_set_durations({CHECKSUM_A: 10, CHECKSUM_B: 20})
+
+        self.assertEqual(updated, 3)
+        for f in shared_files:
+            f.refresh_from_db()
+            self.assertEqual(f.duration, 10)
+        other_file.refresh_from_db()
+        self.assertEqual(other_file.duration, 20)
+        with_duration.refresh_from_db()
+        self.assertEqual(with_duration.duration, 5)
+        not_media.refresh_from_db()
+        self.assertIsNone(not_media.duration)
+
+    def test_bulk_set_durations__empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(bulk_set_durations({}), 0)
+
+
+class GetDurationTestCase(StudioTestCase):
+    @mock.patch("subprocess.run")
+    @mock.patch("subprocess.check_output", return_value=b"N/A\n")
+    def test_extract_duration_of_media__unreadable(self, check_output, run):
+        run.return_value = mock.Mock(
+            stderr=b"Invalid data found when processing input\n"
+        )
+        f_in = mock.Mock()
+        with self.assertRaises(RuntimeError):
+            extract_duration_of_media(f_in, "mp4")
+        f_in.seek.assert_called_once_with(0)
+
+    @mock.patch.object(set_file_duration, "extract_duration_of_media", return_value=42)
+    @mock.patch.object(set_file_duration, "open_downloaded")
+    @mock.patch.object(
+        set_file_duration,
+        "extract_duration_of_media_url",
+        side_effect=subprocess.CalledProcessError(1, "ffprobe"),
+    )
+    def test_get_duration__from_url_falls_back_to_download(
+        self, extract_duration_of_media_url, open_downloaded, extract_duration_of_media
+    ):
+        self.assertEqual(get_duration("file.mp4", "mp4", from_url=True), 42)
+        extract_duration_of_media_url.assert_called_once()
+        open_downloaded.assert_called_once_with("file.mp4")
+
+
+class SetFileDurationCommandTestCase(StudioTestCase):
+    def setUp(self):
+        super(SetFileDurationCommandTestCase, self).setUp()
+        cache.delete(CHECKPOINT_KEY)
+        self.files = {
+            checksum: [create_file(checksum), create_file(checksum)]
+            for checksum in (CHECKSUM_A, CHECKSUM_B, CHECKSUM_C)
+        }
+
+    def tearDown(self):
+        cache.delete(CHECKPOINT_KEY)
+        super(SetFileDurationCommandTestCase, self).tearDown()
+
+    def _call_command(self, durations, *args):
+        probed = []
+
+        def get_duration(file_on_disk, extension, from_url=False):
+            checksum = file_on_disk.split("/")[-1].split(".")[0]
+            probed.append(checksum)
+            duration = durations[checksum]
+            if isinstance(duration, Exception):
+                raise duration
+            return duration
+
+        with mock.patch.object(set_file_duration, "get_duration", get_duration):
+            call_command("set_file_duration", "--chunksize", "2", *args)
+        return sorted(probed)
+
+    def _assert_durations(self, durations):
+        for checksum, files in self.files.items():
+            for f in files:
+                f.refresh_from_db()
+                self.assertEqual(f.duration, durations.get(checksum))
+
+    def test_probes_each_checksum_once(self):
+        durations = {CHECKSUM_A: 1, CHECKSUM_B: 2, CHECKSUM_C: 3}
+        probed = self._call_command(durations, "--workers", "2")
+        self.assertEqual(probed, [CHECKSUM_A, CHECKSUM_B, CHECKSUM_C])
+        self._assert_durations(durations)
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
+
+    def test_resumes_from_checkpoint(self):
+        cache.set(CHECKPOINT_KEY, CHECKSUM_B, None)
+        durations = {CHECKSUM_A: 1, CHECKSUM_B: 2, CHECKSUM_C: 3}
+        probed = self._call_command(durations)
+        self.assertEqual(probed, [CHECKSUM_C])
+        self._assert_durations({CHECKSUM_C: 3})
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
+
+    def test_restart_ignores_checkpoint(self):
+        cache.set(CHECKPOINT_KEY, CHECKSUM_B, None)
+        durations = {CHECKSUM_A: 1, CHECKSUM_B: 2, CHECKSUM_C: 3}
+        probed = self._call_command(durations, "--restart")
+        self.assertEqual(probed, [CHECKSUM_A, CHECKSUM_B, CHECKSUM_C])
+        self._assert_durations(durations)
+
+    def test_probe_errors_leave_duration_unset(self):
+        durations = {
+            CHECKSUM_A: 1,
+            CHECKSUM_B: subprocess.CalledProcessError(1, "ffprobe"),
+            CHECKSUM_C: RuntimeError("Unable to determine media length"),
+        }
+        self._call_command(durations)
+        self._assert_durations({CHECKSUM_A: 1})
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
+
+    def test_interrupted_run_leaves_checkpoint(self):
+        durations = {CHECKSUM_A: 1, CHECKSUM_B: 2, CHECKSUM_C: ValueError()}
+        with self.assertRaises(ValueError):
+            self._call_command(durations)
+        # the first chunk of two checksums was saved before the second chunk failed
+        self._assert_durations({CHECKSUM_A: 1, CHECKSUM_B: 2})
+        self.assertEqual(cache.get(CHECKPOINT_KEY), CHECKSUM_B)
+
+        probed = self._call_command({CHECKSUM_C: 3})
+        self.assertEqual(probed, [CHECKSUM_C])
+        self._assert_durations({CHECKSUM_A: 1, CHECKSUM_B: 2, CHECKSUM_C: 3})
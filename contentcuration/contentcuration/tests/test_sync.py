@@ -14,7 +14,9 @@ from le_utils.constants.labels import subjects
 from .base import StudioTestCase
 from .testdata import create_temp_file
 from contentcuration.models import AssessmentItem
+from contentcuration.models import Change
 from contentcuration.models import Channel
+from contentcuration.models import ContentNode
 from contentcuration.models import ContentTag
 from contentcuration.models import File
 from contentcuration.models import License
@@ -26,7 +28,9 @@ from contentcuration.tests.viewsets.base import SyncTestMixin
 from contentcuration.utils.publish import mark_all_nodes_as_published
 from contentcuration.utils.sync import sync_channel
 from contentcuration.viewsets.sync.constants import ASSESSMENTITEM
+from contentcuration.viewsets.sync.constants import CONTENTNODE
 from contentcuration.viewsets.sync.constants import FILE
+from contentcuration.viewsets.sync.constants import UPDATED
 
 
 class SyncTestCase(StudioTestCase):
@@ -91,6 +95,50 @@ class SyncTestCase(StudioTestCase):
         self.assertFalse(self.channel.has_changes())
         self.assertFalse(self.derivative_channel.has_changes())
 
+    def test_sync_channel_completeness(self):
+        """
+        Test that sync recalculates the completeness of synced nodes in both directions,
+        and sends the changes to clients.
+        """
+        topics = self.channel.main_tree.get_descendants().filter(
+            kind_id=content_kinds.TOPIC
+        )[:2]
+        emptied_topic, titled_topic = topics
+        emptied_copy = self.derivative_channel.main_tree.get_descendants().get(
+            source_node_id=emptied_topic.node_id
+        )
+        titled_copy = self.derivative_channel.main_tree.get_descendants().get(
+            source_node_id=titled_topic.node_id
+        )
+
+        ContentNode.objects.filter(pk=emptied_topic.pk).update(title="")
+        ContentNode.objects.filter(pk=emptied_copy.pk).update(complete=True)
+        ContentNode.objects.filter(pk=titled_copy.pk).update(title="", complete=False)
+
+        sync_channel(
+            self.derivative_channel,
+            sync_titles_and_descriptions=True,
+            created_by_id=self.admin_user.id,
+        )
+
+        emptied_copy.refresh_from_db()
+        titled_copy.refresh_from_db()
+        self.assertFalse(emptied_copy.complete)
+        self.assertTrue(titled_copy.complete)
+
+        changes = {
+            change.kwargs["key"]: change.kwargs["mods"]
+            for change in Change.objects.filter(
+                channel=self.derivative_channel,
+                table=CONTENTNODE,
+                change_type=UPDATED,
+                applied=True,
+                created_by=self.admin_user,
+            )
+        }
+        self.assertEqual(changes[emptied_copy.id], {"complete": False})
+        self.assertEqual(changes[titled_copy.id], {"complete": True})
+
     def test_sync_files_add(self):
         """
         Test that calling sync_files successfully syncs a file added to the original node to
@@ -3,23 +3,30 @@ Simple User model creation tests.
 """
 import csv
 import datetime
+import gzip
 import io
 import json
 import sys
 import tempfile
 
+from django.core.files.storage import default_storage
 from django.core.management import call_command
 from django.test import TransactionTestCase
+from django.urls import reverse
 from django.urls import reverse_lazy
 
 from .base import BaseAPITestCase
 from .testdata import fileobj_video
+from contentcuration.constants import user_history
 from contentcuration.models import DEFAULT_CONTENT_DEFAULTS
 from contentcuration.models import Invitation
 from contentcuration.models import User
+from contentcuration.models import UserHistory
 from contentcuration.tests.utils import mixer
 from contentcuration.utils.csv_writer import _format_size
+from contentcuration.utils.csv_writer import generate_user_csv_storage_path
 from contentcuration.utils.csv_writer import write_user_csv
+from contentcuration.utils.csv_writer import write_user_csv_to_storage
 from contentcuration.views.users import send_invitation_email
 
 
@@ -159,3 +166,44 @@ class UserAccountTestCase(BaseAPITestCase):
                         self.assertIn(videos[index - 1].original_filename, row)
                         self.assertIn(_format_size(videos[index - 1].file_size), row)
             self.assertEqual(index, len(videos))
+
+    def test_user_csv_export_to_storage(self):
+        videos = [fileobj_video() for i in range(10)]
+
+        for video in videos:
+            video.uploaded_by = self.user
+            video.save()
+
+        storage_path = write_user_csv_to_storage(self.user)
+        self.assertEqual(storage_path, generate_user_csv_storage_path(self.user))
+        self.assertTrue(
+            UserHistory.objects.filter(
+                user=self.user, action=user_history.CSV_EXPORT
+            ).exists()
+        )
+
+        with default_storage.open(storage_path, "rb") as compressed:
+            content = gzip.decompress(compressed.read()).decode("utf-8")
+        rows = list(csv.reader(io.StringIO(content), delimiter=","))
+        self.assertEqual(len(rows), len(videos) + 1)
+        for video, row in zip(videos, rows[1:]):
+            self.assertIn(video.original_filename, row)
+            self.assertIn(_format_size(video.file_size), row)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("download_user_data"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            gzip.decompress(b"".join(response.streaming_content)).decode("utf-8"),
+            content,
+        )
+
+    def test_user_csv_download_other_user(self):
+        write_user_csv_to_storage(self.user)
+        other_user = User.objects.create(email="other@testy.com", is_active=True)
+        # user ids are reused between test runs, unlike storage
+        default_storage.delete(generate_user_csv_storage_path(other_user))
+        self.client.force_login(other_user)
+        self.client.force_authenticate(other_user)
+        response = self.client.get(reverse("download_user_data"))
+        self.assertEqual(response.status_code, 404)
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 import mock
 from django.test import SimpleTestCase
 
@@ -43,3 +45,45 @@ class ProgressTrackerTestCase(SimpleTestCase):
         self.send_event.assert_not_called()
         self.tracker.track(1.0)
         self.send_event.assert_called_with(progress=1)
+
+    def test_track__throttled(self):
+        self.tracker.min_interval = 60
+        self.tracker.track(2)
+        self.send_event.assert_called_once_with(progress=2)
+        self.tracker.track(50)
+        self.send_event.assert_called_once_with(progress=2)
+        self.tracker.track(100)
+        self.send_event.assert_called_with(progress=100)
+
+    def test_stages(self):
+        self.tracker.set_stages(OrderedDict([("first", 1), ("second", 3)]))
+        self.assertEqual(4, self.tracker.total)
+        with self.tracker.stage("first") as stage_tracker:
+            stage_tracker.set_total(10)
+            stage_tracker.increment(5)
+            self.assertEqual(12, self.tracker.task_progress)
+        self.assertEqual(25, self.tracker.task_progress)
+        with self.tracker.stage("second") as stage_tracker:
+            stage_tracker.set_total(2)
+            stage_tracker.increment()
+            self.assertEqual(62, self.tracker.task_progress)
+        self.assertEqual(100, self.tracker.task_progress)
+        self.assertEqual(["first", "second"], list(self.tracker.stage_timings))
+        self.send_event.assert_called_with(
+            progress=100, stage_timings=dict(self.tracker.stage_timings)
+        )
+
+    def test_stages__nested(self):
+        self.tracker.set_stages(OrderedDict([("first", 1), ("second", 1)]))
+        with self.tracker.stage("second") as stage_tracker:
+            stage_tracker.set_stages(OrderedDict([("inner", 1), ("other", 1)]))
+            with stage_tracker.stage("inner"):
+                pass
+            self.assertEqual(75, self.tracker.task_progress)
+        self.assertEqual(["second.inner", "second"], list(self.tracker.stage_timings))
+
+    def test_stages__unknown(self):
+        self.tracker.set_stages(OrderedDict([("first", 1)]))
+        with self.assertRaises(KeyError):
+            with self.tracker.stage("second"):
+                pass
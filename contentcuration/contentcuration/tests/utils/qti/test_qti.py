@@ -1,4 +1,5 @@
 import unittest
+import xml.etree.ElementTree as ET
 
 from pydantic import ValidationError
 
@@ -11,6 +12,8 @@ from contentcuration.utils.assessment.qti.assessment_item import OutcomeDeclarat
 from contentcuration.utils.assessment.qti.assessment_item import ResponseDeclaration
 from contentcuration.utils.assessment.qti.assessment_item import ResponseProcessing
 from contentcuration.utils.assessment.qti.assessment_item import Value
+from contentcuration.utils.assessment.qti.base import ElementTreeBase
+from contentcuration.utils.assessment.qti.base import TextNode
 from contentcuration.utils.assessment.qti.constants import BaseType
 from contentcuration.utils.assessment.qti.constants import Cardinality
 from contentcuration.utils.assessment.qti.html import P
@@ -270,3 +273,32 @@ class QTIDataClassTests(unittest.TestCase):
         )
         expected_xml = '<qti-extended-text-interaction response-identifier="extendedText1" placeholder-text="Enter your essay here." min-strings="0" format="plain"><qti-prompt>What is truth?</qti-prompt></qti-extended-text-interaction>'  # noqa: E501
         self.assertEqual(extended_text_interaction.to_xml_string(), expected_xml)
+
+    def test_to_xml_string_matches_element_tree(self):
+        children = ElementTreeBase.from_string(
+            '<p>1 &lt; 2 &amp; "3" <img src="a.png" alt="&quot;a&quot; &amp; b"/> tail '
+            '<img src="d.png" srcset="b.png 1x, c.png 2x" alt=""/>\n\tmore'
+            "</p><p></p>"
+        )
+        item = AssessmentItem(
+            identifier="item1",
+            title="Item <1>",
+            language="en",
+            item_body=ItemBody(children=children),
+            response_processing=ResponseProcessing(
+                template="https://purl.imsglobal.org/spec/qti/v3p0/rptemplates/match_correct"
+            ),
+        )
+        expected_element = item.model_copy(deep=True).to_element()
+        self.assertEqual(
+            item.to_xml_string(), ET.tostring(expected_element, encoding="unicode")
+        )
+        self.assertEqual(
+            sorted(item.get_file_dependencies()),
+            ["a.png", "b.png", "c.png", "d.png"],
+        )
+
+    def test_construct_trusted(self):
+        value = Value.construct_trusted(value=TextNode(text="A"))
+        self.assertEqual(value.to_xml_string(), "<qti-value>A</qti-value>")
+        self.assertEqual(value.to_xml_string(), Value(value="A").to_xml_string())
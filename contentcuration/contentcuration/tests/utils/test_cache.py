@@ -1,8 +1,14 @@
+import threading
+import uuid
+
 import mock
+from django.core.cache import cache
 from django.test import SimpleTestCase
 
 from ..helpers import mock_class_instance
+from contentcuration.utils.cache import PendingUserStorageCache
 from contentcuration.utils.cache import ResourceSizeCache
+from contentcuration.utils.cache import UserStorageCache
 
 
 class ResourceSizeCacheTestCase(SimpleTestCase):
@@ -90,3 +96,83 @@ class ResourceSizeCacheTestCase(SimpleTestCase):
             cache_set.assert_called_once_with(
                 self.helper.modified_key, "2021-01-01 00:00:00"
             )
+
+
+class PendingUserStorageCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        super(PendingUserStorageCacheTestCase, self).setUp()
+        self.helper = PendingUserStorageCache(cache)
+        self.helper.pop()
+
+    def tearDown(self):
+        self.helper.pop()
+        super(PendingUserStorageCacheTestCase, self).tearDown()
+
+    def test_add(self):
+        self.assertTrue(self.helper.add(2))
+        self.assertFalse(self.helper.add(1))
+        self.assertFalse(self.helper.add(2))
+        self.assertEqual([2, 1], self.helper.pop())
+
+    def test_pop__reschedules(self):
+        self.helper.add(1)
+        self.helper.pop()
+        self.assertEqual([], self.helper.pop())
+        self.assertTrue(self.helper.add(1))
+        self.assertEqual([1], self.helper.pop())
+
+    def test_not_redis(self):
+        helper = PendingUserStorageCache(mock.Mock(client=mock.Mock()))
+        self.assertIsNone(helper.add(1))
+        self.assertEqual([], helper.pop())
+
+
+class UserStorageCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        super(UserStorageCacheTestCase, self).setUp()
+        self.helper = UserStorageCache(uuid.uuid4().hex, cache)
+
+    def tearDown(self):
+        self.helper.redis_client.delete(
+            self.helper.reserved_key, self.helper.checksums_key
+        )
+        super(UserStorageCacheTestCase, self).tearDown()
+
+    def test_reserve(self):
+        self.assertTrue(self.helper.reserve({"a": 400, "b": 400}, 1000))
+        self.assertFalse(self.helper.reserve({"c": 400}, 1000))
+        # an existing reservation is replaced rather than added to
+        self.assertTrue(self.helper.reserve({"a": 600}, 1000))
+        self.assertEqual(["a", "b"], sorted(self.helper.get_reserved_checksums()))
+
+    def test_reserve__concurrent(self):
+        results = []
+
+        def reserve():
+            results.append(self.helper.reserve({uuid.uuid4().hex: 300}, 1000))
+
+        threads = [threading.Thread(target=reserve) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(3, results.count(True))
+        self.assertEqual(3, len(self.helper.get_reserved_checksums()))
+
+    def test_activate(self):
+        self.helper.reserve({"a": 1, "b": 1}, 1000)
+        self.helper.activate(["a"])
+        # nothing is added when the checksums aren't cached
+        self.assertFalse(self.helper.has_cached_checksums())
+        self.assertEqual(["b"], self.helper.get_reserved_checksums())
+
+        self.helper.reset([])
+        self.helper.activate(["b"])
+        self.assertEqual({"b"}, self.helper.get_cached_checksums(["a", "b"]))
+        self.assertEqual([], self.helper.get_reserved_checksums())
+
+    def test_not_redis(self):
+        helper = UserStorageCache(1, mock.Mock(client=mock.Mock()))
+        self.assertIsNone(helper.reserve({"a": 1}, 1000))
+        self.assertIsNone(helper.has_cached_checksums())
+        self.assertEqual([], helper.get_reserved_checksums())
@@ -0,0 +1,108 @@
+import uuid
+
+from le_utils.constants import content_kinds
+from le_utils.constants import exercises
+from le_utils.constants import format_presets
+
+from contentcuration.models import AssessmentItem
+from contentcuration.models import ContentNode
+from contentcuration.models import File
+from contentcuration.models import License
+from contentcuration.tests.base import StudioTestCase
+from contentcuration.utils.completeness import get_completion_errors_for_nodes
+from contentcuration.utils.completeness import iterate_node_id_batches
+from contentcuration.utils.completeness import recalculate_all_completeness
+from contentcuration.utils.completeness import recalculate_completeness
+
+
+class CompletenessTestCase(StudioTestCase):
+    def setUp(self):
+        super(CompletenessTestCase, self).setUpBase()
+        self.license_id = (
+            License.objects.filter(copyright_holder_required=False, is_custom=False)
+            .values_list("pk", flat=True)
+            .first()
+        )
+        self.video_with_file = self._node(content_kinds.VIDEO)
+        File.objects.create(
+            contentnode=self.video_with_file,
+            preset_id=format_presets.VIDEO_HIGH_RES,
+            checksum=uuid.uuid4().hex,
+        )
+        self.video_without_file = self._node(content_kinds.VIDEO)
+        self.untitled_topic = self._node(content_kinds.TOPIC, title="")
+        self.exercise = self._node(
+            content_kinds.EXERCISE,
+            extra_fields={"mastery_model": exercises.DO_ALL, "randomize": False},
+        )
+        AssessmentItem.objects.create(
+            contentnode=self.exercise,
+            type=exercises.INPUT_QUESTION,
+            question="What is 1 + 1?",
+            answers='[{"answer": 2, "correct": true, "order": 1}]',
+        )
+        self.nodes = [
+            self.video_with_file,
+            self.video_without_file,
+            self.untitled_topic,
+            self.exercise,
+        ]
+
+    def _node(self, kind, title="yes", **kwargs):
+        return ContentNode.objects.create(
+            title=title,
+            kind_id=kind,
+            parent=self.channel.main_tree,
+            license_id=self.license_id,
+            complete=True,
+            **kwargs
+        )
+
+    def test_matches_mark_complete(self):
+        errors = get_completion_errors_for_nodes([node.id for node in self.nodes])
+        for node in self.nodes:
+            self.assertEqual(errors[node.id], node.mark_complete())
+
+    def test_constant_queries(self):
+        # nodes, licenses, default files and assessment items
+        with self.assertNumQueries(4):
+            get_completion_errors_for_nodes([node.id for node in self.nodes])
+
+    def test_recalculate_completeness(self):
+        now_complete, now_incomplete = recalculate_completeness(
+            [node.id for node in self.nodes]
+        )
+        self.assertEqual(now_complete, [])
+        self.assertEqual(
+            set(now_incomplete), {self.video_without_file.id, self.untitled_topic.id}
+        )
+        self.video_without_file.refresh_from_db()
+        self.assertFalse(self.video_without_file.complete)
+        self.video_with_file.refresh_from_db()
+        self.assertTrue(self.video_with_file.complete)
+
+    def test_recalculate_completeness_only_incomplete(self):
+        ContentNode.objects.filter(id=self.video_with_file.id).update(complete=False)
+        now_complete, _ = recalculate_completeness(
+            [self.video_with_file.id], only_incomplete=True
+        )
+        self.assertEqual(now_complete, [])
+        now_complete, _ = recalculate_completeness([self.video_with_file.id])
+        self.assertEqual(now_complete, [self.video_with_file.id])
+
+    def test_iterate_node_id_batches(self):
+        queryset = ContentNode.objects.filter(id__in=[node.id for node in self.nodes])
+        batches = list(iterate_node_id_batches(queryset, batch_size=3))
+        self.assertEqual([len(batch) for batch in batches], [3, 1])
+        self.assertEqual(
+            sorted(node_id for batch in batches for node_id in batch),
+            sorted(node.id for node in self.nodes),
+        )
+        resumed = list(
+            iterate_node_id_batches(queryset, batch_size=3, start_after=batches[0][-1])
+        )
+        self.assertEqual(resumed, batches[1:])
+
+    def test_recalculate_all_completeness(self):
+        queryset = ContentNode.objects.filter(id__in=[node.id for node in self.nodes])
+        self.assertEqual(recalculate_all_completeness(queryset, batch_size=2), (0, 2))
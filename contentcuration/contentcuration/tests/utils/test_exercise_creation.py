@@ -2,6 +2,7 @@
 # Ignore line length issues in this file
 # Black will autoformat where possible, so this is not too egregious
 # but will allow our long strings where necessary.
+import hashlib
 import json
 import os
 import re
@@ -9,6 +10,8 @@ import zipfile
 from io import BytesIO
 from uuid import uuid4
 
+import mock
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from le_utils.constants import content_kinds
 from le_utils.constants import exercises
@@ -20,6 +23,7 @@ from contentcuration.models import ContentNode
 from contentcuration.tests.base import StudioTestCase
 from contentcuration.tests.testdata import fileobj_exercise_graphie
 from contentcuration.tests.testdata import fileobj_exercise_image
+from contentcuration.utils.assessment.base import RESIZED_IMAGE_CACHE_KEY
 from contentcuration.utils.assessment.perseus import PerseusExerciseGenerator
 from contentcuration.utils.assessment.qti.archive import hex_to_qti_id
 from contentcuration.utils.assessment.qti.archive import QTIExerciseGenerator
@@ -190,6 +194,35 @@ class TestPerseusExerciseCreation(StudioTestCase):
         # we are deliberately changing the archive generation algorithm for perseus files.
         self.assertEqual(exercise_file.checksum, "0ec7e964b466ebc76e81e175570e97f1")
 
+    def test_exercise_file_checksum_and_size(self):
+        """Test that the checksum and size set on the exercise file match the uploaded archive"""
+        item = self._create_assessment_item(
+            exercises.SINGLE_SELECTION,
+            "What is 2+2?",
+            [{"answer": "4", "correct": True, "order": 1}],
+        )
+        exercise_data = {
+            "mastery_model": exercises.M_OF_N,
+            "randomize": True,
+            "n": 1,
+            "m": 1,
+            "all_assessment_items": [item.assessment_id],
+            "assessment_mapping": {item.assessment_id: exercises.SINGLE_SELECTION},
+        }
+
+        self._create_perseus_zip(exercise_data)
+
+        exercise_file = self.exercise_node.files.get(preset_id=format_presets.EXERCISE)
+        with storage.open(exercise_file.file_on_disk.name, "rb") as f:
+            zip_data = f.read()
+        self.assertEqual(hashlib.md5(zip_data).hexdigest(), exercise_file.checksum)
+        self.assertEqual(len(zip_data), exercise_file.file_size)
+        self.assertTrue(
+            exercise_file.file_on_disk.name.endswith(
+                f"{exercise_file.checksum}.{file_formats.PERSEUS}"
+            )
+        )
+
     def test_multiple_images_index_mismatch_regression(self):
         """Regression test for index mismatch bug in process_image_strings method.
 
@@ -1083,6 +1116,55 @@ class TestPerseusExerciseCreation(StudioTestCase):
             "Second and third image references should match",
         )
 
+    def test_resized_image_reused_across_exercises(self):
+        """Test that an image resized for one exercise is not resized again for the next"""
+        base_image = fileobj_exercise_image(size=(400, 300), color="purple")
+        base_image_url = exercises.CONTENT_STORAGE_FORMAT.format(base_image.filename())
+        cache.delete(
+            RESIZED_IMAGE_CACHE_KEY.format(
+                checksum=base_image.checksum, width=120, height=90
+            )
+        )
+
+        item = self._create_assessment_item(
+            exercises.SINGLE_SELECTION,
+            f"Image: ![shape]({base_image_url} =120x90)",
+            [{"answer": "Answer", "correct": True, "order": 1}],
+        )
+        base_image.assessment_item = item
+        base_image.save()
+
+        exercise_data = {
+            "mastery_model": exercises.M_OF_N,
+            "randomize": True,
+            "n": 1,
+            "m": 1,
+            "all_assessment_items": [item.assessment_id],
+            "assessment_mapping": {item.assessment_id: exercises.SINGLE_SELECTION},
+        }
+
+        def get_image_files():
+            exercise_file = self.exercise_node.files.get(
+                preset_id=format_presets.EXERCISE
+            )
+            zip_file, _ = self._validate_perseus_zip(exercise_file)
+            return {
+                name: zip_file.read(name)
+                for name in zip_file.namelist()
+                if name.startswith("images/")
+            }
+
+        self._create_perseus_zip(exercise_data)
+        image_files = get_image_files()
+        self.assertEqual(1, len(image_files))
+
+        with mock.patch(
+            "contentcuration.utils.assessment.base.resize_image"
+        ) as resize_image:
+            self._create_perseus_zip(exercise_data)
+        resize_image.assert_not_called()
+        self.assertEqual(image_files, get_image_files())
+
     def test_image_with_similar_dimensions(self):
         """Test handling of image resizing with similar but not identical dimensions"""
         # Create a base image file
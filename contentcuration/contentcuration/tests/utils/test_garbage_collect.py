@@ -12,6 +12,7 @@ from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from django.urls import reverse_lazy
 from django_celery_results.models import TaskResult
+from kolibri_public.models import LocalFile as PublicLocalFile
 from le_utils.constants import content_kinds
 from le_utils.constants import file_formats
 from le_utils.constants import format_presets
@@ -24,6 +25,7 @@ from contentcuration.models import UserHistory
 from contentcuration.tests.base import BaseAPITestCase
 from contentcuration.tests.base import StudioTestCase
 from contentcuration.tests.testdata import tree
+from contentcuration.utils.csv_writer import generate_user_csv_storage_path
 from contentcuration.utils.db_tools import create_user
 from contentcuration.utils.garbage_collect import clean_up_contentnodes
 from contentcuration.utils.garbage_collect import clean_up_deleted_chefs
@@ -31,6 +33,7 @@ from contentcuration.utils.garbage_collect import clean_up_feature_flags
 from contentcuration.utils.garbage_collect import clean_up_soft_deleted_users
 from contentcuration.utils.garbage_collect import clean_up_stale_files
 from contentcuration.utils.garbage_collect import clean_up_tasks
+from contentcuration.utils.garbage_collect import clean_up_user_csv_exports
 from contentcuration.utils.garbage_collect import get_deleted_chefs_root
 from contentcuration.views.internal import api_commit_channel
 from contentcuration.views.internal import create_channel
@@ -108,6 +111,33 @@ class NodeSettingTestCase(BaseAPITestCase):
         self.assertFalse(cc.ContentNode.objects.filter(parent=garbage_node).exists())
         self.assertFalse(cc.ContentNode.objects.filter(pk=child_pk).exists())
 
+    def test_old_chef_tree__deletes_by_tree_id(self):
+        tree(parent=self.channel.chef_tree)
+        chef_tree = self.channel.chef_tree
+        tree_id = chef_tree.tree_id
+        exercise = chef_tree.get_descendants().filter(kind_id=content_kinds.EXERCISE)[0]
+        item = cc.AssessmentItem.objects.create(contentnode=exercise)
+        File.objects.bulk_create(
+            [File(contentnode=exercise), File(assessment_item=item)]
+        )
+        copy = chef_tree.get_descendants().first().copy_to(self.channel.main_tree)
+        create_channel(self.channel.__dict__, self.user)
+
+        report = clean_up_deleted_chefs(dry_run=True)
+        self.assertEqual(
+            report.nodes, cc.ContentNode.objects.filter(tree_id=tree_id).count()
+        )
+        self.assertTrue(cc.ContentNode.objects.filter(tree_id=tree_id).exists())
+
+        clean_up_deleted_chefs()
+
+        self.assertFalse(cc.ContentNode.objects.filter(tree_id=tree_id).exists())
+        self.assertFalse(cc.AssessmentItem.objects.filter(pk=item.pk).exists())
+        self.assertFalse(File.objects.filter(contentnode=exercise).exists())
+        self.assertFalse(File.objects.filter(assessment_item=item).exists())
+        copy.refresh_from_db()
+        self.assertIsNone(copy.original_node_id)
+
     def test_old_staging_tree(self):
         staging_tree = self.channel.staging_tree
         garbage_node = get_deleted_chefs_root()
@@ -392,6 +422,82 @@ class CleanUpContentNodesTestCase(StudioTestCase):
 
         assert default_storage.exists("storage/a/a/aaa.jpg")
 
+    def test_deletes_files_in_batches(self):
+        nodes = [_create_expired_contentnode() for _ in range(3)]
+        for node in nodes:
+            f = File.objects.create(contentnode=node, checksum="bbb")
+            f.file_on_disk.save("bbb.jpg", ContentFile("bbb"))
+        assert default_storage.exists("storage/b/b/bbb.jpg")
+
+        clean_up_contentnodes(batch_size=2, delete_storage_files=True)
+
+        assert not ContentNode.objects.filter(pk__in=[n.pk for n in nodes]).exists()
+        assert not File.objects.filter(checksum="bbb").exists()
+        assert not default_storage.exists("storage/b/b/bbb.jpg")
+
+    def test_leaves_storage_files_by_default(self):
+        c = _create_expired_contentnode()
+        f = File.objects.create(contentnode=c, checksum="ddd")
+        f.file_on_disk.save("ddd.jpg", ContentFile("ddd"))
+
+        report = clean_up_contentnodes()
+
+        assert report.blobs == 1
+        assert not File.objects.filter(pk=f.pk).exists()
+        assert default_storage.exists("storage/d/d/ddd.jpg")
+
+    def test_doesnt_delete_storage_files_sharing_checksum(self):
+        c = _create_expired_contentnode()
+        f = File.objects.create(contentnode=c, checksum="eee")
+        f.file_on_disk.save("eee.jpg", ContentFile("eee"))
+        # a file with the same checksum that is stored under another name
+        legit_node = ContentNode.objects.create(kind_id=content_kinds.VIDEO)
+        File.objects.create(contentnode=legit_node, checksum="eee")
+
+        report = clean_up_contentnodes(delete_storage_files=True)
+
+        assert report.blobs == 0
+        assert not File.objects.filter(pk=f.pk).exists()
+        assert default_storage.exists("storage/e/e/eee.jpg")
+
+    def test_doesnt_delete_published_storage_files(self):
+        published_node = _create_expired_contentnode()
+        ContentNode.objects.filter(pk=published_node.pk).update(published=True)
+        f = File.objects.create(contentnode=published_node, checksum="fff")
+        f.file_on_disk.save("fff.jpg", ContentFile("fff"))
+
+        public_node = _create_expired_contentnode()
+        public_checksum = uuid.uuid4().hex
+        public_file = File.objects.create(
+            contentnode=public_node, checksum=public_checksum
+        )
+        public_file.file_on_disk.save(
+            "{}.jpg".format(public_checksum), ContentFile(public_checksum)
+        )
+        PublicLocalFile.objects.create(id=public_checksum, extension="jpg")
+
+        report = clean_up_contentnodes(delete_storage_files=True)
+
+        assert report.blobs == 0
+        assert not File.objects.filter(pk__in=[f.pk, public_file.pk]).exists()
+        assert default_storage.exists("storage/f/f/fff.jpg")
+        assert default_storage.exists(public_file.file_on_disk.name)
+
+    def test_dry_run(self):
+        c = _create_expired_contentnode()
+        f = File.objects.create(contentnode=c, checksum="ccc", file_size=3)
+        f.file_on_disk.save("ccc.jpg", ContentFile("ccc"))
+
+        report = clean_up_contentnodes(dry_run=True)
+
+        assert report.nodes == 1
+        assert report.files == 1
+        assert report.blobs == 1
+        assert report.bytes == 3
+        assert ContentNode.objects.filter(pk=c.pk).exists()
+        assert File.objects.filter(pk=f.pk).exists()
+        assert default_storage.exists("storage/c/c/ccc.jpg")
+
 
 class CleanUpFeatureFlagsTestCase(StudioTestCase):
     def setUp(self):
@@ -441,6 +547,57 @@ class CleanupTaskTestCase(StudioTestCase):
             self.fail("Task was removed")
 
 
+class CleanUpUserCSVExportsTestCase(StudioTestCase):
+    def setUp(self):
+        super(CleanUpUserCSVExportsTestCase, self).setUp()
+        self.user = cc.User.objects.create(email="csv@test.com")
+
+    def _export(self, days_ago):
+        storage_path = generate_user_csv_storage_path(self.user)
+        if default_storage.exists(storage_path):
+            default_storage.delete(storage_path)
+        default_storage.save(storage_path, ContentFile(b"csv"))
+        UserHistory.objects.create(
+            user=self.user,
+            action=user_history.CSV_EXPORT,
+            performed_at=datetime.now() - timedelta(days=days_ago),
+        )
+        return storage_path
+
+    def test_deletes_expired_exports(self):
+        storage_path = self._export(settings.USER_CSV_EXPORT_RETENTION + 1)
+        self.assertEqual(clean_up_user_csv_exports(dry_run=True), 1)
+        self.assertTrue(default_storage.exists(storage_path))
+
+        self.assertEqual(clean_up_user_csv_exports(), 1)
+        self.assertFalse(default_storage.exists(storage_path))
+        self.assertTrue(
+            UserHistory.objects.filter(
+                user=self.user, action=user_history.CSV_EXPORT_DELETION
+            ).exists()
+        )
+        self.assertEqual(clean_up_user_csv_exports(dry_run=True), 0)
+
+    def test_keeps_recent_exports(self):
+        storage_path = self._export(settings.USER_CSV_EXPORT_RETENTION - 1)
+        self.assertEqual(clean_up_user_csv_exports(), 0)
+        self.assertTrue(default_storage.exists(storage_path))
+        default_storage.delete(storage_path)
+
+    def test_deletes_exports_made_after_a_deletion(self):
+        self._export(settings.USER_CSV_EXPORT_RETENTION + 3)
+        clean_up_user_csv_exports()
+        UserHistory.objects.filter(
+            user=self.user, action=user_history.CSV_EXPORT_DELETION
+        ).update(
+            performed_at=datetime.now()
+            - timedelta(days=settings.USER_CSV_EXPORT_RETENTION + 2)
+        )
+        storage_path = self._export(settings.USER_CSV_EXPORT_RETENTION + 1)
+        self.assertEqual(clean_up_user_csv_exports(), 1)
+        self.assertFalse(default_storage.exists(storage_path))
+
+
 TWO_DAYS_AGO = datetime.now() - timedelta(days=2)
 
 
@@ -1,6 +1,11 @@
 import unittest
+import uuid
 
+import mock
+
+from contentcuration.utils.assessment.markdown import md
 from contentcuration.utils.assessment.markdown import render_markdown
+from contentcuration.utils.assessment.markdown import render_markdown_many
 from contentcuration.utils.assessment.qti import ElementTreeBase
 
 
@@ -211,3 +216,37 @@ class TestTexMathPluginRoundtrip(TexMathTestMixin, unittest.TestCase):
             roundtrip_result.replace("\n", "").strip(),
             expected.replace("\n", "").strip(),
         )
+
+
+class TestRenderMarkdownCache(unittest.TestCase):
+    def setUp(self):
+        # Unique sources, so that markup cached by other tests is not reused
+        self.markdowns = [
+            "Question {} $$x^2$$".format(uuid.uuid4().hex),
+            "Answer {}".format(uuid.uuid4().hex),
+        ]
+
+    def test_render_markdown_many(self):
+        self.assertEqual(
+            [md.render(self.markdowns[1]), md.render(self.markdowns[0])] * 2,
+            render_markdown_many([self.markdowns[1], self.markdowns[0]] * 2),
+        )
+
+    def test_render_markdown_many__reuses_cached_markup(self):
+        expected = render_markdown_many(self.markdowns)
+
+        with mock.patch.object(md, "render") as render:
+            self.assertEqual(expected, render_markdown_many(self.markdowns))
+            self.assertEqual(expected[0], render_markdown(self.markdowns[0]))
+        render.assert_not_called()
+
+    def test_render_markdown_many__renderer_version_changed(self):
+        render_markdown_many(self.markdowns)
+
+        with mock.patch(
+            "contentcuration.utils.assessment.markdown.RENDERER_VERSION", -1
+        ), mock.patch.object(md, "render", return_value="<p>rendered</p>") as render:
+            self.assertEqual(
+                ["<p>rendered</p>"] * 2, render_markdown_many(self.markdowns)
+            )
+        self.assertEqual(2, render.call_count)
@@ -0,0 +1,107 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+
+from contentcuration.models import ContentNode
+from contentcuration.tests import testdata
+from contentcuration.tests.base import StudioAPITestCase
+from contentcuration.utils.profiling import clear_profiles
+from contentcuration.utils.profiling import get_profiles
+from contentcuration.utils.profiling import profile
+from contentcuration.utils.profiling import ProfiledCache
+from contentcuration.utils.profiling import QueryProfile
+
+
+class QueryProfileTestCase(StudioAPITestCase):
+    def setUp(self):
+        super(QueryProfileTestCase, self).setUp()
+        clear_profiles()
+
+    def tearDown(self):
+        clear_profiles()
+        super(QueryProfileTestCase, self).tearDown()
+
+    def test_records_queries(self):
+        with QueryProfile("test") as query_profile:
+            list(ContentNode.objects.all()[:1])
+            list(ContentNode.objects.filter(parent__isnull=True)[:1])
+        self.assertEqual(query_profile.queries, 2)
+        self.assertGreater(query_profile.sql_time, 0)
+        self.assertIn("contentcuration_contentnode", query_profile.slowest_sql)
+
+    def test_records_cache_lookups(self):
+        cache.set("query_profile_test", 1)
+        with QueryProfile("test") as query_profile:
+            cache.get("query_profile_test")
+            cache.get("query_profile_test_missing")
+            cache.get_many(["query_profile_test", "query_profile_test_missing"])
+        self.assertEqual(query_profile.cache_hits, 2)
+        self.assertEqual(query_profile.cache_misses, 2)
+
+    def test_cache_proxy_only_installed_while_active(self):
+        default_cache = caches["default"]
+        with QueryProfile("outer"):
+            self.assertIsInstance(caches["default"], ProfiledCache)
+            with QueryProfile("inner") as inner_profile:
+                cache.get("query_profile_test_missing")
+            self.assertIsInstance(caches["default"], ProfiledCache)
+        self.assertIs(caches["default"], default_cache)
+        self.assertEqual(inner_profile.cache_misses, 1)
+
+    def test_cache_proxy_is_thread_local(self):
+        other_thread_caches = []
+        with QueryProfile("test"):
+            thread = threading.Thread(
+                target=lambda: other_thread_caches.append(caches["default"])
+            )
+            thread.start()
+            thread.join()
+        self.assertNotIsInstance(other_thread_caches[0], ProfiledCache)
+
+    def test_profile__aggregates(self):
+        for _ in range(2):
+            with profile("test"):
+                list(ContentNode.objects.all()[:1])
+        with profile("test"):
+            list(ContentNode.objects.all()[:1])
+            list(ContentNode.objects.all()[:1])
+
+        profiles = get_profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]["name"], "test")
+        self.assertEqual(profiles[0]["count"], 3)
+        self.assertAlmostEqual(profiles[0]["avg_queries"], 4 / 3)
+        self.assertEqual(profiles[0]["max_queries"], 2)
+
+        clear_profiles()
+        self.assertEqual(get_profiles(), [])
+
+    def test_middleware(self):
+        self.client.force_authenticate(self.admin_user)
+        with override_settings(
+            MIDDLEWARE=(
+                "contentcuration.middleware.query_profiler.QueryProfilerMiddleware",
+            )
+            + settings.MIDDLEWARE
+        ):
+            self.client.get(reverse("channel-list"), {"public": True}, format="json")
+        names = [p["name"] for p in get_profiles()]
+        self.assertEqual(names, ["GET channel-list"])
+
+    def test_endpoint(self):
+        with profile("test"):
+            list(ContentNode.objects.all()[:1])
+        user = testdata.user()
+        user.is_admin = True
+        self.sign_in(user)
+        response = self.client.get(reverse("query_profiles"), format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["profiles"][0]["name"], "test")
+
+        response = self.client.delete(reverse("query_profiles"), format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(get_profiles(), [])
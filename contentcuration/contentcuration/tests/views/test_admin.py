@@ -0,0 +1,142 @@
+import json
+from smtplib import SMTPException
+
+import mock
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends import locmem
+from django.urls import reverse
+from postmark.core import PMMailServerErrorException
+
+from contentcuration.celery import app
+from contentcuration.models import CustomTaskMetadata
+from contentcuration.tests import testdata
+from contentcuration.tests.base import StudioAPITestCase
+
+
+class SendCustomEmailTestCase(StudioAPITestCase):
+    celery_task_always_eager = None
+
+    @classmethod
+    def setUpClass(cls):
+        super(SendCustomEmailTestCase, cls).setUpClass()
+        # update celery so tasks are always eager for this test, meaning they'll execute synchronously
+        cls.celery_task_always_eager = app.conf.task_always_eager
+        app.conf.update(task_always_eager=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super(SendCustomEmailTestCase, cls).tearDownClass()
+        app.conf.update(task_always_eager=cls.celery_task_always_eager)
+
+    def setUp(self):
+        super(SendCustomEmailTestCase, self).setUp()
+        self.recipients = [
+            testdata.user(email="recipient{}@test.com".format(i)) for i in range(5)
+        ]
+        self.sender = testdata.user(email="sender@test.com")
+        self.sender.is_admin = True
+        self.sign_in(self.sender)
+
+    def _send(self):
+        return self.client.post(
+            reverse("send_custom_email"),
+            json.dumps(
+                {
+                    "subject": "Announcement",
+                    "message": "Hello {email}",
+                    "query": {
+                        "ids": ",".join(str(user.pk) for user in self.recipients)
+                    },
+                }
+            ),
+            content_type="application/json",
+        )
+
+    @mock.patch("contentcuration.tasks.CUSTOM_EMAIL_BATCH_SIZE", 2)
+    def test_send_custom_email__batches(self):
+        response = self._send()
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            sorted(user.email for user in self.recipients),
+        )
+        for email in mail.outbox:
+            self.assertIn("Announcement", email.subject)
+            self.assertEqual(email.body.strip(), "Hello {}".format(email.to[0]))
+
+        # the fan out task and a task for each of the three batches
+        self.assertEqual(CustomTaskMetadata.objects.filter(user=self.sender).count(), 4)
+
+    def _get_fan_out_task_metadata(self):
+        return (
+            CustomTaskMetadata.objects.filter(user=self.sender).order_by("pk").first()
+        )
+
+    @mock.patch("contentcuration.tasks.CUSTOM_EMAIL_BATCH_SIZE", 2)
+    def test_send_custom_email__progress(self):
+        send = EmailMessage.send
+        progress = []
+
+        def send_recording_progress(email, *args, **kwargs):
+            progress.append(self._get_fan_out_task_metadata().progress)
+            return send(email, *args, **kwargs)
+
+        with mock.patch.object(EmailMessage, "send", send_recording_progress):
+            self._send()
+
+        # the progress is reported as each batch of two recipients is sent
+        self.assertEqual(progress, [None, None, 40, 40, 80])
+        self.assertEqual(self._get_fan_out_task_metadata().progress, 100)
+
+    def _assert_sent_once(self):
+        # every recipient is sent the email exactly once
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            sorted(user.email for user in self.recipients),
+        )
+        self.assertEqual(self._get_fan_out_task_metadata().progress, 100)
+
+    def _send_once_failing(self, exception):
+        send = EmailMessage.send
+        failed_recipient = self.recipients[2].email
+        failures = []
+
+        def send_once_failing(email, *args, **kwargs):
+            if email.to[0] == failed_recipient and not failures:
+                failures.append(email)
+                raise exception
+            return send(email, *args, **kwargs)
+
+        with mock.patch.object(EmailMessage, "send", send_once_failing):
+            response = self._send()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(failures), 1)
+
+    @mock.patch("contentcuration.tasks.CUSTOM_EMAIL_BATCH_SIZE", 5)
+    def test_send_custom_email__retries_unsent(self):
+        self._send_once_failing(SMTPException())
+        self._assert_sent_once()
+
+    @mock.patch("contentcuration.tasks.CUSTOM_EMAIL_BATCH_SIZE", 5)
+    def test_send_custom_email__retries_unsent__postmark_error(self):
+        self._send_once_failing(PMMailServerErrorException("Internal server error"))
+        self._assert_sent_once()
+
+    @mock.patch("contentcuration.tasks.CUSTOM_EMAIL_BATCH_SIZE", 5)
+    def test_send_custom_email__retries_refused_connection(self):
+        failures = []
+
+        def open_once_failing(backend):
+            if not failures:
+                failures.append(backend)
+                raise ConnectionRefusedError()
+
+        with mock.patch.object(
+            locmem.EmailBackend, "open", autospec=True, side_effect=open_once_failing
+        ):
+            response = self._send()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(failures), 1)
+        self._assert_sent_once()
@@ -1,9 +1,6 @@
-import datetime
 import json
 from contextlib import contextmanager
 
-import pytz
-from django.conf import settings
 from django.core.cache import cache
 from django.urls import reverse
 from mock import Mock
@@ -12,6 +9,8 @@ from mock import patch
 from contentcuration.models import ContentNode
 from contentcuration.tasks import generatenodediff_task
 from contentcuration.tests.base import BaseAPITestCase
+from contentcuration.utils.cache import bump_details_revision
+from contentcuration.utils.cache import get_details_revision
 
 
 class NodesViewsTestCase(BaseAPITestCase):
@@ -64,14 +63,9 @@ class DetailsTestCase(BaseAPITestCase):
         super().tearDown()
         cache.clear()
 
-    def _set_cache(self, node, last_update=None):
+    def _set_cache(self, node, revision=None):
         data = self.default_details.copy()
-        if last_update is not None:
-            data.update(
-                last_update=pytz.utc.localize(last_update).strftime(
-                    settings.DATE_TIME_FORMAT
-                )
-            )
+        data.update(revision=revision)
 
         cache_key = "details_{}".format(node.node_id)
         cache.set(cache_key, json.dumps(data))
@@ -109,44 +103,44 @@ class DetailsTestCase(BaseAPITestCase):
 
     @patch("contentcuration.views.nodes.getnodedetails_task")
     def test_get_channel_details__cached(self, task_mock):
-        # force the cache to update by adding a very old cache entry. Since Celery tasks run sync in the test suite,
-        # get_channel_details will return an updated cache value rather than generate it async.
+        # cache details calculated before the latest changes to the channel
         self._set_cache(
-            self.channel.main_tree, last_update=datetime.datetime(1990, 1, 1)
+            self.channel.main_tree,
+            revision=get_details_revision(self.channel.id) - 1,
         )
 
         with self._check_details() as details:
             # check cache was returned
             self.assertDetailsEqual(details, self.default_details)
             # Check that the outdated cache prompts an asynchronous cache update
-            task_mock.enqueue.assert_called_once_with(
+            task_mock.fetch_or_enqueue.assert_called_once_with(
                 self.user, node_id=self.channel.main_tree.id
             )
 
     @patch("contentcuration.views.nodes.getnodedetails_task")
     def test_get_channel_details__cached__not_updated__no_enqueue(self, task_mock):
-        # nothing changed,
-        self.channel.main_tree.get_descendants(include_self=False).update(changed=False)
+        # nothing changed since the details were calculated
         self._set_cache(
-            self.channel.main_tree, last_update=datetime.datetime(1990, 1, 1)
+            self.channel.main_tree, revision=get_details_revision(self.channel.id)
         )
 
         with self._check_details() as details:
             # check cache was returned
             self.assertDetailsEqual(details, self.default_details)
-            task_mock.enqueue.assert_not_called()
+            task_mock.fetch_or_enqueue.assert_not_called()
 
     @patch("contentcuration.views.nodes.getnodedetails_task")
-    def test_get_channel_details__cached__no_enqueue(self, task_mock):
-        # test last update handling
+    def test_get_channel_details__cached__changes_applied(self, task_mock):
         self._set_cache(
-            self.channel.main_tree, last_update=datetime.datetime(2099, 1, 1)
+            self.channel.main_tree, revision=get_details_revision(self.channel.id)
         )
+        bump_details_revision(self.channel.id)
 
         with self._check_details() as details:
-            # check cache was returned
             self.assertDetailsEqual(details, self.default_details)
-            task_mock.enqueue.assert_not_called()
+            task_mock.fetch_or_enqueue.assert_called_once_with(
+                self.user, node_id=self.channel.main_tree.id
+            )
 
     @patch("contentcuration.models.ContentNode.get_details")
     def test_get_node_details__uncached(self, mock_get_details):
@@ -162,36 +156,30 @@ class DetailsTestCase(BaseAPITestCase):
 
     @patch("contentcuration.views.nodes.getnodedetails_task")
     def test_get_node_details__cached(self, task_mock):
-        # force the cache to update by adding a very old cache entry. Since Celery tasks run sync in the test suite,
-        # get_channel_details will return an updated cache value rather than generate it async.
-        self._set_cache(self.node, last_update=datetime.datetime(1990, 1, 1))
+        # cache details calculated before the latest changes to the channel
+        self._set_cache(self.node, revision=get_details_revision(self.channel.id) - 1)
 
         with self._check_details(node=self.node) as details:
             # check cache was returned
             self.assertDetailsEqual(details, self.default_details)
             # Check that the outdated cache prompts an asynchronous cache update
-            task_mock.enqueue.assert_called_once_with(self.user, node_id=self.node.pk)
+            task_mock.fetch_or_enqueue.assert_called_once_with(
+                self.user, node_id=self.node.pk
+            )
 
     @patch("contentcuration.views.nodes.getnodedetails_task")
     def test_get_node_details__cached__not_updated__no_enqueue(self, task_mock):
-        # nothing changed,
-        self.channel.main_tree.get_descendants(include_self=False).update(changed=False)
-        self._set_cache(self.node, last_update=datetime.datetime(1990, 1, 1))
+        # nothing changed since the details were calculated
+        self._set_cache(self.node, revision=get_details_revision(self.channel.id))
 
         with self._check_details(node=self.node) as details:
             # check cache was returned
             self.assertDetailsEqual(details, self.default_details)
-            task_mock.enqueue.assert_not_called()
-
-    @patch("contentcuration.views.nodes.getnodedetails_task")
-    def test_get_node_details__cached__no_enqueue(self, task_mock):
-        # test last update handling
-        self._set_cache(self.node, last_update=datetime.datetime(2099, 1, 1))
+            task_mock.fetch_or_enqueue.assert_not_called()
 
+    def test_get_node_details__calculated_revision(self):
         with self._check_details(node=self.node) as details:
-            # check cache was returned
-            self.assertDetailsEqual(details, self.default_details)
-            task_mock.enqueue.assert_not_called()
+            self.assertEqual(details["revision"], get_details_revision(self.channel.id))
 
 
 class ChannelDetailsEndpointTestCase(BaseAPITestCase):
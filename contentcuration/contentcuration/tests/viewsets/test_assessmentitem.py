@@ -1,6 +1,7 @@
 import json
 import uuid
 
+import mock
 from django.urls import reverse
 from le_utils.constants import content_kinds
 from le_utils.constants import exercises
@@ -12,6 +13,8 @@ from contentcuration.tests.viewsets.base import generate_create_event
 from contentcuration.tests.viewsets.base import generate_delete_event
 from contentcuration.tests.viewsets.base import generate_update_event
 from contentcuration.tests.viewsets.base import SyncTestMixin
+from contentcuration.utils.storage_common import get_file_sizes
+from contentcuration.viewsets.assessmentitem import AssessmentItemViewSet
 from contentcuration.viewsets.sync.constants import ASSESSMENTITEM
 
 
@@ -232,6 +235,82 @@ class SyncTestCase(SyncTestMixin, StudioAPITestCase):
         except models.AssessmentItem.DoesNotExist:
             pass
 
+    def _create_assessmentitems_from_changes(self, assessmentitems):
+        # The sync endpoint applies changes one at a time, so call the bulk handler directly
+        viewset = AssessmentItemViewSet()
+        viewset.sync_initial(self.user)
+        return viewset.create_from_changes(
+            [
+                generate_create_event(
+                    [assessmentitem["contentnode"], assessmentitem["assessment_id"]],
+                    ASSESSMENTITEM,
+                    assessmentitem,
+                    channel_id=self.channel.id,
+                )
+                for assessmentitem in assessmentitems
+            ]
+        )
+
+    def test_create_assessmentitems_with_files_no_file_objects__bulk(self):
+        image_files = [
+            testdata.fileobj_exercise_image(color=color) for color in ("red", "blue")
+        ]
+        for image_file in image_files:
+            image_file.delete()
+
+        assessmentitems = []
+        for i in range(6):
+            image_file = image_files[i % 2]
+            assessmentitem = self.assessmentitem_metadata
+            assessmentitem["question"] = "![alt_text](${}/{}.{})".format(
+                exercises.CONTENT_STORAGE_PLACEHOLDER,
+                image_file.checksum,
+                image_file.file_format_id,
+            )
+            assessmentitems.append(assessmentitem)
+
+        with mock.patch(
+            "contentcuration.viewsets.assessmentitem.calculate_user_storage"
+        ) as calculate_user_storage, mock.patch(
+            "contentcuration.viewsets.assessmentitem.get_file_sizes",
+            wraps=get_file_sizes,
+        ) as mock_get_file_sizes:
+            errors = self._create_assessmentitems_from_changes(assessmentitems)
+
+        self.assertEqual([], errors)
+        calculate_user_storage.assert_called_once_with(self.user.id)
+        mock_get_file_sizes.assert_called_once()
+        for i, assessmentitem in enumerate(assessmentitems):
+            file = models.File.objects.get(
+                assessment_item__assessment_id=assessmentitem["assessment_id"]
+            )
+            self.assertEqual(image_files[i % 2].checksum, file.checksum)
+            self.assertEqual(image_files[i % 2].file_size, file.file_size)
+            self.assertEqual(self.user.id, file.uploaded_by_id)
+
+    def test_create_assessmentitems_with_files_no_file_uploaded__bulk(self):
+        image_file = testdata.fileobj_exercise_image()
+        image_file.delete()
+        assessmentitems = []
+        for checksum in (image_file.checksum, "123456789012345678901234567890ab"):
+            assessmentitem = self.assessmentitem_metadata
+            assessmentitem["question"] = "![alt_text](${}/{}.{})".format(
+                exercises.CONTENT_STORAGE_PLACEHOLDER, checksum, "jpg"
+            )
+            assessmentitems.append(assessmentitem)
+
+        errors = self._create_assessmentitems_from_changes(assessmentitems)
+
+        self.assertEqual(2, len(errors))
+        self.assertFalse(
+            models.AssessmentItem.objects.filter(
+                assessment_id__in=[ai["assessment_id"] for ai in assessmentitems]
+            ).exists()
+        )
+        self.assertFalse(
+            models.File.objects.filter(checksum=image_file.checksum).exists()
+        )
+
     def test_create_assessmentitem_with_file_answers(self):
         self.client.force_authenticate(user=self.user)
         assessmentitem = self.assessmentitem_metadata
@@ -4,9 +4,11 @@ import mock
 import pytest
 from django.conf import settings
 from django.core.management import call_command
+from django.db import connection
 from django.db.utils import OperationalError
 from django.test.testcases import TestCase
 from django.test.testcases import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django_concurrent_tests.errors import WrappedError
 from django_concurrent_tests.helpers import call_concurrently
@@ -30,9 +32,12 @@ from contentcuration.tests.viewsets.base import generate_publish_channel_event
 from contentcuration.tests.viewsets.base import generate_update_descendants_event
 from contentcuration.tests.viewsets.base import generate_update_event
 from contentcuration.tests.viewsets.base import SyncTestMixin
+from contentcuration.utils.cache import get_details_revision
 from contentcuration.utils.db_tools import TreeBuilder
 from contentcuration.viewsets.channel import _unpublished_changes_query
 from contentcuration.viewsets.contentnode import ContentNodeFilter
+from contentcuration.viewsets.contentnode import ContentNodeViewSet
+from contentcuration.viewsets.contentnode import set_tags
 from contentcuration.viewsets.sync.constants import CONTENTNODE
 from contentcuration.viewsets.sync.constants import CONTENTNODE_PREREQUISITE
 from contentcuration.viewsets.sync.constants import UPDATED
@@ -619,6 +624,22 @@ class SyncTestCase(SyncTestMixin, StudioAPITestCase):
             models.ContentNode.objects.get(id=contentnode.id).title, new_title
         )
 
+    def test_update_contentnode__details_revision(self):
+        contentnode = models.ContentNode.objects.create(**self.contentnode_db_metadata)
+        revision = get_details_revision(self.channel.id)
+
+        self.sync_changes(
+            [
+                generate_update_event(
+                    contentnode.id,
+                    CONTENTNODE,
+                    {"title": "This is not the old title"},
+                    channel_id=self.channel.id,
+                )
+            ],
+        )
+        self.assertNotEqual(get_details_revision(self.channel.id), revision)
+
     def test_cannot_update_contentnode_parent(self):
         contentnode = models.ContentNode.objects.create(**self.contentnode_db_metadata)
         contentnode2 = models.ContentNode.objects.create(**self.contentnode_db_metadata)
@@ -1370,6 +1391,97 @@ class SyncTestCase(SyncTestMixin, StudioAPITestCase):
             .exists()
         )
 
+    def test_update_contentnode_tags__constant_queries(self):
+        contentnodes = [
+            models.ContentNode.objects.create(**self.contentnode_db_metadata)
+            for _ in range(10)
+        ]
+        existing_tag = models.ContentTag.objects.create(tag_name="existing")
+        removed_tag = models.ContentTag.objects.create(tag_name="removed")
+        for contentnode in contentnodes:
+            contentnode.tags.add(removed_tag)
+
+        # one query to find the tags and relations, and one each to create the new tags,
+        # create the new relations and delete the removed relations
+        with self.assertNumQueries(4):
+            set_tags(
+                {
+                    contentnode.id: {"existing": True, "new": True, "removed": None}
+                    for contentnode in contentnodes
+                }
+            )
+
+        self.assertEqual(1, models.ContentTag.objects.filter(tag_name="new").count())
+        for contentnode in contentnodes:
+            self.assertEqual(
+                {"existing", "new"},
+                set(contentnode.tags.values_list("tag_name", flat=True)),
+            )
+        self.assertTrue(existing_tag.tagged_content.exists())
+
+    def _bulk_update_metadata_labels(self, contentnodes):
+        # The sync endpoint applies changes one at a time, so call the bulk handler directly
+        viewset = ContentNodeViewSet()
+        viewset.sync_initial(self.user)
+        return viewset.update_from_changes(
+            [
+                generate_update_event(
+                    contentnode.id,
+                    CONTENTNODE,
+                    {
+                        "title": "bulk title",
+                        "categories.{}".format(SUBJECTSLIST[0]): True,
+                        "categories.{}".format(SUBJECTSLIST[1]): None,
+                    },
+                    channel_id=self.channel.id,
+                )
+                for contentnode in contentnodes
+            ]
+        )
+
+    def test_update_contentnode_metadata_labels__bulk(self):
+        contentnodes = [
+            models.ContentNode.objects.create(**self.contentnode_db_metadata),
+            models.ContentNode.objects.create(
+                categories={SUBJECTSLIST[1]: True, SUBJECTSLIST[2]: True},
+                **self.contentnode_db_metadata,
+            ),
+        ]
+
+        self.assertEqual([], self._bulk_update_metadata_labels(contentnodes))
+
+        contentnodes = models.ContentNode.objects.filter(
+            id__in=[contentnode.id for contentnode in contentnodes]
+        ).order_by("categories")
+        self.assertEqual(
+            [{SUBJECTSLIST[0]: True}, {SUBJECTSLIST[0]: True, SUBJECTSLIST[2]: True}],
+            [contentnode.categories for contentnode in contentnodes],
+        )
+        for contentnode in contentnodes:
+            self.assertEqual("bulk title", contentnode.title)
+
+    def test_update_contentnode_metadata_labels__single_update_statement(self):
+        contentnodes = [
+            models.ContentNode.objects.create(**self.contentnode_db_metadata)
+            for _ in range(10)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual([], self._bulk_update_metadata_labels(contentnodes))
+
+        updates = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "contentcuration_contentnode"')
+        ]
+        self.assertEqual(1, len(updates))
+        self.assertEqual(
+            10,
+            models.ContentNode.objects.filter(
+                **{"categories__{}".format(SUBJECTSLIST[0]): True}
+            ).count(),
+        )
+
     def test_update_contentnode_tags_list(self):
         contentnode = models.ContentNode.objects.create(**self.contentnode_db_metadata)
         tag = "howzat!"
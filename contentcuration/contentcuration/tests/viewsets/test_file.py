@@ -590,6 +590,64 @@ class UploadFileURLTestCase(StudioAPITestCase):
 
         self.assertEqual(response.status_code, 400)
 
+    def _get_files(self, count):
+        return [
+            dict(self.file, checksum=uuid.uuid4().hex, name="file_{}".format(i))
+            for i in range(count)
+        ]
+
+    def test_upload_urls(self):
+        files = self._get_files(3)
+        models.File.objects.create(checksum=files[1]["checksum"], file_size=1000)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse("file-upload-urls"),
+            files,
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        for file, retval in zip(files, response.data):
+            self.assertIn("uploadURL", retval)
+            self.assertEqual(retval["file"]["checksum"], file["checksum"])
+            self.assertEqual(retval["file"]["original_filename"], file["name"])
+            self.assertEqual(retval["file"]["duration"], 10)
+            self.assertIsNone(retval["file"]["contentnode"])
+        self.assertEqual(
+            [False, True, False], [retval["might_skip"] for retval in response.data]
+        )
+        self.assertEqual(3, models.File.objects.filter(uploaded_by=self.user).count())
+
+    def test_upload_urls_insufficient_storage(self):
+        files = self._get_files(2)
+        files[1]["size"] = self.user.disk_space
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse("file-upload-urls"),
+            files,
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 412)
+        self.assertFalse(models.File.objects.filter(uploaded_by=self.user).exists())
+
+    def test_upload_urls_invalid_file(self):
+        files = self._get_files(2)
+        files[1]["file_format"] = file_formats.EPUB
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse("file-upload-urls"),
+            files,
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(models.File.objects.filter(uploaded_by=self.user).exists())
+
 
 class ContentIDTestCase(SyncTestMixin, StudioAPITestCase):
     def setUp(self):
@@ -0,0 +1,53 @@
+from django.urls import reverse
+
+from contentcuration.tests import testdata
+from contentcuration.tests.base import StudioAPITestCase
+from contentcuration.tests.helpers import assert_query_budget
+
+
+class QueryBudgetTestCase(StudioAPITestCase):
+    """
+    Budgets for the number of queries the main viewsets make, which should not grow with the
+    number of objects returned
+    """
+
+    def setUp(self):
+        super(QueryBudgetTestCase, self).setUp()
+        self.channel = testdata.channel()
+        self.user = testdata.user()
+        self.channel.editors.add(self.user)
+        self.client.force_authenticate(user=self.user)
+        self.node_ids = list(
+            self.channel.main_tree.get_descendants().values_list("id", flat=True)
+        )
+
+    def _assert_budget(self, budget, url, data):
+        with assert_query_budget(self, budget):
+            response = self.client.get(url, data=data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(response.data)
+
+    def test_channel_list(self):
+        self._assert_budget(3, reverse("channel-list"), {"edit": True})
+
+    def test_contentnode_list(self):
+        self._assert_budget(
+            3, reverse("contentnode-list"), {"id__in": ",".join(self.node_ids)}
+        )
+
+    def test_contentnode_children(self):
+        self._assert_budget(
+            4, reverse("contentnode-list"), {"parent": self.channel.main_tree_id}
+        )
+
+    def test_file_list(self):
+        self._assert_budget(
+            3, reverse("file-list"), {"contentnode__in": ",".join(self.node_ids)}
+        )
+
+    def test_assessmentitem_list(self):
+        self._assert_budget(
+            3,
+            reverse("assessmentitem-list"),
+            {"contentnode__in": ",".join(self.node_ids)},
+        )
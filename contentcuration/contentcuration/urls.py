@@ -183,6 +183,11 @@ urlpatterns += [
         settings_views.export_user_data,
         name="export_user_data",
     ),
+    re_path(
+        r"^api/download_user_data/$",
+        settings_views.download_user_data,
+        name="download_user_data",
+    ),
     re_path(
         r"^api/change_password/$",
         settings_views.UserPasswordChangeView.as_view(),
@@ -277,6 +282,11 @@ urlpatterns += [
         admin_views.send_custom_email,
         name="send_custom_email",
     ),
+    re_path(
+        r"^api/query_profiles/$",
+        admin_views.query_profiles,
+        name="query_profiles",
+    ),
 ]
 
 urlpatterns += [
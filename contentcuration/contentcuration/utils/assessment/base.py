@@ -4,20 +4,28 @@ import logging
 import os
 import re
 import zipfile
+import zlib
 from abc import ABC
 from abc import abstractmethod
 from io import BytesIO
-from tempfile import NamedTemporaryFile
-from tempfile import TemporaryDirectory
 
+from django.core.cache import cache
 from django.core.files import File
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage as storage
+from django.db import transaction
 from le_utils.constants import exercises
 from PIL import Image
 
 from contentcuration import models
+from contentcuration.constants.locking import RESIZE_IMAGE_LOCK
+from contentcuration.db.advisory_lock import advisory_lock
 
 
+# Maps an image checksum and the dimensions it was resized to, onto the filename of the
+# resized image in storage, so that each image is only resized once across all exercises
+RESIZED_IMAGE_CACHE_KEY = "resized_image:{checksum}:{width:g}x{height:g}"
+
 image_pattern = rf"!\[([^\]]*)]\(\${exercises.CONTENT_STORAGE_PLACEHOLDER}/([^\s)]+)(?:\s=([0-9\.]+)x([0-9\.]+))*[^)]*\)"
 
 
@@ -107,8 +115,10 @@ class ExerciseArchiveGenerator(ABC):
         self.user_id = user_id
         self.resized_images_map = {}
         self.assessment_items = []
+        # The archive paths of the files to write, in the order they will be written,
+        # and the content for each path, so that the archive can be assembled in memory.
         self.files_to_write = []
-        self.tempdir = None
+        self.file_contents = {}
 
     def write_to_zipfile(self, zf, filepath, content):
         """
@@ -124,25 +134,22 @@ class ExerciseArchiveGenerator(ABC):
         zf.writestr(info, content)
 
     def add_file_to_write(self, filepath, content):
-        if self.tempdir is None:
-            raise RuntimeError(
-                "Cannot add files to write before creating the temporary directory."
-            )
-        full_path = os.path.join(self.tempdir, filepath)
-        if os.path.exists(full_path):
+        if filepath in self.file_contents:
             return
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        with open(full_path, "wb") as f:
-            f.write(content)
-        self.files_to_write.append(full_path)
+        self.file_contents[filepath] = content
+        self.files_to_write.append(filepath)
 
     def _add_original_image(self, checksum, filename, new_file_path):
         """Extract original image handling"""
+        filepath = os.path.join(new_file_path, filename)
+        if filepath in self.file_contents:
+            # Already added for an earlier reference to the same image
+            return
         with storage.open(
             models.generate_object_storage_name(checksum, filename), "rb"
         ) as imgfile:
             original_content = imgfile.read()
-        self.add_file_to_write(os.path.join(new_file_path, filename), original_content)
+        self.add_file_to_write(filepath, original_content)
 
     def _get_similar_image(self, filename, width, height):
         if filename not in self.resized_images_map:
@@ -158,7 +165,50 @@ class ExerciseArchiveGenerator(ABC):
             ):
                 return resized_image
 
+    def _add_cached_resized_image(self, cache_key, new_file_path):
+        """
+        Add the image resized by a previous generator to the archive, if it is still in storage.
+        """
+        new_img_ref = cache.get(cache_key)
+        if new_img_ref is None:
+            return None
+        checksum, _ = os.path.splitext(new_img_ref)
+        try:
+            with storage.open(
+                models.generate_object_storage_name(checksum, new_img_ref), "rb"
+            ) as imgfile:
+                resized_content = imgfile.read()
+        except OSError:
+            return None
+        self.add_file_to_write(
+            os.path.join(new_file_path, new_img_ref), resized_content
+        )
+        return new_img_ref
+
     def _resize_image(self, checksum, ext, filename, width, height, new_file_path):
+        cache_key = RESIZED_IMAGE_CACHE_KEY.format(
+            checksum=checksum, width=width, height=height
+        )
+        new_img_ref = self._add_cached_resized_image(cache_key, new_file_path)
+        if new_img_ref is None:
+            with transaction.atomic():
+                # Lock on the image and dimensions, so that concurrent generators do not resize
+                # the same image, then check again in case another generator held the lock
+                advisory_lock(
+                    RESIZE_IMAGE_LOCK, key2=zlib.crc32(cache_key.encode("utf-8"))
+                )
+                new_img_ref = self._add_cached_resized_image(
+                    cache_key, new_file_path
+                ) or self._create_resized_image(
+                    checksum, ext, filename, width, height, new_file_path, cache_key
+                )
+        if new_img_ref:
+            self.resized_images_map[filename][(width, height)] = new_img_ref
+        return new_img_ref
+
+    def _create_resized_image(
+        self, checksum, ext, filename, width, height, new_file_path, cache_key
+    ):
         with storage.open(
             models.generate_object_storage_name(checksum, filename),
             "rb",
@@ -173,7 +223,12 @@ class ExerciseArchiveGenerator(ABC):
         resized_checksum = get_resized_image_checksum(resized_content)
 
         new_img_ref = f"{resized_checksum}{ext}"
-        self.resized_images_map[filename][(width, height)] = new_img_ref
+        storage_name = models.generate_object_storage_name(
+            resized_checksum, new_img_ref
+        )
+        if not storage.exists(storage_name):
+            storage.save(storage_name, ContentFile(resized_content))
+        cache.set(cache_key, new_img_ref, None)
         self.add_file_to_write(
             os.path.join(new_file_path, new_img_ref), resized_content
         )
@@ -338,44 +393,41 @@ class ExerciseArchiveGenerator(ABC):
 
     def _create_zipfile(self):
         filename = "{0}.{ext}".format(self.ccnode.title, ext=self.file_format)
-        with NamedTemporaryFile(suffix="zip") as tempf:
-            with zipfile.ZipFile(tempf.name, "w") as zf:
-                for file_path in self.files_to_write:
-                    with open(file_path, "rb") as f:
-                        self.write_to_zipfile(
-                            zf,
-                            os.path.relpath(file_path, self.tempdir),
-                            f.read(),
-                        )
-            file_size = tempf.tell()
-            tempf.flush()
-
-            self.ccnode.files.filter(preset_id=self.preset).delete()
-
-            assessment_file_obj = models.File.objects.create(
-                file_on_disk=File(open(tempf.name, "rb"), name=filename),
-                contentnode=self.ccnode,
-                file_format_id=self.file_format,
-                preset_id=self.preset,
-                original_filename=filename,
-                file_size=file_size,
-                uploaded_by_id=self.user_id,
-            )
-            logging.debug(
-                "Created exercise for {0} with checksum {1}".format(
-                    self.ccnode.title, assessment_file_obj.checksum
-                )
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zf:
+            for file_path in self.files_to_write:
+                self.write_to_zipfile(zf, file_path, self.file_contents[file_path])
+        file_size = buffer.tell()
+        # Set the checksum here, so the archive is uploaded from the buffer without
+        # being read through again to hash it when the file object is saved
+        checksum = hashlib.md5(buffer.getbuffer()).hexdigest()
+        buffer.seek(0)
+
+        self.ccnode.files.filter(preset_id=self.preset).delete()
+
+        assessment_file_obj = models.File.objects.create(
+            file_on_disk=File(buffer, name=filename),
+            checksum=checksum,
+            contentnode=self.ccnode,
+            file_format_id=self.file_format,
+            preset_id=self.preset,
+            original_filename=filename,
+            file_size=file_size,
+            uploaded_by_id=self.user_id,
+        )
+        logging.debug(
+            "Created exercise for {0} with checksum {1}".format(
+                self.ccnode.title, assessment_file_obj.checksum
             )
+        )
 
     def create_exercise_archive(self):
-        with TemporaryDirectory() as tempdir:
-            self.tempdir = tempdir
-            self.handle_before_assessment_items()
-            for question in (
-                self.ccnode.assessment_items.prefetch_related("files")
-                .all()
-                .order_by("order")
-            ):
-                self.process_assessment_item(question)
-            self.handle_after_assessment_items()
-            self._create_zipfile()
+        self.handle_before_assessment_items()
+        for question in (
+            self.ccnode.assessment_items.prefetch_related("files")
+            .all()
+            .order_by("order")
+        ):
+            self.process_assessment_item(question)
+        self.handle_after_assessment_items()
+        self._create_zipfile()
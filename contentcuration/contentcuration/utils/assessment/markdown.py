@@ -1,6 +1,9 @@
+import hashlib
 import re
 import xml.etree.ElementTree as ET
+from functools import lru_cache
 
+from django.core.cache import cache
 from latex2mathml.converter import convert
 from markdown_it import MarkdownIt
 from markdown_it.renderer import RendererProtocol
@@ -14,6 +17,15 @@ from contentcuration.utils.assessment.qti.mathml.core import Annotation
 from contentcuration.utils.assessment.qti.mathml.core import Semantics
 
 
+# Increment this whenever a change to the parsing or rendering below changes the rendered markup,
+# so that markup cached by an earlier version is not reused
+RENDERER_VERSION = 1
+
+RENDER_CACHE_KEY_PREFIX = "markdown_render"
+
+# Rendered markup is cached by a hash of its source, so it never goes stale
+RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
 # Regex patterns for $$ delimited math
 INLINE_PATTERN = re.compile(r"^\$\$([\s\S]+?)\$\$")
 BLOCK_PATTERN = re.compile(r"^\$\$([\s\S]+?)\$\$", re.M)
@@ -68,6 +80,8 @@ def math_block_func(
     return True
 
 
+# The same expressions recur across the questions and answers of an exercise, and across exercises
+@lru_cache(maxsize=4096)
 def _convert(latex, inline=True):
     # Remove the namespace declaration for cleaner output
     markup = convert(latex, display="inline" if inline else "block").replace(
@@ -131,5 +145,37 @@ def texmath_to_mathml_plugin(md: MarkdownIt) -> None:
 md = MarkdownIt("gfm-like").disable("linkify").use(texmath_to_mathml_plugin)
 
 
+def _render_cache_key(markdown):
+    return "{}:{}:{}".format(
+        RENDER_CACHE_KEY_PREFIX,
+        RENDERER_VERSION,
+        hashlib.sha256(markdown.encode("utf-8")).hexdigest(),
+    )
+
+
+def render_markdown_many(markdowns):
+    """
+    Renders a list of markdown strings, reusing any markup already cached for the same source,
+    with one cache lookup for the whole list, so unchanged content is not re-rendered on every publish.
+
+    :param markdowns: A list of markdown strings
+    :return: A list of the rendered markup, in the same order
+    """
+    cache_keys = {markdown: _render_cache_key(markdown) for markdown in markdowns}
+    cached = cache.get_many(list(cache_keys.values()))
+
+    rendered = {}
+    to_cache = {}
+    for markdown, cache_key in cache_keys.items():
+        if cache_key in cached:
+            rendered[markdown] = cached[cache_key]
+        else:
+            rendered[markdown] = to_cache[cache_key] = md.render(markdown)
+    if to_cache:
+        cache.set_many(to_cache, RENDER_CACHE_TIMEOUT)
+
+    return [rendered[markdown] for markdown in markdowns]
+
+
 def render_markdown(markdown):
-    return md.render(markdown)
+    return render_markdown_many([markdown])[0]
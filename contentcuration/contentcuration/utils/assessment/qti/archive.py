@@ -9,6 +9,7 @@ from le_utils.constants import format_presets
 
 from contentcuration.utils.assessment.base import ExerciseArchiveGenerator
 from contentcuration.utils.assessment.markdown import render_markdown
+from contentcuration.utils.assessment.markdown import render_markdown_many
 from contentcuration.utils.assessment.qti.assessment_item import AssessmentItem
 from contentcuration.utils.assessment.qti.assessment_item import CorrectResponse
 from contentcuration.utils.assessment.qti.assessment_item import ItemBody
@@ -68,6 +69,7 @@ class QTIExerciseGenerator(ExerciseArchiveGenerator):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.qti_items = []
+        self.rendered_markdown = {}
 
     def get_image_file_path(self) -> str:
         """Get the file path for QTI assessment items."""
@@ -84,9 +86,21 @@ class QTIExerciseGenerator(ExerciseArchiveGenerator):
         """Convert text content to QTI HTML flow content."""
         if not text.strip():
             return []
-        markup = render_markdown(text)
+        markup = self.rendered_markdown.get(text)
+        if markup is None:
+            markup = render_markdown(text)
         return ElementTreeBase.from_string(markup)
 
+    def _render_item_markdown(self, processed_data: Dict[str, Any]):
+        """Render all the markdown of an assessment item with a single cache lookup."""
+        texts = [processed_data["question"]] + [
+            answer["answer"]
+            for answer in processed_data.get("answers", [])
+            if isinstance(answer.get("answer"), str)
+        ]
+        texts = [text for text in texts if text.strip()]
+        self.rendered_markdown = dict(zip(texts, render_markdown_many(texts)))
+
     def _create_choice_interaction_and_response(
         self, processed_data: Dict[str, Any]
     ) -> Tuple[ChoiceInteraction, ResponseDeclaration]:
@@ -190,6 +204,8 @@ class QTIExerciseGenerator(ExerciseArchiveGenerator):
                 f"Perseus questions are not supported in QTI format: {assessment_item.assessment_id}"
             )
 
+        self._render_item_markdown(processed_data)
+
         if assessment_item.type in choice_interactions:
             (
                 interaction,
@@ -261,7 +277,8 @@ class QTIExerciseGenerator(ExerciseArchiveGenerator):
             qti_item_filepath = self._qti_item_filepath(qti_item.identifier)
             files = [ManifestFile(href=qti_item_filepath)]
             for dep in file_dependencies:
-                files.append(ManifestFile(href=dep))
+                # The dependencies were validated as attributes of the item
+                files.append(ManifestFile.construct_trusted(href=dep))
 
             resource = Resource(
                 identifier=qti_item.identifier,
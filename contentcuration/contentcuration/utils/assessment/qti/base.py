@@ -7,8 +7,11 @@ from typing import Annotated
 from typing import List
 from typing import Optional
 from typing import Set
+from typing import Tuple
 from typing import Type
 from typing import Union
+from xml.etree.ElementTree import _escape_attrib
+from xml.etree.ElementTree import _escape_cdata
 
 from pydantic import BaseModel
 from pydantic import BeforeValidator
@@ -39,23 +42,45 @@ class XMLElement(BaseModel, ABC):
     )
 
     # Private attributes (not included in Pydantic fields)
-    _file_dependencies: Set[str] = PrivateAttr(default_factory=set)
+    _file_dependencies: Optional[Set[str]] = PrivateAttr(default=None)
     _element: ET.Element = PrivateAttr(default=None)
+    _xml_string: Optional[str] = PrivateAttr(default=None)
 
     @classmethod
     def element_name(cls):
         return cls.__name__.lower()
 
-    def to_element(self) -> ET.Element:  # noqa: C901
-        if self._element:
-            return self._element
-
-        element = ET.Element(self.element_name())
+    @classmethod
+    def construct_trusted(cls, **data) -> "XMLElement":
+        """
+        Construct an element without validating the values passed for its fields.
+        Only use this for values that are already of the types of the fields,
+        for example TextNode rather than str for text content, as nothing will be coerced.
+        """
+        return cls.model_construct(**data)
 
-        self._file_dependencies = set()
+    @classmethod
+    def _get_field_plan(cls) -> Tuple[Tuple[str, str], ...]:
+        """
+        Get the names of the fields of this class paired with the names of the attributes
+        they are serialized to, which are computed once per class.
+        """
+        plan = _field_plans.get(cls)
+        if plan is None:
+            plan = tuple(
+                (field_name, _field_name_to_attr_name(field_name))
+                for field_name in cls.model_fields
+            )
+            _field_plans[cls] = plan
+        return plan
 
-        # Add attributes based on pydantic fields
-        for field_name in self.__class__.model_fields:
+    def _iter_fields(self):
+        """
+        Yield the fields that are set on this element as (attribute name, attribute value, children)
+        tuples, where children is a list of XMLElement and TextNode for fields that hold content,
+        and the attribute name and value are None.
+        """
+        for field_name, attr_name in self._get_field_plan():
 
             value = getattr(self, field_name)
 
@@ -64,27 +89,12 @@ class XMLElement(BaseModel, ABC):
                 continue
 
             if isinstance(value, (XMLElement, TextNode)):
-                value = [value]
+                yield None, None, [value]
+                continue
 
             if isinstance(value, list):
                 if all(isinstance(item, (XMLElement, TextNode)) for item in value):
-                    for item in value:
-                        if isinstance(item, XMLElement):
-                            child_elements = item.to_element()
-                            if not isinstance(child_elements, list):
-                                child_elements = [child_elements]
-                            for child_element in child_elements:
-                                element.append(child_element)
-                                self._file_dependencies |= item._file_dependencies
-                        else:
-                            current_children = list(element)
-                            if current_children:
-                                current_children[-1].tail = (
-                                    current_children[-1].tail or ""
-                                ) + item.text
-                            else:
-                                element.text = (element.text or "") + item.text
-
+                    yield None, None, value
                     continue
                 raise ValueError(
                     "List types should only contain XMLElement or TextNodes"
@@ -97,40 +107,110 @@ class XMLElement(BaseModel, ABC):
                 # Handle enum values
                 value = value.value
 
-            # Some attribute names are reserved Python keywords or Python builtins
-            # to allow this, we allow a trailing underscore which we strip here.
-            # All attributes use kebab-case, which we can't easily use as field names
-            # so we encode them as snake_case and convert to kebab-case here.
-            # Some attributes also include : which we encode as double underscore.
-            attr_name = field_name.rstrip("_").replace("__", ":").replace("_", "-")
-
-            # Set the attribute
-            element.set(attr_name, str(value))
-
-            if attr_name == "src" or attr_name == "href":
-                self._file_dependencies.add(value)
-            elif attr_name == "srcset":
-                entries = re.findall(srcset_entry_pattern, value)
-                for entry in entries:
-                    # Each entry is a tuple of (url, descriptors)
-                    url = entry[0].strip()
-                    self._file_dependencies.add(url)
+            yield attr_name, value, None
+
+    def _add_file_dependencies(self, attr_name, value):
+        if attr_name == "src" or attr_name == "href":
+            self._file_dependencies.add(value)
+        elif attr_name == "srcset":
+            entries = re.findall(srcset_entry_pattern, value)
+            for entry in entries:
+                # Each entry is a tuple of (url, descriptors)
+                url = entry[0].strip()
+                self._file_dependencies.add(url)
+
+    def to_element(self) -> ET.Element:
+        if self._element:
+            return self._element
+
+        element = ET.Element(self.element_name())
+
+        self._file_dependencies = set()
+
+        for attr_name, value, children in self._iter_fields():
+            if children is None:
+                element.set(attr_name, str(value))
+                self._add_file_dependencies(attr_name, value)
+                continue
+
+            for item in children:
+                if isinstance(item, XMLElement):
+                    element.append(item.to_element())
+                    self._file_dependencies |= item._file_dependencies
+                else:
+                    current_children = list(element)
+                    if current_children:
+                        current_children[-1].tail = (
+                            current_children[-1].tail or ""
+                        ) + item.text
+                    else:
+                        element.text = (element.text or "") + item.text
 
         self._element = element
 
         return self._element
 
+    def _write_xml(self, write):
+        """
+        Write the XML of this element and its descendants directly, producing the same output as
+        serializing the tree from to_element with ElementTree, without building that tree.
+        ElementTree's own escaping is used, so that the output stays byte for byte the same.
+        """
+        tag = self.element_name()
+        write("<" + tag)
+
+        self._file_dependencies = set()
+
+        contents = []
+        for attr_name, value, children in self._iter_fields():
+            if children is None:
+                write(' {}="{}"'.format(attr_name, _escape_attrib(str(value))))
+                self._add_file_dependencies(attr_name, value)
+            else:
+                contents.extend(children)
+
+        # Like ElementTree, only self-close elements without any child elements or text
+        if not any(isinstance(item, XMLElement) or item.text for item in contents):
+            write(" />")
+            return
+
+        write(">")
+        for item in contents:
+            if isinstance(item, XMLElement):
+                item._write_xml(write)
+                self._file_dependencies |= item._file_dependencies
+            elif item.text:
+                write(_escape_cdata(item.text))
+        write("</" + tag + ">")
+
     def to_xml_string(self) -> str:
         """Convert to XML string"""
-        element = self.to_element()
-        return ET.tostring(element, encoding="unicode")
+        if self._xml_string is None:
+            parts = []
+            self._write_xml(parts.append)
+            self._xml_string = "".join(parts)
+        return self._xml_string
 
     def get_file_dependencies(self) -> List[str]:
         # Ensure the element has been processed so that the file dependencies are collected.
-        self.to_element()
+        if self._file_dependencies is None:
+            self.to_xml_string()
         return list(self._file_dependencies)
 
 
+# Field plans of XMLElement classes, keyed by class
+_field_plans = {}
+
+
+def _field_name_to_attr_name(field_name: str) -> str:
+    # Some attribute names are reserved Python keywords or Python builtins
+    # to allow this, we allow a trailing underscore which we strip here.
+    # All attributes use kebab-case, which we can't easily use as field names
+    # so we encode them as snake_case and convert to kebab-case here.
+    # Some attributes also include : which we encode as double underscore.
+    return field_name.rstrip("_").replace("__", ":").replace("_", "-")
+
+
 class QTIBase(XMLElement):
     """
     A base class to allow us to conventionally generate element names from class names for QTI elements.
@@ -110,6 +110,41 @@ def delete_public_channel_cache_keys():
     django_cache.delete_many(list(PUBLIC_CHANNELS_CACHE_KEYS.values()))
 
 
+DETAILS_REVISION_KEY = "details_revision:{}"
+
+
+def get_details_revision(channel_id):
+    """
+    Gets the revision of a channel's content, which changes whenever changes are applied to the
+    channel, to tell whether the cached details of its nodes are outdated without scanning its tree.
+
+    :param channel_id: The id of the channel
+    :return: An integer revision
+    """
+    key = DETAILS_REVISION_KEY.format(channel_id)
+    revision = django_cache.get(key)
+    if revision is None:
+        # Start from the current time rather than zero, so that details cached against
+        # a revision that has since been evicted from the cache are still outdated
+        revision = int(time.time())
+        if not django_cache.add(key, revision, timeout=None):
+            revision = django_cache.get(key, revision)
+    return revision
+
+
+def bump_details_revision(channel_id):
+    """
+    Marks the cached details of the nodes in a channel as outdated
+
+    :param channel_id: The id of the channel
+    """
+    try:
+        django_cache.incr(DETAILS_REVISION_KEY.format(channel_id))
+    except ValueError:
+        # The revision isn't cached, so initialize a new one
+        get_details_revision(channel_id)
+
+
 def redis_retry(func):
     """
     This decorator wraps a function using the lower level Redis client to mimic functionality
@@ -228,3 +263,267 @@ class ResourceSizeCache:
         current_modified = self.get_modified()
         if current_modified and current_modified > modified:
             return self.set_modified(modified)
+
+
+# reservations are only held for in-flight uploads, which have presigned URLs valid for minutes
+UPLOAD_RESERVATION_TIMEOUT = 60 * 60  # seconds
+USER_CHECKSUMS_TIMEOUT = 24 * 60 * 60  # seconds
+# a member always added to the cached checksums, to tell an empty set from one not cached
+CHECKSUMS_SENTINEL = ""
+
+# Sets the reservations, unless that would take the total reserved over the limit, in one atomic step
+# KEYS: the reserved hash
+# ARGV: the limit, the reservation timeout, then pairs of checksums and sizes
+RESERVE_SCRIPT = """
+local sizes = {}
+local reserved = 0
+for i = 3, #ARGV, 2 do
+    sizes[ARGV[i]] = tonumber(ARGV[i + 1])
+end
+local existing = redis.call("HGETALL", KEYS[1])
+for i = 1, #existing, 2 do
+    if sizes[existing[i]] == nil then
+        reserved = reserved + tonumber(existing[i + 1])
+    end
+end
+for _, size in pairs(sizes) do
+    reserved = reserved + size
+end
+if reserved > tonumber(ARGV[1]) then
+    return 0
+end
+for checksum, size in pairs(sizes) do
+    redis.call("HSET", KEYS[1], checksum, size)
+end
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+
+# Adds checksums to the cached checksums, if they are cached, and releases their reservations
+# KEYS: the reserved hash, the checksums set
+# ARGV: the checksums
+ACTIVATE_SCRIPT = """
+local cached = redis.call("EXISTS", KEYS[2]) == 1
+for _, checksum in ipairs(ARGV) do
+    if cached then
+        redis.call("SADD", KEYS[2], checksum)
+    end
+    redis.call("HDEL", KEYS[1], checksum)
+end
+"""
+
+
+class UserStorageCache:
+    """
+    Helper class for the fast path of user storage quota checks, which avoids recalculating the
+    storage a user has used on every upload.
+
+    It stores the sizes of the files reserved by uploads that aren't yet among the user's active
+    files, keyed by checksum, and the set of checksums of the user's active files as of the last
+    calculation of their storage. Both need the atomic operations of Redis, so nothing is stored
+    if the django_cache isn't Redis.
+    """
+
+    def __init__(self, user_id, cache=None):
+        self.user_id = user_id
+        self.cache = cache or django_cache
+
+    @property
+    def redis_client(self):
+        """
+        Gets the lower level Redis client, if the cache is a Redis cache
+
+        :rtype: redis.client.StrictRedis
+        """
+        redis_client = None
+        cache_client = getattr(self.cache, "client", None)
+        if isinstance(cache_client, DefaultClient):
+            redis_client = cache_client.get_client(write=True)
+        return redis_client
+
+    @property
+    def reserved_key(self):
+        return "user_storage:{}:reserved".format(self.user_id)
+
+    @property
+    def checksums_key(self):
+        return "user_storage:{}:checksums".format(self.user_id)
+
+    @redis_retry
+    def reserve(self, sizes, limit):
+        """
+        Reserves space for files, unless that would take the total reserved over the limit
+        :param sizes: A dict of file sizes keyed by checksum
+        :param limit: The maximum number of bytes that may be reserved in total
+        :return: True if the space was reserved, False if not, or None if the cache isn't Redis
+        """
+        redis_client = self.redis_client
+        if redis_client is None:
+            return None
+        args = [limit, UPLOAD_RESERVATION_TIMEOUT]
+        for checksum, size in sizes.items():
+            args.extend((checksum, size))
+        reserve = redis_client.register_script(RESERVE_SCRIPT)
+        return bool(reserve(keys=[self.reserved_key], args=args))
+
+    @redis_retry
+    def get_reserved_checksums(self):
+        """
+        :return: A list of the checksums of the files with reserved space
+        """
+        redis_client = self.redis_client
+        if redis_client is None:
+            return []
+        return [
+            checksum.decode("utf-8")
+            for checksum in redis_client.hkeys(self.reserved_key)
+        ]
+
+    @redis_retry
+    def has_cached_checksums(self):
+        """
+        :return: Whether the checksums of the user's active files are cached, or None if the
+            cache isn't Redis
+        """
+        redis_client = self.redis_client
+        if redis_client is None:
+            return None
+        return bool(redis_client.exists(self.checksums_key))
+
+    @redis_retry
+    def get_cached_checksums(self, checksums):
+        """
+        :param checksums: A list of checksums
+        :return: The set of those checksums that are among the user's active files, or None if
+            the checksums of the user's active files aren't cached
+        """
+        redis_client = self.redis_client
+        if redis_client is None:
+            return None
+        pipeline = redis_client.pipeline()
+        pipeline.exists(self.checksums_key)
+        for checksum in checksums:
+            pipeline.sismember(self.checksums_key, checksum)
+        cached, *is_members = pipeline.execute()
+        if not cached:
+            return None
+        return {
+            checksum for checksum, is_member in zip(checksums, is_members) if is_member
+        }
+
+    @redis_retry
+    def reset(self, checksums):
+        """
+        Caches the checksums of the user's active files, once the storage a user has used has been
+        recalculated, and releases the reservations of files that are now among them
+        :param checksums: An iterable of the checksums of all the user's active files
+        """
+        redis_client = self.redis_client
+        if redis_client is None:
+            return
+        checksums = set(checksums)
+        released = [
+            checksum.decode("utf-8")
+            for checksum in redis_client.hkeys(self.reserved_key)
+            if checksum.decode("utf-8") in checksums
+        ]
+        pipeline = redis_client.pipeline()
+        if released:
+            pipeline.hdel(self.reserved_key, *released)
+        pipeline.delete(self.checksums_key)
+        pipeline.sadd(self.checksums_key, CHECKSUMS_SENTINEL, *checksums)
+        pipeline.expire(self.checksums_key, USER_CHECKSUMS_TIMEOUT)
+        pipeline.execute()
+
+    @redis_retry
+    def activate(self, checksums):
+        """
+        Adds files that have become active since the checksums were cached, releasing their
+        reservations
+        :param checksums: An iterable of the checksums of files that are now among the user's active files
+        """
+        redis_client = self.redis_client
+        checksums = list(checksums)
+        if redis_client is None or not checksums:
+            return
+        activate = redis_client.register_script(ACTIVATE_SCRIPT)
+        activate(keys=[self.reserved_key, self.checksums_key], args=checksums)
+
+
+# the minimum number of seconds between recalculations of the storage used by a user
+USER_STORAGE_CALCULATION_INTERVAL = 60
+# a recalculation is scheduled at most once for this many seconds, in case a scheduled one is lost
+USER_STORAGE_CALCULATION_SCHEDULED_TIMEOUT = 10 * USER_STORAGE_CALCULATION_INTERVAL
+
+
+class PendingUserStorageCache:
+    """
+    Helper class for debouncing recalculations of the storage users have used, which are requested
+    on almost every change to their files.
+
+    The ids of the users pending recalculation are added to a sorted set, scored by when they were
+    first added, and drained at most once every `USER_STORAGE_CALCULATION_INTERVAL` seconds. This
+    needs the atomic operations of Redis, so nothing is stored if the django_cache isn't Redis.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or django_cache
+
+    @property
+    def redis_client(self):
+        """
+        Gets the lower level Redis client, if the cache is a Redis cache
+
+        :rtype: redis.client.StrictRedis
+        """
+        redis_client = None
+        cache_client = getattr(self.cache, "client", None)
+        if isinstance(cache_client, DefaultClient):
+            redis_client = cache_client.get_client(write=True)
+        return redis_client
+
+    @property
+    def pending_key(self):
+        return "user_storage:pending"
+
+    @property
+    def scheduled_key(self):
+        return "user_storage:pending:scheduled"
+
+    @redis_retry
+    def add(self, user_id):
+        """
+        Marks the storage of a user as pending recalculation
+        :param user_id: The id of the user
+        :return: True if a recalculation of the pending users should be scheduled, False if one
+            already has been, or None if the cache isn't Redis
+        """
+        redis_client = self.redis_client
+        if redis_client is None:
+            return None
+        pipeline = redis_client.pipeline()
+        pipeline.zadd(self.pending_key, {user_id: time.time()}, nx=True)
+        pipeline.set(
+            self.scheduled_key,
+            1,
+            nx=True,
+            ex=USER_STORAGE_CALCULATION_SCHEDULED_TIMEOUT,
+        )
+        _, scheduled = pipeline.execute()
+        return bool(scheduled)
+
+    @redis_retry
+    def pop(self):
+        """
+        Removes all the users pending recalculation, so that the next user added schedules
+        another recalculation
+        :return: A list of the ids of the users, in the order they were added
+        """
+        redis_client = self.redis_client
+        if redis_client is None:
+            return []
+        pipeline = redis_client.pipeline()
+        pipeline.zrange(self.pending_key, 0, -1)
+        pipeline.delete(self.pending_key, self.scheduled_key)
+        user_ids, _ = pipeline.execute()
+        return [int(user_id) for user_id in user_ids]
@@ -2,6 +2,7 @@ import contextlib
 import hashlib
 import logging
 import math
+import time
 import uuid
 import zlib
 from collections import OrderedDict
@@ -9,34 +10,71 @@ from collections import OrderedDict
 from celery import states
 from celery.app.task import Task
 from celery.result import AsyncResult
+from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 
 from contentcuration.constants.locking import TASK_LOCK
 from contentcuration.db.advisory_lock import advisory_lock
+from contentcuration.utils.profiling import profile
 from contentcuration.utils.sentry import report_exception
 
 
 logger = logging.getLogger(__name__)
 
 
+# the minimum number of seconds between progress reports, as each report is a database write
+MIN_PROGRESS_REPORT_INTERVAL = 1.0
+
+# the id of the incomplete task matching a signature, which lets `fetch_or_enqueue` skip the database
+TASK_SIGNATURE_CACHE_KEY = "task_signature:{}"
+# a cached task is cleared once it finishes, so this only bounds how long one lost without finishing,
+# e.g. by revoking it through celery directly, is returned before the database is checked again
+TASK_SIGNATURE_CACHE_TIMEOUT = 60
+
+
 class ProgressTracker:
     """
     Helper to track task progress
+
+    Work can be split into weighted stages, each tracking its own progress against its own total:
+    ```
+        progress.set_stages(OrderedDict([("copy", 9), ("cleanup", 1)]))
+        with progress.stage("copy") as copy_progress:
+            copy_progress.set_total(len(nodes))
+            for node in nodes:
+                copy_progress.increment()
+    ```
     """
 
-    __slots__ = ("task_id", "send_event", "total", "progress", "last_reported_progress")
+    __slots__ = (
+        "task_id",
+        "send_event",
+        "total",
+        "progress",
+        "last_reported_progress",
+        "min_interval",
+        "last_reported_time",
+        "stage_weights",
+        "stage_timings",
+    )
 
-    def __init__(self, task_id, send_event):
+    def __init__(self, task_id, send_event, min_interval=MIN_PROGRESS_REPORT_INTERVAL):
         """
         :param task_id: The ID of the calling task
         :param send_event: Callback to send the task event
         :type send_event: Callable
+        :param min_interval: The minimum number of seconds between sending events
         """
         self.task_id = task_id
         self.send_event = send_event
         self.total = 100.0
         self.progress = 0.0
         self.last_reported_progress = 0.0
+        self.min_interval = min_interval
+        self.last_reported_time = None
+        self.stage_weights = OrderedDict()
+        self.stage_timings = OrderedDict()
 
     def set_total(self, total):
         """
@@ -44,6 +82,14 @@ class ProgressTracker:
         """
         self.total = total
 
+    def set_stages(self, stage_weights):
+        """
+        :param stage_weights: An ordered mapping of stage names to their expected relative cost
+        :type stage_weights: OrderedDict
+        """
+        self.stage_weights = OrderedDict(stage_weights)
+        self.set_total(sum(self.stage_weights.values()))
+
     def increment(self, increment=1.0):
         """
         Increments and triggers tracking of the progress to the task meta
@@ -56,16 +102,106 @@ class ProgressTracker:
         """
         self.progress = progress
 
-        # only update the task progress in >=1% increments
+        # only update the task progress in >=1% increments, and no more often than `min_interval`,
+        # except when reaching 100%
         if math.floor(self.last_reported_progress) < math.floor(self.task_progress):
-            self.last_reported_progress = self.task_progress
+            now = time.time()
+            if (
+                self.last_reported_time is None
+                or now - self.last_reported_time >= self.min_interval
+                or self.task_progress >= 100
+            ):
+                self.report(now)
+
+    def report(self, now=None):
+        """
+        Sends the current progress, and stage timings if there are any, regardless of throttling
+        """
+        self.last_reported_progress = self.task_progress
+        self.last_reported_time = now or time.time()
+        if self.stage_timings:
+            self.send_event(
+                progress=self.task_progress, stage_timings=dict(self.stage_timings)
+            )
+        else:
             self.send_event(progress=self.task_progress)
 
+    def _set_progress(self, progress):
+        self.progress = progress
+
+    def _stage_key(self, name):
+        return name
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Tracks a stage declared with `set_stages`, recording how long it took
+        :param name: The name of the stage
+        :return: A tracker for the progress within the stage, which can have stages of its own
+        :rtype: StageProgressTracker
+        """
+        offset = 0.0
+        for stage_name, weight in self.stage_weights.items():
+            if stage_name == name:
+                break
+            offset += weight
+        else:
+            raise KeyError("Unknown progress stage {}".format(name))
+
+        start = time.time()
+        self.track(offset)
+        try:
+            yield StageProgressTracker(self, self._stage_key(name), offset, weight)
+        finally:
+            self.stage_timings[self._stage_key(name)] = round(time.time() - start, 3)
+        self._set_progress(offset + weight)
+        self.report()
+
     @property
     def task_progress(self):
         return int(min((100.0 * self.progress / self.total), 100.0))
 
 
+class StageProgressTracker(ProgressTracker):
+    """
+    Tracks progress within a stage of a parent tracker, scaling it into the stage's share of the parent
+    """
+
+    __slots__ = ("parent", "name", "offset", "weight")
+
+    def __init__(self, parent, name, offset, weight):
+        """
+        :type parent: ProgressTracker
+        """
+        super(StageProgressTracker, self).__init__(
+            parent.task_id, parent.send_event, min_interval=parent.min_interval
+        )
+        self.parent = parent
+        self.name = name
+        self.offset = offset
+        self.weight = weight
+        # all timings are collected on the root tracker, keyed by the path of stage names
+        self.stage_timings = parent.stage_timings
+
+    def _scale(self, progress):
+        fraction = min(progress / self.total, 1.0) if self.total else 1.0
+        return self.offset + self.weight * fraction
+
+    def track(self, progress):
+        self.progress = progress
+        self.parent.track(self._scale(progress))
+
+    def _set_progress(self, progress):
+        self.progress = progress
+        self.parent._set_progress(self._scale(progress))
+
+    def report(self, now=None):
+        self.parent.report(now=now)
+
+    def _stage_key(self, name):
+        return "{}.{}".format(self.name, name)
+
+
 def get_task_model(ref, task_id):
     """
     Returns the task model for a task, will create one if not found
@@ -121,6 +257,15 @@ class CeleryTask(Task):
         """
         return self.backend.TaskModel
 
+    def __call__(self, *args, **kwargs):
+        """
+        Profiles the queries, cache lookups and time spent running the task, when QUERY_PROFILER_ENABLED
+        """
+        if not getattr(settings, "QUERY_PROFILER_ENABLED", False):
+            return super(CeleryTask, self).__call__(*args, **kwargs)
+        with profile("task {}".format(self.name)):
+            return super(CeleryTask, self).__call__(*args, **kwargs)
+
     def on_failure(self, exc, task_id, args, kwargs, einfo):
         """
         Report task failures to sentry as long as the exception is not one of the types for which it should `autoretry`
@@ -130,6 +275,14 @@ class CeleryTask(Task):
         ):
             report_exception(exc)
 
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        """
+        Clears the task from the cache used by `fetch_or_enqueue`, now that it has finished
+        """
+        cache_key = TASK_SIGNATURE_CACHE_KEY.format(self.generate_signature(kwargs))
+        if cache.get(cache_key) == task_id:
+            cache.delete(cache_key)
+
     def shadow_name(self, *args, **kwargs):
         """
         DO NOT add functionality here as that will make it impossible to rely on `.name` for finding task by name in the
@@ -212,7 +365,8 @@ class CeleryTask(Task):
         Enqueues the task called with `kwargs`, and requires the user who wants to enqueue it.
 
         :param user: User object of the user performing the operation
-        :param kwargs: Keyword arguments for task `apply_async`
+        :param kwargs: Keyword arguments for task `apply_async`, and optionally a `countdown` in seconds
+            before the task is run
         :return: The celery async result
         :rtype: CeleryAsyncResult
         """
@@ -222,6 +376,7 @@ class CeleryTask(Task):
         if user is None or not isinstance(user, User):
             raise TypeError("All tasks must be assigned to a user.")
 
+        countdown = kwargs.pop("countdown", None)
         signature = kwargs.pop("signature", None)
         if signature is None:
             signature = self.generate_signature(kwargs)
@@ -243,6 +398,7 @@ class CeleryTask(Task):
             task_id=task_id,
             task_name=self.name,
             kwargs=prepared_kwargs,
+            countdown=countdown,
         )
 
         # ensure the result is saved to the backend (database)
@@ -265,6 +421,16 @@ class CeleryTask(Task):
             return self.enqueue(user, **kwargs)
 
         signature = self.generate_signature(kwargs)
+        cache_key = TASK_SIGNATURE_CACHE_KEY.format(signature)
+
+        # a matching task that hasn't finished since it was fetched or enqueued is cached,
+        # so it can be returned without any queries
+        task_id = cache.get(cache_key)
+        if task_id is not None:
+            logging.info(
+                f"Fetched cached matching task {self.name} for user {user.pk} with id {task_id} | {signature}"
+            )
+            return self.fetch(task_id)
 
         # create an advisory lock to obtain exclusive control on preventing task duplicates
         with self._lock_signature(signature):
@@ -273,7 +439,7 @@ class CeleryTask(Task):
             if task_ids:
                 async_result = self.fetch(task_ids[0])
                 # double check
-                if async_result and async_result.status not in states.READY_STATES:
+                if async_result and self._cache_task(cache_key, async_result):
                     logging.info(
                         f"Fetched matching task {self.name} for user {user.pk} with id {async_result.id} | {signature}"
                     )
@@ -282,7 +448,22 @@ class CeleryTask(Task):
                 f"Didn't fetch matching task {self.name} for user {user.pk} | {signature}"
             )
             kwargs.update(signature=signature)
-            return self.enqueue(user, **kwargs)
+            async_result = self.enqueue(user, **kwargs)
+            self._cache_task(cache_key, async_result)
+            return async_result
+
+    def _cache_task(self, cache_key, async_result):
+        """
+        Caches the task for `fetch_or_enqueue`, unless it has already finished
+        :return: Whether the task was cached
+        """
+        cache.set(cache_key, async_result.id, TASK_SIGNATURE_CACHE_TIMEOUT)
+        # Check the status only after caching the task, so that if the task finishes in the meantime,
+        # either it's seen as finished here, or it clears the cache itself once finished
+        if async_result.status in states.READY_STATES:
+            cache.delete(cache_key)
+            return False
+        return True
 
     def requeue(self, **kwargs):
         """
@@ -330,6 +511,7 @@ class CeleryTask(Task):
             count += 1
         # be sure the database backend has these marked appropriately
         TaskResult.objects.filter(task_id__in=task_ids).update(status=states.REVOKED)
+        cache.delete(TASK_SIGNATURE_CACHE_KEY.format(signature))
         return count
 
 
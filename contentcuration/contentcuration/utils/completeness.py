@@ -0,0 +1,211 @@
+"""
+Set based evaluation of content node completeness.
+
+The rules are the same as those applied by `ContentNode.mark_complete`, but rather than
+issuing `exists` queries for every node, the node fields, default file presence and
+complete assessment item presence are fetched for a whole batch of nodes at once.
+"""
+import logging
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from le_utils.constants import content_kinds
+
+from contentcuration.models import AssessmentItem
+from contentcuration.models import COMPLETE_ASSESSMENT_ITEM_Q
+from contentcuration.models import ContentNode
+from contentcuration.models import File
+from contentcuration.models import get_completion_errors
+from contentcuration.models import License
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+NODE_VALUES = (
+    "id",
+    "title",
+    "parent_id",
+    "kind_id",
+    "license_id",
+    "license_description",
+    "copyright_holder",
+    "extra_fields",
+    "complete",
+)
+
+
+def _get_licenses():
+    return {license.id: license for license in License.objects.all()}
+
+
+def _fetch_node_values(node_ids):
+    return list(
+        ContentNode.objects.filter(id__in=node_ids).values(*NODE_VALUES).order_by()
+    )
+
+
+def _evaluate(nodes, licenses):
+    """
+    :param nodes: A list of dicts with the NODE_VALUES keys
+    :param licenses: A dict of License objects keyed by id
+    :return: A dict of error lists, keyed by node id
+    """
+    resource_ids = [
+        node["id"]
+        for node in nodes
+        if node["kind_id"] not in (content_kinds.TOPIC, content_kinds.EXERCISE)
+    ]
+    exercise_ids = [
+        node["id"] for node in nodes if node["kind_id"] == content_kinds.EXERCISE
+    ]
+
+    with_default_file = set()
+    if resource_ids:
+        with_default_file = set(
+            File.objects.filter(
+                contentnode_id__in=resource_ids, preset__supplementary=False
+            )
+            .values_list("contentnode_id", flat=True)
+            .order_by()
+            .distinct()
+        )
+
+    with_complete_item = set()
+    if exercise_ids:
+        with_complete_item = set(
+            AssessmentItem.objects.filter(contentnode_id__in=exercise_ids)
+            .filter(COMPLETE_ASSESSMENT_ITEM_Q)
+            .values_list("contentnode_id", flat=True)
+            .order_by()
+            .distinct()
+        )
+
+    errors = {}
+    for node in nodes:
+        node_id = node["id"]
+        errors[node_id] = get_completion_errors(
+            SimpleNamespace(**node),
+            licenses.get(node["license_id"]),
+            lambda: node_id in with_default_file,
+            lambda: node_id in with_complete_item,
+        )
+    return errors
+
+
+def get_completion_errors_for_nodes(node_ids):
+    """
+    Evaluate the completeness of many nodes in a constant number of queries.
+    :param node_ids: An iterable of content node ids
+    :return: A dict of error lists keyed by node id, an empty list means the node is complete
+    """
+    node_ids = list(node_ids)
+    if not node_ids:
+        return {}
+    return _evaluate(_fetch_node_values(node_ids), _get_licenses())
+
+
+def _update_completeness(nodes, errors, only_incomplete=False):
+    now_complete = []
+    now_incomplete = []
+    for node in nodes:
+        complete = not errors[node["id"]]
+        if node["complete"] is not complete:
+            if complete and not only_incomplete:
+                now_complete.append(node["id"])
+            elif not complete:
+                now_incomplete.append(node["id"])
+    if now_complete:
+        ContentNode.objects.filter(id__in=now_complete).order_by().update(complete=True)
+    if now_incomplete:
+        ContentNode.objects.filter(id__in=now_incomplete).order_by().update(
+            complete=False
+        )
+    return now_complete, now_incomplete
+
+
+def recalculate_completeness(node_ids, only_incomplete=False, licenses=None):
+    """
+    Evaluate the completeness of the passed nodes and persist the `complete` field
+    for any node where it has changed, using at most two UPDATE statements.
+    :param node_ids: An iterable of content node ids
+    :param only_incomplete: Only mark nodes as incomplete, never as complete
+    :param licenses: Optional dict of License objects keyed by id, to avoid refetching
+    :return: A tuple of lists of the ids of the nodes that were marked complete and incomplete
+    """
+    node_ids = list(node_ids)
+    if not node_ids:
+        return [], []
+    nodes = _fetch_node_values(node_ids)
+    errors = _evaluate(nodes, licenses if licenses is not None else _get_licenses())
+    return _update_completeness(nodes, errors, only_incomplete=only_incomplete)
+
+
+def iterate_node_id_batches(
+    queryset=None, batch_size=DEFAULT_BATCH_SIZE, start_after=None
+):
+    """
+    Iterate over the ids of the nodes in the queryset in primary key order, using keyset
+    pagination so that each batch is a cheap index range scan.
+    :param queryset: A ContentNode queryset, defaults to all nodes
+    :param batch_size: The number of ids per batch
+    :param start_after: Only return ids greater than this id, to resume a previous run
+    """
+    if queryset is None:
+        queryset = ContentNode.objects.all()
+    queryset = queryset.order_by("id")
+    last_id = start_after
+    while True:
+        batch_queryset = queryset
+        if last_id is not None:
+            batch_queryset = batch_queryset.filter(id__gt=last_id)
+        batch = list(batch_queryset.values_list("id", flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+def recalculate_all_completeness(
+    queryset=None,
+    batch_size=DEFAULT_BATCH_SIZE,
+    only_incomplete=False,
+    start_after=None,
+    checkpoint_key=None,
+):
+    """
+    Recalculate completeness for every node in the queryset in batches. Each batch is
+    updated in its own statement, so no long running transaction or table lock is held.
+    When a checkpoint_key is passed, the last processed id is stored in the cache after
+    every batch, and a run will resume from it when no start_after is passed.
+    :return: A tuple of the total number of nodes marked complete and incomplete
+    """
+    if start_after is None and checkpoint_key is not None:
+        start_after = cache.get(checkpoint_key)
+        if start_after is not None:
+            logger.info(
+                "Resuming completeness recalculation after {}".format(start_after)
+            )
+    licenses = _get_licenses()
+    total_complete = 0
+    total_incomplete = 0
+    processed = 0
+    for batch in iterate_node_id_batches(
+        queryset=queryset, batch_size=batch_size, start_after=start_after
+    ):
+        now_complete, now_incomplete = recalculate_completeness(
+            batch, only_incomplete=only_incomplete, licenses=licenses
+        )
+        total_complete += len(now_complete)
+        total_incomplete += len(now_incomplete)
+        processed += len(batch)
+        if checkpoint_key is not None:
+            cache.set(checkpoint_key, batch[-1], None)
+        logger.info(
+            "Processed {} nodes, marked {} complete and {} incomplete (last id {})".format(
+                processed, total_complete, total_incomplete, batch[-1]
+            )
+        )
+    if checkpoint_key is not None:
+        cache.delete(checkpoint_key)
+    return total_complete, total_incomplete
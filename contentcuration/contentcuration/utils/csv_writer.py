@@ -1,23 +1,35 @@
 import csv
+import gzip
 import io
 import os
 import re
 import sys
+import tempfile
 
 from django.conf import settings
 from django.contrib.sites.models import Site
+from django.core.files import File
+from django.core.files.storage import default_storage
 from django.db.models import OuterRef
 from django.db.models import Q
 from django.db.models import Subquery
+from django.utils.crypto import salted_hmac
 from django.utils.translation import gettext as _
 from le_utils.constants import content_kinds
 
+from contentcuration.constants import user_history
 from contentcuration.models import Channel
 from contentcuration.models import generate_storage_url
+from contentcuration.models import UserHistory
 
 if not os.path.exists(settings.CSV_ROOT):
     os.makedirs(settings.CSV_ROOT)
 
+# rows are fetched through a server side cursor in chunks of this size
+USER_CSV_CHUNK_SIZE = 2000
+
+CONTENT_KIND_NAMES = dict(content_kinds.choices)
+
 
 # Formatting helpers
 
@@ -42,20 +54,22 @@ def generate_user_csv_filename(user):
     )
 
 
+def generate_user_csv_storage_path(user):
+    """
+    The path of a user's compressed CSV in storage, which includes a keyed hash of their id
+    so that it can't be guessed from the id alone
+    """
+    token = salted_hmac("generate_user_csv_storage_path", user.id).hexdigest()
+    return "/".join([settings.CSV_ROOT, "users", "{}-{}.csv.gz".format(user.id, token)])
+
+
 def _write_user_row(file, writer, domain):
     filename = "{}.{}".format(file["checksum"], file["file_format__extension"])
     writer.writerow(
         [
             file["channel_name"] or _("No Channel"),
             file["contentnode__title"] or _("No resource"),
-            next(
-                (
-                    k[1]
-                    for k in content_kinds.choices
-                    if k[0] == file["contentnode__kind_id"]
-                ),
-                "",
-            ),
+            CONTENT_KIND_NAMES.get(file["contentnode__kind_id"], ""),
             file["original_filename"],
             _format_size(file["file_size"] or 0),
             generate_storage_url(filename),
@@ -70,6 +84,84 @@ def _write_user_row(file, writer, domain):
     )
 
 
+def _write_user_rows(user, csvfile):
+    writer = csv.writer(csvfile, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+
+    writer.writerow(
+        [
+            _("Channel"),
+            _("Title"),
+            _("Kind"),
+            _("Filename"),
+            _("File Size"),
+            _("URL"),
+            _("Description"),
+            _("Author"),
+            _("Language"),
+            _("License"),
+            _("License Description"),
+            _("Copyright Holder"),
+        ]
+    )
+
+    domain = Site.objects.get(pk=1).domain
+
+    # Get all user files
+    channel_query = Channel.objects.filter(
+        Q(main_tree__tree_id=OuterRef("contentnode__tree_id"))
+        | Q(trash_tree__tree_id=OuterRef("contentnode__tree_id"))
+    )
+
+    user_files = (
+        user.files.select_related("language", "contentnode", "file_format")
+        .annotate(
+            channel_name=Subquery(channel_query.values_list("name", flat=True)[:1])
+        )
+        .values(
+            "channel_name",
+            "original_filename",
+            "file_size",
+            "checksum",
+            "file_format__extension",
+            "language__readable_name",
+            "contentnode__title",
+            "contentnode__language__readable_name",
+            "contentnode__license__license_name",
+            "contentnode__kind_id",
+            "contentnode__description",
+            "contentnode__author",
+            "contentnode__provider",
+            "contentnode__aggregator",
+            "contentnode__license_description",
+            "contentnode__copyright_holder",
+        )
+    )
+    # Iterate rather than fetching every file at once, so that memory use stays
+    # bounded for users with very many files
+    for file in user_files.iterator(chunk_size=USER_CSV_CHUNK_SIZE):
+        _write_user_row(file, writer, domain)
+
+    for file_size in user.staged_files.values_list("file_size", flat=True).iterator(
+        chunk_size=USER_CSV_CHUNK_SIZE
+    ):
+        writer.writerow(
+            [
+                _("No Channel"),
+                _("No Resource"),
+                "",
+                _("Staged File"),
+                _format_size(file_size),
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+            ]
+        )
+
+
 def write_user_csv(user, path=None):
     csv_path = path or generate_user_csv_filename(user)
     mode = "wb"
@@ -79,77 +171,28 @@ def write_user_csv(user, path=None):
         mode = "w"
         encoding = "utf-8"
     with io.open(csv_path, mode, encoding=encoding) as csvfile:
-        writer = csv.writer(csvfile, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+        _write_user_rows(user, csvfile)
 
-        writer.writerow(
-            [
-                _("Channel"),
-                _("Title"),
-                _("Kind"),
-                _("Filename"),
-                _("File Size"),
-                _("URL"),
-                _("Description"),
-                _("Author"),
-                _("Language"),
-                _("License"),
-                _("License Description"),
-                _("Copyright Holder"),
-            ]
-        )
-
-        domain = Site.objects.get(pk=1).domain
+    return csv_path
 
-        # Get all user files
-        channel_query = Channel.objects.filter(
-            Q(main_tree__tree_id=OuterRef("contentnode__tree_id"))
-            | Q(trash_tree__tree_id=OuterRef("contentnode__tree_id"))
-        )
 
-        user_files = (
-            user.files.select_related("language", "contentnode", "file_format")
-            .annotate(
-                channel_name=Subquery(channel_query.values_list("name", flat=True)[:1])
-            )
-            .values(
-                "channel_name",
-                "original_filename",
-                "file_size",
-                "checksum",
-                "file_format__extension",
-                "language__readable_name",
-                "contentnode__title",
-                "contentnode__language__readable_name",
-                "contentnode__license__license_name",
-                "contentnode__kind_id",
-                "contentnode__description",
-                "contentnode__author",
-                "contentnode__provider",
-                "contentnode__aggregator",
-                "contentnode__license_description",
-                "contentnode__copyright_holder",
-            )
-        )
-        for file in user_files:
-            _write_user_row(file, writer, domain)
-
-        for file in user.staged_files.all():
-            file_size = _format_size(file.file_size)
-            writer.writerow(
-                [
-                    _("No Channel"),
-                    _("No Resource"),
-                    "",
-                    _("Staged File"),
-                    file_size,
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                ]
-            )
-
-    return csv_path
+def write_user_csv_to_storage(user):
+    """
+    Writes a user's CSV compressed with gzip, and saves it to storage to be downloaded,
+    as it can be too large to attach to an email. The export is recorded in the user's history,
+    so that it can be deleted after USER_CSV_EXPORT_RETENTION days
+
+    :return: The path of the CSV in storage
+    """
+    storage_path = generate_user_csv_storage_path(user)
+    with tempfile.TemporaryFile() as tempf:
+        with gzip.GzipFile(fileobj=tempf, mode="wb") as compressed:
+            with io.TextIOWrapper(compressed, encoding="utf-8", newline="") as csvfile:
+                _write_user_rows(user, csvfile)
+        # Replace any previous export, rather than saving under an alternative name
+        if default_storage.exists(storage_path):
+            default_storage.delete(storage_path)
+        tempf.seek(0)
+        default_storage.save(storage_path, File(tempf))
+    UserHistory.objects.create(user_id=user.id, action=user_history.CSV_EXPORT)
+    return storage_path
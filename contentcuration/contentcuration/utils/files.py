@@ -4,10 +4,12 @@ import os
 import re
 import tempfile
 from io import BytesIO
+from itertools import islice
 from multiprocessing.dummy import Pool
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage
 from le_utils.constants import file_formats
 from PIL import Image
@@ -19,6 +21,10 @@ from contentcuration.models import generate_object_storage_name
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 THUMBNAIL_WIDTH = 400
+THUMBNAIL_ENCODING_CACHE_KEY = "thumbnail_encoding:{filename}:{dimension}"
+THUMBNAIL_ENCODING_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+THUMBNAIL_ENCODING_POOL_SIZE = 4
+THUMBNAIL_ENCODING_CHUNK_SIZE = 100
 
 
 def create_file_from_contents(
@@ -85,6 +91,20 @@ def duplicate_file(
     return file_copy
 
 
+def _get_thumbnail_encoding_cache_key(filename, dimension):
+    # Files in storage are named by their checksum, so the encoding can be shared
+    # by every node, channel and publish that uses the same image
+    return THUMBNAIL_ENCODING_CACHE_KEY.format(
+        filename=os.path.basename(filename.split("?")[0]), dimension=dimension
+    )
+
+
+def _is_storage_file(filename):
+    return not filename.startswith("data:image") and not filename.startswith(
+        settings.STATIC_ROOT
+    )
+
+
 def get_thumbnail_encoding(filename, dimension=THUMBNAIL_WIDTH):
     """
     Generates a base64 encoding for a thumbnail
@@ -94,6 +114,65 @@ def get_thumbnail_encoding(filename, dimension=THUMBNAIL_WIDTH):
     Returns base64 encoding of resized thumbnail
     """
 
+    if not _is_storage_file(filename):
+        return _encode_thumbnail(filename, dimension)
+
+    cache_key = _get_thumbnail_encoding_cache_key(filename, dimension)
+    encoding = cache.get(cache_key)
+    if encoding is None:
+        encoding = _encode_thumbnail(filename, dimension)
+        cache.set(cache_key, encoding, THUMBNAIL_ENCODING_CACHE_TIMEOUT)
+    return encoding
+
+
+def cache_thumbnail_encodings(filenames, dimension=THUMBNAIL_WIDTH):
+    """
+    Generates and caches the base64 encodings of many thumbnails, downloading and encoding those
+    that aren't already cached in parallel. The thumbnails are processed in chunks, so that only
+    one chunk of encodings is held in memory at a time
+    Args:
+        filenames (iterable): thumbnails to generate encodings from (must be in storage already)
+        dimension (int, optional): desired width of thumbnails. Defaults to 400.
+    Returns the number of thumbnails that were newly encoded
+    """
+
+    def encode_thumbnail(filename):
+        try:
+            return filename, _encode_thumbnail(filename, dimension)
+        except IOError:
+            return filename, None
+
+    encoded = 0
+    filenames = (filename for filename in filenames if _is_storage_file(filename))
+    # Most of the time is spent downloading the images, or in PIL, which releases the GIL
+    # while decoding and resizing, so a pool of threads is enough to encode them in parallel
+    pool = Pool(THUMBNAIL_ENCODING_POOL_SIZE)
+    try:
+        while True:
+            cache_keys = {
+                filename: _get_thumbnail_encoding_cache_key(filename, dimension)
+                for filename in islice(filenames, THUMBNAIL_ENCODING_CHUNK_SIZE)
+            }
+            if not cache_keys:
+                break
+            cached = cache.get_many(cache_keys.values())
+            missing = [
+                filename for filename, key in cache_keys.items() if key not in cached
+            ]
+            new_encodings = {
+                cache_keys[filename]: encoding
+                for filename, encoding in pool.map(encode_thumbnail, missing)
+                if encoding is not None
+            }
+            if new_encodings:
+                cache.set_many(new_encodings, THUMBNAIL_ENCODING_CACHE_TIMEOUT)
+            encoded += len(new_encodings)
+    finally:
+        pool.close()
+    return encoded
+
+
+def _encode_thumbnail(filename, dimension):
     if filename.startswith("data:image"):
         return filename
 
@@ -127,6 +206,8 @@ def get_thumbnail_encoding(filename, dimension=THUMBNAIL_WIDTH):
             # aspect ratio. So a square image will remain square rather
             # than being distorted to a 16:9 aspect ratio. This removes
             # the need to make any changes like cropping the image.
+            # For JPEGs it also uses draft mode, to only decode the image at
+            # the smallest scale that is still larger than the thumbnail.
             image.thumbnail(thumbnail_size, Image.LANCZOS)
 
             image.save(outbuffer, image_format)
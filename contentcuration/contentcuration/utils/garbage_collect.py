@@ -8,6 +8,8 @@ import logging
 from celery import states
 from django.conf import settings
 from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
 from django.db.models import Subquery
 from django.db.models.expressions import CombinedExpression
 from django.db.models.expressions import Exists
@@ -17,16 +19,28 @@ from django.db.models.expressions import Value
 from django.db.models.signals import post_delete
 from django.utils.timezone import now
 from django_celery_results.models import TaskResult
+from kolibri_public.models import LocalFile as PublicLocalFile
 from le_utils.constants import content_kinds
+from search.models import ContentNodeFullTextSearch
 
 from contentcuration.constants import feature_flags
 from contentcuration.constants import user_history
 from contentcuration.db.models.functions import JSONObjectKeys
+from contentcuration.models import AssessmentItem
+from contentcuration.models import Channel
 from contentcuration.models import ContentNode
 from contentcuration.models import CustomTaskMetadata
 from contentcuration.models import File
+from contentcuration.models import PrerequisiteContentRelationship
+from contentcuration.models import RelatedContentRelationship
+from contentcuration.models import SlideshowSlide
 from contentcuration.models import User
 from contentcuration.models import UserHistory
+from contentcuration.utils.csv_writer import generate_user_csv_storage_path
+from contentcuration.utils.storage_common import delete_files
+
+
+CONTENTNODE_BATCH_SIZE = 10000
 
 
 class DisablePostDeleteSignal(object):
@@ -51,26 +65,74 @@ def get_deleted_chefs_root():
     return deleted_chefs_node
 
 
-def _clean_up_files(contentnode_ids):
+class CleanUpReport(object):
+    """
+    Tallies what a clean up deleted, or would have deleted when doing a dry run
+    """
+
+    __slots__ = ("nodes", "files", "blobs", "bytes")
+
+    def __init__(self):
+        self.nodes = 0
+        self.files = 0
+        self.blobs = 0
+        self.bytes = 0
+
+    def __str__(self):
+        return "{} node(s), {} file record(s), {} file(s) in storage totalling {} bytes".format(
+            self.nodes, self.files, self.blobs, self.bytes
+        )
+
+
+def _clean_up_files(
+    contentnode_ids, report=None, dry_run=False, delete_storage_files=False
+):
     """
     Clean up the files (both in the DB and in object storage)
     associated with the `contentnode_ids` iterable that are
     not pointed by any other contentnode.
+
+    Files are only deleted from object storage when `delete_storage_files` is set, otherwise
+    they are only counted in the report. Even then, a file is kept in storage when any other
+    file record shares its path or checksum, when its node has been published, or when its
+    checksum is part of a public channel, as published channel databases refer to files by
+    checksum and may still be downloaded.
     """
+    report = report or CleanUpReport()
     files = File.objects.filter(contentnode__in=contentnode_ids)
-    files_on_storage = files.values_list("file_on_disk", flat=True)
-
-    for disk_file_path in files_on_storage:
-        is_other_node_pointing = Exists(
-            File.objects.filter(file_on_disk=disk_file_path).exclude(
-                contentnode__in=contentnode_ids
+    other_files = File.objects.exclude(contentnode__in=contentnode_ids)
+
+    # a single anti-join finds all files in storage that nothing outside of these nodes points at
+    orphaned_files = dict(
+        files.exclude(file_on_disk="")
+        .exclude(contentnode__published=True)
+        .filter(
+            ~Exists(other_files.filter(file_on_disk=OuterRef("file_on_disk"))),
+            ~Exists(other_files.filter(checksum=OuterRef("checksum"))),
+            ~Exists(PublicLocalFile.objects.filter(id=OuterRef("checksum"))),
+        )
+        .values_list("file_on_disk", "file_size")
+        .distinct()
+    )
+    report.blobs += len(orphaned_files)
+    report.bytes += sum(size or 0 for size in orphaned_files.values())
+
+    if dry_run:
+        report.files += files.count()
+        return report
+
+    if delete_storage_files:
+        delete_files(orphaned_files.keys())
+    elif orphaned_files:
+        logging.info(
+            "Leaving {} unreferenced file(s) in storage, as deleting storage files is not enabled".format(
+                len(orphaned_files)
             )
         )
-        if not is_other_node_pointing:
-            default_storage.delete(disk_file_path)
 
     # use _raw_delete for much fast file deletions
-    files._raw_delete(files.db)
+    report.files += files._raw_delete(files.db)
+    return report
 
 
 def clean_up_soft_deleted_users():
@@ -103,30 +165,111 @@ def clean_up_soft_deleted_users():
         logging.info("Hard deleted user related data for user {}.".format(user.email))
 
 
-def clean_up_deleted_chefs():
+def _is_own_tree(node, deleted_chefs_node):
+    """
+    Whether `node` was the root of its MPTT tree before it was moved under the deleted chefs root,
+    which is done with MPTT updates disabled, so that its whole tree can be deleted by `tree_id`
+    """
+    return (
+        node.lft == 1
+        and node.tree_id != deleted_chefs_node.tree_id
+        and not ContentNode.objects.filter(
+            tree_id=node.tree_id, parent__isnull=True
+        ).exists()
+    )
+
+
+def _delete_tree(tree_id, report, dry_run=False):
+    """
+    Deletes all nodes in the tree, and all records that depend on them, with bulk raw deletes
+    instead of collecting every related object as Django's cascading delete would.
+    """
+    nodes = ContentNode.objects.filter(tree_id=tree_id)
+    files = File.objects.filter(
+        Q(contentnode__tree_id=tree_id)
+        | Q(assessment_item__contentnode__tree_id=tree_id)
+        | Q(slideshow_slide__contentnode__tree_id=tree_id)
+    )
+
+    if dry_run:
+        report.nodes += nodes.count()
+        report.files += files.count()
+        return
+
+    with transaction.atomic():
+        # clear references from outside of the tree that would otherwise be set to null on delete
+        for field in (
+            "main_tree",
+            "chef_tree",
+            "trash_tree",
+            "staging_tree",
+            "previous_tree",
+            "clipboard_tree",
+        ):
+            Channel.objects.filter(**{field + "__tree_id": tree_id}).update(
+                **{field: None}
+            )
+        User.objects.filter(clipboard_tree__tree_id=tree_id).update(clipboard_tree=None)
+        for field in ("original_node", "cloned_source"):
+            ContentNode.objects.filter(**{field + "__tree_id": tree_id}).exclude(
+                tree_id=tree_id
+            ).update(**{field: None})
+
+        # don't delete files from storage until we can ensure they are not referenced anywhere.
+        report.files += files._raw_delete(files.db)
+        for queryset in (
+            AssessmentItem.objects.filter(contentnode__tree_id=tree_id),
+            SlideshowSlide.objects.filter(contentnode__tree_id=tree_id),
+            PrerequisiteContentRelationship.objects.filter(
+                Q(target_node__tree_id=tree_id) | Q(prerequisite__tree_id=tree_id)
+            ),
+            RelatedContentRelationship.objects.filter(
+                Q(contentnode_1__tree_id=tree_id) | Q(contentnode_2__tree_id=tree_id)
+            ),
+            ContentNode.tags.through.objects.filter(contentnode__tree_id=tree_id),
+            ContentNodeFullTextSearch.objects.filter(contentnode__tree_id=tree_id),
+        ):
+            queryset._raw_delete(queryset.db)
+        report.nodes += nodes._raw_delete(nodes.db)
+
+
+def clean_up_deleted_chefs(dry_run=False):
     """
     Clean up all deleted chefs attached to the deleted chefs tree, including all
     child nodes in that tree.
 
     """
+    report = CleanUpReport()
     deleted_chefs_node = get_deleted_chefs_root()
-    # we cannot use MPTT methods like get_descendants() or use tree_id because for performance reasons
-    # we are avoiding MPTT entirely.
+    # we cannot use MPTT methods like get_descendants() because for performance reasons
+    # we are avoiding MPTT entirely, but the old trees keep their own tree_id when moved.
     nodes_to_clean_up = ContentNode.objects.filter(parent=deleted_chefs_node)
 
-    # don't delete files until we can ensure files are not referenced anywhere.
     # disable mptt updates as they are disabled when we insert nodes into this tree
     with ContentNode.objects.disable_mptt_updates(), DisablePostDeleteSignal():
         for i, node in enumerate(nodes_to_clean_up):
-            try:
-                node.delete()
-            except ContentNode.DoesNotExist:
-                # If it doesn't exist, job done!
-                pass
-            logging.info("Deleted {} node(s) from the deleted chef tree".format(i + 1))
-
-
-def clean_up_contentnodes(delete_older_than=settings.ORPHAN_DATE_CLEAN_UP_THRESHOLD):
+            if _is_own_tree(node, deleted_chefs_node):
+                _delete_tree(node.tree_id, report, dry_run=dry_run)
+            elif dry_run:
+                report.nodes += 1
+            else:
+                try:
+                    node.delete()
+                except ContentNode.DoesNotExist:
+                    # If it doesn't exist, job done!
+                    pass
+                report.nodes += 1
+            logging.info("Deleted {} tree(s) from the deleted chef tree".format(i + 1))
+
+    return report
+
+
+def clean_up_contentnodes(
+    delete_older_than=settings.ORPHAN_DATE_CLEAN_UP_THRESHOLD,
+    dry_run=False,
+    batch_size=CONTENTNODE_BATCH_SIZE,
+    delete_storage_files=False,
+):
     """
     Clean up all contentnodes associated with the orphan tree with a `created`
     time older than `delete_older_than`, as well as all files (and their file
@@ -135,22 +278,47 @@ def clean_up_contentnodes(delete_older_than=settings.ORPHAN_DATE_CLEAN_UP_THRESH
     delete_older_than=The age of the contentnode from the current time, before
     it's deleted. Default is two weeks from datetime.now().
 
+    Nodes are deleted in batches of `batch_size`, so no single delete holds locks for long.
+    When doing a dry run, only the orphaned nodes themselves are counted, not their descendants.
+    Files in object storage are only deleted when `delete_storage_files` is set, see `_clean_up_files`.
     """
+    report = CleanUpReport()
     nodes_to_clean_up = ContentNode.objects.filter(
         modified__lt=delete_older_than, parent_id=settings.ORPHANAGE_ROOT_ID
-    )
+    ).order_by("id")
+
+    last_id = None
+    while True:
+        batch = nodes_to_clean_up
+        if last_id is not None:
+            batch = batch.filter(id__gt=last_id)
+        node_ids = list(batch.values_list("id", flat=True)[:batch_size])
+        if not node_ids:
+            break
+        last_id = node_ids[-1]
+
+        # delete all files first
+        with DisablePostDeleteSignal():
+            _clean_up_files(
+                node_ids,
+                report=report,
+                dry_run=dry_run,
+                delete_storage_files=delete_storage_files,
+            )
 
-    # delete all files first
-    with DisablePostDeleteSignal():
-        _clean_up_files(nodes_to_clean_up)
+        if dry_run:
+            report.nodes += len(node_ids)
+            continue
 
-    # Use _raw_delete for fast bulk deletions
-    try:
-        with DisablePostDeleteSignal():
-            count, _ = nodes_to_clean_up.delete()
-        logging.info("Deleted {} node(s) from the orphanage tree".format(count))
-    except ContentNode.DoesNotExist:
-        pass
+        try:
+            with DisablePostDeleteSignal():
+                _, counts = ContentNode.objects.filter(id__in=node_ids).delete()
+            report.nodes += counts.get(ContentNode._meta.label, 0)
+        except ContentNode.DoesNotExist:
+            pass
+        logging.info("Deleted {} node(s) from the orphanage tree".format(report.nodes))
+
+    return report
 
 
 def clean_up_feature_flags():
@@ -173,7 +341,7 @@ def clean_up_feature_flags():
         )
 
 
-def clean_up_tasks():
+def clean_up_tasks(dry_run=False):
     """
     Removes completed tasks that are older than a week
     """
@@ -183,17 +351,67 @@ def clean_up_tasks():
         tasks_to_delete = TaskResult.objects.filter(
             date_done__lt=date_cutoff, status__in=states.READY_STATES
         )
+        if dry_run:
+            count = tasks_to_delete.count()
+            logging.info("Would delete {} completed task(s)".format(count))
+            return count
         CustomTaskMetadata.objects.filter(
             task_id__in=tasks_to_delete.values_list("task_id", flat=True)
         ).delete()
         count, _ = tasks_to_delete.delete()
     logging.info("Deleted {} completed task(s) from the task table".format(count))
+    return count
+
+
+def clean_up_user_csv_exports(dry_run=False):
+    """
+    Deletes users' data CSV exports from storage once they are older than USER_CSV_EXPORT_RETENTION
+    days, recording the deletion in each user's history so that they're only deleted once
+    """
+    date_cutoff = now() - datetime.timedelta(days=settings.USER_CSV_EXPORT_RETENTION)
+
+    def latest_time_subquery(action):
+        return Subquery(
+            UserHistory.objects.filter(user_id=OuterRef("id"), action=action)
+            .values("performed_at")
+            .order_by("-performed_at")[:1]
+        )
+
+    users = (
+        User.objects.annotate(
+            latest_export_time=latest_time_subquery(user_history.CSV_EXPORT),
+            latest_export_deletion_time=latest_time_subquery(
+                user_history.CSV_EXPORT_DELETION
+            ),
+        )
+        .filter(latest_export_time__lt=date_cutoff)
+        .filter(
+            Q(latest_export_deletion_time__isnull=True)
+            | Q(latest_export_deletion_time__lt=F("latest_export_time"))
+        )
+    )
+    if dry_run:
+        count = users.count()
+        logging.info("Would delete {} user data CSV export(s)".format(count))
+        return count
+
+    count = 0
+    for user in users.only("id").iterator():
+        storage_path = generate_user_csv_storage_path(user)
+        if default_storage.exists(storage_path):
+            default_storage.delete(storage_path)
+            count += 1
+        UserHistory.objects.create(
+            user_id=user.id, action=user_history.CSV_EXPORT_DELETION
+        )
+    logging.info("Deleted {} user data CSV export(s) from storage".format(count))
+    return count
 
 
 CHUNKSIZE = 500000
 
 
-def clean_up_stale_files(last_modified=None):
+def clean_up_stale_files(last_modified=None, dry_run=False):
     """
     Clean up files that aren't attached to any ContentNode, AssessmentItem, or SlideshowSlide and where
     the modified date is older than `last_modified`
@@ -209,6 +427,15 @@ def clean_up_stale_files(last_modified=None):
             modified__lt=last_modified,
         )
 
+        if dry_run:
+            count = files_to_clean_up.count()
+            logging.info(
+                "Would delete {} file(s) with a modified date older than {}".format(
+                    count, last_modified
+                )
+            )
+            return count
+
         files_to_clean_up_slice = files_to_clean_up.values_list("id", flat=True)[
             0:CHUNKSIZE
         ]
@@ -229,3 +456,4 @@ def clean_up_stale_files(last_modified=None):
             last_modified, count
         )
     )
+    return count
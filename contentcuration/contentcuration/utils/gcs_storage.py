@@ -1,13 +1,14 @@
+import io
 import logging
 import tempfile
 from gzip import GzipFile
-from io import BytesIO
 
 import backoff
 from django.conf import settings
 from django.core.files import File
 from django.core.files.storage import Storage
 from google.cloud.exceptions import InternalServerError
+from google.cloud.exceptions import NotFound
 from google.cloud.storage import Client
 from google.cloud.storage.blob import Blob
 
@@ -17,6 +18,15 @@ CONTENT_DATABASES_MAX_AGE = 5  # seconds
 
 MAX_RETRY_TIME = 60  # seconds
 
+# the size of the chunks read from a content database while compressing it
+DATABASE_READ_CHUNK_SIZE = 1024 * 1024
+
+# the maximum number of calls GCS recommends bundling into a single batch request
+MAX_BATCH_SIZE = 100
+
+# the minimum number of bytes requested by each ranged read of a lazily opened blob
+READ_AHEAD_SIZE = 256 * 1024
+
 
 def _create_default_client(
     service_account_credentials_path=settings.GCS_STORAGE_SERVICE_ACCOUNT_KEY_PATH,
@@ -26,6 +36,72 @@ def _create_default_client(
     return Client()
 
 
+class BlobRangeReader(io.RawIOBase):
+    """
+    A seekable, read only raw file object over a blob, which only downloads the byte ranges
+    that are read from it. Wrap it in an `io.BufferedReader` to read ahead, so that many
+    small reads don't each make a request.
+    """
+
+    mode = "rb"
+
+    def __init__(self, blob):
+        self.blob = blob
+        self._position = 0
+        if self.blob.size is None:
+            self.blob.reload()
+
+    @property
+    def size(self):
+        return self.blob.size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError("Invalid whence value: {}".format(whence))
+        if position < 0:
+            raise ValueError("Negative seek position {}".format(position))
+        self._position = position
+        return self._position
+
+    def _read_range(self, end):
+        """
+        Downloads the bytes from the current position up to, but not including, end
+        """
+        end = min(end, self.size)
+        if self._position >= end:
+            return b""
+        # checksums can't be validated for a partial download, and `end` is inclusive for GCS
+        data = self.blob.download_as_bytes(
+            start=self._position, end=end - 1, checksum=None
+        )
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self._read_range(self._position + len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def readall(self):
+        # fetch the rest of the blob in a single request, rather than in buffer sized chunks
+        return self._read_range(self.size)
+
+
 class GoogleCloudStorage(Storage):
     def __init__(self, client, bucket_name):
         self.client = client
@@ -42,10 +118,17 @@ class GoogleCloudStorage(Storage):
         """
         return self.client.project is not None
 
-    def open(self, name, mode="rb", blob_object=None):
+    def open(self, name, mode="rb", blob_object=None, download=False):
         """
         open returns a Django File object containing the bytes of name suitable for reading.
 
+        By default, the file is read lazily from the blob, with ranged requests for only the
+        parts of it that are read, so that callers that only need a few bytes (e.g. the central
+        directory of a zip file, or an image header) don't download the whole file. Pass
+        `download=True` to download the whole file into a temporary file on disk instead,
+        e.g. for callers that need a real file descriptor. Gzip encoded blobs are always
+        downloaded, as they're decompressed as a whole when served.
+
         You can pass in an optional 'mode' argument, but is only there for Django Storage class
         compatibility. It would error out if given any other argument than "rb".
 
@@ -74,6 +157,12 @@ class GoogleCloudStorage(Storage):
         if blob is None:
             raise FileNotFoundError("{} not found".format(name))
 
+        if not download and blob.content_encoding != "gzip":
+            fobj = io.BufferedReader(BlobRangeReader(blob), buffer_size=READ_AHEAD_SIZE)
+            django_file = File(fobj, name=name)
+            django_file.just_downloaded = False
+            return django_file
+
         fobj = tempfile.NamedTemporaryFile()
         blob.download_to_file(fobj)
         # flush it to disk
@@ -96,6 +185,8 @@ class GoogleCloudStorage(Storage):
 
     def size(self, name):
         blob = self.bucket.get_blob(name)
+        if blob is None:
+            raise FileNotFoundError("{} not found".format(name))
         return blob.size
 
     def save(self, name, fobj, max_length=None, blob_object=None):
@@ -104,22 +195,6 @@ class GoogleCloudStorage(Storage):
         else:
             blob = blob_object
 
-        buffer = None
-        # set a max-age of 5 if we're uploading to content/databases
-        if self.is_database_file(name):
-            blob.cache_control = "private, max-age={}, no-transform".format(
-                CONTENT_DATABASES_MAX_AGE
-            )
-
-            # Compress the database file so that users can save bandwith and download faster.
-            buffer = BytesIO()
-            compressed = GzipFile(fileobj=buffer, mode="w")
-            compressed.write(fobj.read())
-            compressed.close()
-
-            blob.content_encoding = "gzip"
-            fobj = buffer
-
         # determine the current file's mimetype based on the name
         # import determine_content_type lazily in here, so we don't get into an infinite loop with circular dependencies
         from contentcuration.utils.storage_common import determine_content_type
@@ -134,17 +209,42 @@ class GoogleCloudStorage(Storage):
             logging.warning("Stopping the upload of an empty file: {}".format(name))
             return name
 
+        # set a max-age of 5 if we're uploading to content/databases
+        if self.is_database_file(name):
+            blob.cache_control = "private, max-age={}, no-transform".format(
+                CONTENT_DATABASES_MAX_AGE
+            )
+            blob.content_encoding = "gzip"
+            self._upload_compressed(blob, fobj, content_type)
+            return name
+
         blob.upload_from_file(
             fobj,
             content_type=content_type,
         )
 
-        # Close StringIO object and discard memory buffer if created
-        if buffer:
-            buffer.close()
-
         return name
 
+    @staticmethod
+    def _upload_compressed(blob, fobj, content_type):
+        """
+        Compress the database file so that users can save bandwith and download faster.
+        The file is streamed through gzip into a resumable upload, so only a chunk of
+        the file is held in memory at a time, however large it is.
+        """
+        with blob.open(
+            "wb",
+            chunk_size=settings.GCS_DATABASE_UPLOAD_CHUNK_SIZE,
+            content_type=content_type,
+        ) as writer:
+            with GzipFile(
+                fileobj=writer,
+                mode="wb",
+                compresslevel=settings.GCS_DATABASE_COMPRESSION_LEVEL,
+            ) as compressed:
+                for chunk in iter(lambda: fobj.read(DATABASE_READ_CHUNK_SIZE), b""):
+                    compressed.write(chunk)
+
     def url(self, name):
         """
         Return a publicly accessible URL for the given object.
@@ -172,6 +272,30 @@ class GoogleCloudStorage(Storage):
         blob = self.bucket.get_blob(name)
         return blob.delete()
 
+    def delete_many(self, names):
+        """
+        Deletes the blobs with the given names, bundling the delete calls into batch requests
+        of MAX_BATCH_SIZE, rather than making a request per blob.
+        :param names: An iterable of blob names
+        :return: The number of blobs for which a delete call was made
+        """
+        names = [
+            name.split(OLD_STUDIO_STORAGE_PREFIX).pop()
+            if name.startswith(OLD_STUDIO_STORAGE_PREFIX)
+            else name
+            for name in names
+        ]
+        for i in range(0, len(names), MAX_BATCH_SIZE):
+            try:
+                with self.client.batch():
+                    for name in names[i : i + MAX_BATCH_SIZE]:
+                        self.bucket.delete_blob(name)
+            except NotFound:
+                # the batch raises once all of its calls have completed, so a blob that was
+                # already gone doesn't prevent the others in the batch from being deleted
+                pass
+        return len(names)
+
     def get_accessed_time(self, name):
         raise NotImplementedError
 
@@ -249,8 +373,8 @@ class CompositeGCS(Storage):
     def get_client(self):
         return self._get_writeable_backend().get_client()
 
-    def open(self, name, mode="rb"):
-        return self._get_readable_backend(name).open(name, mode)
+    def open(self, name, mode="rb", download=False):
+        return self._get_readable_backend(name).open(name, mode, download=download)
 
     def save(self, name, content, max_length=None):
         return self._get_writeable_backend().save(name, content, max_length=max_length)
@@ -258,6 +382,9 @@ class CompositeGCS(Storage):
     def delete(self, name):
         self._get_writeable_backend().delete(name)
 
+    def delete_many(self, names):
+        return self._get_writeable_backend().delete_many(names)
+
     def exists(self, name):
         try:
             self._get_readable_backend(name)
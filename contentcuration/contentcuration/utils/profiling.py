@@ -0,0 +1,258 @@
+"""
+Opt-in profiling of the SQL queries, cache lookups and Python time spent handling requests and running
+tasks, aggregated per view or task name in Redis, so that N+1 query regressions can be spotted in the
+admin before they become a problem.
+"""
+import contextlib
+import logging
+import threading
+import time
+
+from django.core.cache import cache as django_cache
+from django.core.cache import caches
+from django.db import connections
+from django_redis.client import DefaultClient
+
+from contentcuration.utils.cache import redis_retry
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_KEY_PREFIX = "query_profile"
+
+PROFILE_NAMES_KEY = "{}:names".format(PROFILE_KEY_PREFIX)
+
+# the maximum length of the slowest SQL statement stored for each name
+MAX_SQL_LENGTH = 2000
+
+_local = threading.local()
+
+
+def _active_profiles():
+    if not hasattr(_local, "profiles"):
+        _local.profiles = []
+    return _local.profiles
+
+
+class QueryProfile(object):
+    """
+    Context manager that records the queries run on all database connections, and the default cache
+    lookups made, in the current thread while it is active. The default cache is only proxied
+    while at least one profile is active in the thread.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0
+        self.sql_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.total_time = 0.0
+        self._start = None
+        self._wrappers = []
+
+    @property
+    def python_time(self):
+        return max(self.total_time - self.sql_time, 0.0)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.time()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.time() - start
+            self.queries += 1
+            self.sql_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+    def record_cache_lookup(self, hits, misses):
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+    def __enter__(self):
+        if not _active_profiles():
+            _install_cache_proxy()
+        for connection in connections.all():
+            wrapper = connection.execute_wrapper(self)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        _active_profiles().append(self)
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.total_time = time.time() - self._start
+        _active_profiles().remove(self)
+        if not _active_profiles():
+            _uninstall_cache_proxy()
+        while self._wrappers:
+            self._wrappers.pop().__exit__(exc_type, exc_val, exc_tb)
+
+
+def _record_cache_lookup(hits, misses):
+    for query_profile in _active_profiles():
+        query_profile.record_cache_lookup(hits, misses)
+
+
+class ProfiledCache(object):
+    """
+    Proxy for a cache instance that records the hits and misses of its lookups against any
+    profiles active in the calling thread, and passes everything else through to the cache
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, *args, **kwargs):
+        value = self._cache.get(key, default, *args, **kwargs)
+        if value is default:
+            _record_cache_lookup(0, 1)
+        else:
+            _record_cache_lookup(1, 0)
+        return value
+
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values = self._cache.get_many(keys, *args, **kwargs)
+        _record_cache_lookup(len(values), len(keys) - len(values))
+        return values
+
+
+def _install_cache_proxy():
+    """
+    Replaces the default cache of the calling thread with a `ProfiledCache`, as cache connections
+    are thread local, this leaves the cache of every other thread untouched
+    """
+    default_cache = caches["default"]
+    if not isinstance(default_cache, ProfiledCache):
+        caches["default"] = ProfiledCache(default_cache)
+
+
+def _uninstall_cache_proxy():
+    default_cache = caches["default"]
+    if isinstance(default_cache, ProfiledCache):
+        caches["default"] = default_cache._cache
+
+
+def _get_redis_client():
+    """
+    :rtype: redis.client.StrictRedis|None
+    """
+    cache_client = getattr(django_cache, "client", None)
+    if isinstance(cache_client, DefaultClient):
+        return cache_client.get_client(write=True)
+    return None
+
+
+def _profile_key(name):
+    return "{}:{}".format(PROFILE_KEY_PREFIX, name)
+
+
+@redis_retry
+def save_profile(query_profile):
+    """
+    Adds the profile to the aggregate stored in Redis for its name
+    :type query_profile: QueryProfile
+    """
+    redis_client = _get_redis_client()
+    if redis_client is None:
+        logger.debug("Query profiles can only be aggregated in a Redis cache")
+        return
+
+    key = _profile_key(query_profile.name)
+    max_queries, slowest_ms = redis_client.hmget(key, "max_queries", "slowest_ms")
+    slowest_time_ms = query_profile.slowest_time * 1000
+
+    pipeline = redis_client.pipeline()
+    pipeline.sadd(PROFILE_NAMES_KEY, query_profile.name)
+    pipeline.hincrby(key, "count", 1)
+    pipeline.hincrby(key, "queries", query_profile.queries)
+    pipeline.hincrbyfloat(key, "sql_ms", query_profile.sql_time * 1000)
+    pipeline.hincrbyfloat(key, "python_ms", query_profile.python_time * 1000)
+    pipeline.hincrby(key, "cache_hits", query_profile.cache_hits)
+    pipeline.hincrby(key, "cache_misses", query_profile.cache_misses)
+    if max_queries is None or query_profile.queries > int(max_queries):
+        pipeline.hset(key, "max_queries", query_profile.queries)
+    if query_profile.slowest_sql and (
+        slowest_ms is None or slowest_time_ms > float(slowest_ms)
+    ):
+        pipeline.hset(key, "slowest_ms", slowest_time_ms)
+        pipeline.hset(key, "slowest_sql", query_profile.slowest_sql[:MAX_SQL_LENGTH])
+    pipeline.execute()
+
+
+@redis_retry
+def get_profiles():
+    """
+    :return: A list of the aggregated profiles for each view or task name, sorted by the average
+        number of queries, highest first
+    """
+    redis_client = _get_redis_client()
+    if redis_client is None:
+        return []
+
+    names = sorted(
+        name.decode("utf-8") for name in redis_client.smembers(PROFILE_NAMES_KEY)
+    )
+    pipeline = redis_client.pipeline()
+    for name in names:
+        pipeline.hgetall(_profile_key(name))
+
+    profiles = []
+    for name, values in zip(names, pipeline.execute()):
+        values = {
+            key.decode("utf-8"): value.decode("utf-8") for key, value in values.items()
+        }
+        count = int(values.get("count", 0))
+        if not count:
+            continue
+        profiles.append(
+            {
+                "name": name,
+                "count": count,
+                "avg_queries": int(values["queries"]) / count,
+                "max_queries": int(values["max_queries"]),
+                "avg_sql_ms": float(values["sql_ms"]) / count,
+                "avg_python_ms": float(values["python_ms"]) / count,
+                "cache_hits": int(values["cache_hits"]),
+                "cache_misses": int(values["cache_misses"]),
+                "slowest_ms": float(values.get("slowest_ms", 0)),
+                "slowest_sql": values.get("slowest_sql"),
+            }
+        )
+    return sorted(profiles, key=lambda p: p["avg_queries"], reverse=True)
+
+
+@redis_retry
+def clear_profiles():
+    redis_client = _get_redis_client()
+    if redis_client is None:
+        return
+    names = redis_client.smembers(PROFILE_NAMES_KEY)
+    redis_client.delete(
+        PROFILE_NAMES_KEY, *[_profile_key(name.decode("utf-8")) for name in names]
+    )
+
+
+@contextlib.contextmanager
+def profile(name):
+    """
+    Context manager that profiles its body, adding the profile to the aggregate for `name` on exit
+    """
+    with QueryProfile(name) as query_profile:
+        yield query_profile
+    try:
+        save_profile(query_profile)
+    except Exception as e:
+        # profiling should never break the request or task being profiled
+        logger.warning("Failed to save query profile for {}: {}".format(name, e))
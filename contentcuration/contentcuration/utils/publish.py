@@ -5,6 +5,8 @@ import os
 import tempfile
 import time
 import uuid
+from collections import OrderedDict
+from contextlib import nullcontext
 from copy import deepcopy
 from itertools import chain
 
@@ -49,6 +51,7 @@ from contentcuration.utils.assessment.qti.imsmanifest import (
     get_assessment_ids_from_manifest,
 )
 from contentcuration.utils.cache import delete_public_channel_cache_keys
+from contentcuration.utils.files import cache_thumbnail_encodings
 from contentcuration.utils.files import create_thumbnail_from_base64
 from contentcuration.utils.files import get_thumbnail_encoding
 from contentcuration.utils.nodes import migrate_extra_fields
@@ -64,6 +67,20 @@ THUMBNAIL_DIMENSION = 128
 MIN_SCHEMA_VERSION = "1"
 PUBLISHING_UPDATE_THRESHOLD = 3600
 
+# The stages of publishing, weighted by their expected share of the time a publish takes
+PUBLISH_STAGES = OrderedDict(
+    [
+        ("migrate", 2),
+        ("map_nodes", 70),
+        ("upload", 8),
+        ("kolibri_public", 10),
+        ("tsvectors", 10),
+    ]
+)
+
+# How many times more costly it is to map an exercise than other nodes, as its archive is generated
+EXERCISE_MAPPING_COST = 5
+
 
 class NoNodesChangedError(Exception):
     pass
@@ -95,6 +112,16 @@ class SlowPublishError(Exception):
         super(SlowPublishError, self).__init__(self.message)
 
 
+def _progress_stage(progress_tracker, name):
+    """
+    :type progress_tracker: contentcuration.utils.celery.ProgressTracker|None
+    :return: A context manager tracking the publishing stage, yielding the stage's tracker if any
+    """
+    if progress_tracker is None:
+        return nullcontext()
+    return progress_tracker.stage(name)
+
+
 def send_emails(channel, user_id, version_notes=""):
     subject = render_to_string(
         "registration/custom_email_subject.txt",
@@ -156,42 +183,47 @@ def create_content_database(
         raise_if_nodes_are_all_unchanged(channel)
     fh, tempdb = tempfile.mkstemp(suffix=".sqlite3")
 
+    if progress_tracker and not progress_tracker.stage_weights:
+        progress_tracker.set_stages(PUBLISH_STAGES)
+
     with using_content_database(tempdb):
         if not use_staging_tree and not channel.main_tree.publishing:
             channel.mark_publishing(user_id)
 
-        call_command(
-            "migrate", "content", database=get_active_content_database(), no_input=True
-        )
-        if progress_tracker:
-            progress_tracker.track(10)
+        with _progress_stage(progress_tracker, "migrate"):
+            call_command(
+                "migrate",
+                "content",
+                database=get_active_content_database(),
+                no_input=True,
+            )
         base_tree = channel.staging_tree if use_staging_tree else channel.main_tree
-        tree_mapper = TreeMapper(
-            base_tree,
-            channel.language,
-            channel.id,
-            channel.name,
-            user_id=user_id,
-            force_exercises=force_exercises,
-            progress_tracker=progress_tracker,
-            inherit_metadata=bool(channel.ricecooker_version),
-        )
-        tree_mapper.map_nodes()
-        kolibri_channel = map_channel_to_kolibri_channel(channel, use_staging_tree)
-        # It should be at this percent already, but just in case.
-        if progress_tracker:
-            progress_tracker.track(90)
-        map_prerequisites(base_tree)
-        # Need to save as version being published, not current version
-        version = "next" if use_staging_tree else channel.version + 1
-        save_export_database(
-            channel.pk,
-            version,
-            use_staging_tree,
-        )
-        if channel.public:
-            mapper = ChannelMapper(kolibri_channel)
-            mapper.run()
+        with _progress_stage(progress_tracker, "map_nodes") as map_nodes_tracker:
+            tree_mapper = TreeMapper(
+                base_tree,
+                channel.language,
+                channel.id,
+                channel.name,
+                user_id=user_id,
+                force_exercises=force_exercises,
+                progress_tracker=map_nodes_tracker,
+                inherit_metadata=bool(channel.ricecooker_version),
+            )
+            tree_mapper.map_nodes()
+        with _progress_stage(progress_tracker, "upload"):
+            kolibri_channel = map_channel_to_kolibri_channel(channel, use_staging_tree)
+            map_prerequisites(base_tree)
+            # Need to save as version being published, not current version
+            version = "next" if use_staging_tree else channel.version + 1
+            save_export_database(
+                channel.pk,
+                version,
+                use_staging_tree,
+            )
+        with _progress_stage(progress_tracker, "kolibri_public"):
+            if channel.public:
+                mapper = ChannelMapper(kolibri_channel)
+                mapper.run()
 
     return tempdb
 
@@ -245,12 +277,19 @@ class TreeMapper:
             )
 
         self.root_node = root_node
-        task_percent_total = 80.0
-        total_nodes = (
-            root_node.get_descendant_count() + 1
-        )  # make sure we include root_node
-        self.percent_per_node = task_percent_total / float(total_nodes)
         self.progress_tracker = progress_tracker
+        if progress_tracker:
+            exercise_count = (
+                root_node.get_descendants()
+                .filter(kind_id=content_kinds.EXERCISE)
+                .count()
+            )
+            # make sure we include root_node
+            progress_tracker.set_total(
+                root_node.get_descendant_count()
+                + 1
+                + exercise_count * (EXERCISE_MAPPING_COST - 1)
+            )
         self.default_language = default_language
         self.channel_id = channel_id
         self.channel_name = channel_name
@@ -258,13 +297,53 @@ class TreeMapper:
         self.force_exercises = force_exercises
         self.inherit_metadata = inherit_metadata
 
-    def _node_completed(self):
+    def _node_completed(self, node):
         if self.progress_tracker:
-            self.progress_tracker.increment(increment=self.percent_per_node)
+            self.progress_tracker.increment(
+                increment=EXERCISE_MAPPING_COST
+                if node.kind_id == content_kinds.EXERCISE
+                else 1
+            )
 
     def map_nodes(self):
+        self._prefetch_thumbnail_encodings()
         self.recurse_nodes(self.root_node, {})
 
+    def _prefetch_thumbnail_encodings(self):
+        """
+        Encode the thumbnails of the nodes that will be mapped but don't have a thumbnail encoding yet
+        in batches, so that they are already cached when each node is mapped
+        """
+        descendants = self.root_node.get_descendants(include_self=True)
+        # recurse_nodes only maps complete nodes whose ancestors are all complete, and skips
+        # topics that have no resources below them
+        incomplete_ancestors = descendants.filter(
+            lft__lt=OuterRef("lft"),
+            rght__gt=OuterRef("rght"),
+        ).exclude(complete=True)
+        resource_descendants = descendants.filter(
+            lft__gte=OuterRef("lft"),
+            rght__lte=OuterRef("rght"),
+        ).exclude(kind_id=content_kinds.TOPIC)
+        mapped_nodes = (
+            descendants.filter(complete=True)
+            .exclude(Exists(incomplete_ancestors))
+            .filter(~Q(kind_id=content_kinds.TOPIC) | Exists(resource_descendants))
+            .exclude(thumbnail_encoding__contains="base64")
+        )
+        thumbnail_files = (
+            ccmodels.File.objects.filter(
+                contentnode__in=mapped_nodes,
+                preset__thumbnail=True,
+            )
+            .values_list("checksum", "file_format__extension")
+            .distinct()
+        )
+        cache_thumbnail_encodings(
+            "{}.{}".format(checksum, extension)
+            for checksum, extension in thumbnail_files.iterator()
+        )
+
     def _gather_inherited_metadata(self, node, inherited_fields):
         metadata = {}
 
@@ -368,7 +447,7 @@ class TreeMapper:
             create_associated_file_objects(kolibrinode, node)
             map_tags_to_node(kolibrinode, node)
 
-        self._node_completed()
+        self._node_completed(node)
 
 
 def create_slideshow_manifest(ccnode, user_id=None):
@@ -1009,6 +1088,8 @@ def publish_channel(  # noqa: C901
     start = time.time()
     try:
         set_channel_icon_encoding(channel)
+        if progress_tracker:
+            progress_tracker.set_stages(PUBLISH_STAGES)
         kolibri_temp_db = create_content_database(
             channel,
             force,
@@ -1017,12 +1098,13 @@ def publish_channel(  # noqa: C901
             progress_tracker=progress_tracker,
             use_staging_tree=use_staging_tree,
         )
-        add_tokens_to_channel(channel)
-        if not use_staging_tree:
-            increment_channel_version(channel)
-            sync_contentnode_and_channel_tsvectors(channel_id=channel.id)
-            mark_all_nodes_as_published(base_tree)
-            fill_published_fields(channel, version_notes)
+        with _progress_stage(progress_tracker, "tsvectors"):
+            add_tokens_to_channel(channel)
+            if not use_staging_tree:
+                increment_channel_version(channel)
+                sync_contentnode_and_channel_tsvectors(channel_id=channel.id)
+                mark_all_nodes_as_published(base_tree)
+                fill_published_fields(channel, version_notes)
 
         # Attributes not getting set for some reason, so just save it here
         base_tree.publishing = False
@@ -1040,9 +1122,6 @@ def publish_channel(  # noqa: C901
 
         # use SQLite backup API to put DB into archives folder.
         # Then we can use the empty db name to have SQLite use a temporary DB (https://www.sqlite.org/inmemorydb.html)
-
-        if progress_tracker:
-            progress_tracker.track(100)
     except NoNodesChangedError:
         logging.warning(
             "No nodes have changed for channel {} so no publish will happen".format(
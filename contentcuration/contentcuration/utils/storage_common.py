@@ -15,6 +15,9 @@ from .gcs_storage import GoogleCloudStorage
 # to add additional files add them to the mime.types file
 mimetypes.init([os.path.join(os.path.dirname(__file__), "mime.types")])
 
+# the maximum number of keys S3's DeleteObjects accepts in a single request
+S3_MAX_DELETE_OBJECTS = 1000
+
 
 class UnknownStorageBackendError(Exception):
     pass
@@ -66,25 +69,129 @@ def get_presigned_upload_url(
     # Aron: note that content_length is not used right now because
     # both storage types are having difficulties enforcing it.
 
-    mimetype = determine_content_type(filepath)
+    return get_presigned_upload_urls(
+        [(filepath, md5sum_b64)], lifetime_sec, storage=storage, client=client
+    )[0]
+
+
+def get_presigned_upload_urls(
+    files, lifetime_sec, storage=default_storage, client=None
+):
+    """Return presigned URLs for many files, as `get_presigned_upload_url` does for one,
+    fetching the bucket only once.
+
+    :param: files: a list of (filepath, md5sum_b64) tuples.
+    :param: lifetime_sec: the lifetime of the generated upload urls, in seconds.
+    :param: client: the storage client that will be used to generate the presigned URLs.
+
+    :returns: a list of dictionaries, in the same order as files, each containing the keys
+    mimetype and uploadURL.
+
+    :raises: :class:`UnknownStorageBackendError`: If the storage backend is not S3 or GCS.
+    """
+    bucket = settings.AWS_S3_BUCKET_NAME
     if isinstance(storage, (GoogleCloudStorage, CompositeGCS)):
         client = client or storage.get_client()
-        bucket = settings.AWS_S3_BUCKET_NAME
-        upload_url = _get_gcs_presigned_put_url(
-            client, bucket, filepath, md5sum_b64, lifetime_sec, mimetype=mimetype
-        )
+        bucket_obj = client.get_bucket(bucket)
+
+        def get_upload_url(filepath, md5sum_b64, mimetype):
+            return _sign_gcs_put_url(
+                bucket_obj, filepath, md5sum_b64, lifetime_sec, mimetype=mimetype
+            )
+
     elif isinstance(storage, S3Storage):
-        bucket = settings.AWS_S3_BUCKET_NAME
         client = client or storage.s3_connection
-        upload_url = _get_s3_presigned_put_url(
-            client, bucket, filepath, md5sum_b64, lifetime_sec
-        )
+
+        def get_upload_url(filepath, md5sum_b64, mimetype):
+            return _get_s3_presigned_put_url(
+                client, bucket, filepath, md5sum_b64, lifetime_sec
+            )
+
     else:
         raise UnknownStorageBackendError(
             "Please ensure your storage backend is either Google Cloud Storage or S3 Storage!"
         )
 
-    return {"mimetype": mimetype, "uploadURL": upload_url}
+    upload_urls = []
+    for filepath, md5sum_b64 in files:
+        mimetype = determine_content_type(filepath)
+        upload_urls.append(
+            {
+                "mimetype": mimetype,
+                "uploadURL": get_upload_url(filepath, md5sum_b64, mimetype),
+            }
+        )
+    return upload_urls
+
+
+def delete_files(names, storage=default_storage):
+    """
+    Deletes the files with the given names from storage, using the batch delete APIs of the
+    object storage backends where possible instead of one request per file.
+
+    :param: names: an iterable of file names, as stored in `File.file_on_disk`.
+    :param: storage: the storage backend to delete the files from.
+    :returns: the number of files for which a delete was requested.
+    """
+    names = list(names)
+    if not names:
+        return 0
+
+    if isinstance(storage, (GoogleCloudStorage, CompositeGCS)):
+        return storage.delete_many(names)
+
+    if isinstance(storage, S3Storage):
+        client = storage.s3_connection
+        for i in range(0, len(names), S3_MAX_DELETE_OBJECTS):
+            client.delete_objects(
+                Bucket=storage.settings.AWS_S3_BUCKET_NAME,
+                Delete={
+                    "Objects": [
+                        {"Key": storage._get_key_name(name)}
+                        for name in names[i : i + S3_MAX_DELETE_OBJECTS]
+                    ],
+                    "Quiet": True,
+                },
+            )
+        return len(names)
+
+    for name in names:
+        storage.delete(name)
+    return len(names)
+
+
+def get_file_sizes(names, storage=default_storage):
+    """
+    Gets the sizes of the files with the given names from storage, looking up each distinct
+    name once, so that callers can check many files exist before creating any records for them.
+
+    :param: names: an iterable of file names, as stored in `File.file_on_disk`.
+    :param: storage: the storage backend to check for the files.
+    :returns: a dict of file name to size, which omits any files that do not exist.
+    """
+    sizes = {}
+    for name in set(names):
+        try:
+            sizes[name] = storage.size(name)
+        except OSError:
+            # FileNotFoundError, or the OSError raised by S3 storage for a missing key
+            continue
+    return sizes
+
+
+def open_downloaded(name, storage=default_storage):
+    """
+    Opens a file from storage that has been downloaded in full to local disk, for callers
+    that need a real file descriptor, e.g. to pass it to a subprocess, rather than the
+    lazily read file that GCS storage returns by default.
+
+    :param: name: the name of the file, as stored in `File.file_on_disk`.
+    :param: storage: the storage backend to open the file from.
+    :returns: a Django File object.
+    """
+    if isinstance(storage, (GoogleCloudStorage, CompositeGCS)):
+        return storage.open(name, "rb", download=True)
+    return storage.open(name, "rb")
 
 
 def _get_gcs_presigned_put_url(
@@ -96,6 +203,14 @@ def _get_gcs_presigned_put_url(
     mimetype="application/octet-stream",
 ):
     bucket_obj = gcs_client.get_bucket(bucket)
+    return _sign_gcs_put_url(
+        bucket_obj, filepath, md5sum, lifetime_sec, mimetype=mimetype
+    )
+
+
+def _sign_gcs_put_url(
+    bucket_obj, filepath, md5sum, lifetime_sec, mimetype="application/octet-stream"
+):
     blob_obj = bucket_obj.blob(filepath)
 
     # ensure the md5sum doesn't have any whitespace, including newlines.
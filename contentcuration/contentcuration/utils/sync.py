@@ -6,8 +6,12 @@ from le_utils.constants import content_kinds
 from le_utils.constants import format_presets
 
 from contentcuration.models import AssessmentItem
+from contentcuration.models import Change
 from contentcuration.models import ContentTag
 from contentcuration.models import File
+from contentcuration.utils.completeness import recalculate_completeness
+from contentcuration.viewsets.sync.constants import CONTENTNODE
+from contentcuration.viewsets.sync.utils import generate_update_event
 
 
 def sync_channel(
@@ -17,9 +21,11 @@ def sync_channel(
     sync_files=False,
     sync_assessment_items=False,
     progress_tracker=None,
+    created_by_id=None,
 ):
     """
     :type progress_tracker: contentcuration.utils.celery.ProgressTracker|None
+    :param created_by_id: The id of the user syncing the channel, recorded on any changes it creates
     """
     nodes_to_sync = channel.main_tree.get_descendants().filter(
         Q(original_node__isnull=False)
@@ -31,6 +37,7 @@ def sync_channel(
     if progress_tracker:
         progress_tracker.set_total(sync_node_count)
 
+    changed_node_ids = []
     for node in nodes_to_sync:
         node = sync_node(
             node,
@@ -43,6 +50,27 @@ def sync_channel(
             progress_tracker.increment()
         if node.changed:
             node.save()
+            changed_node_ids.append(node.id)
+
+    # Synced metadata, files and assessment items can all affect completeness,
+    # so any nodes where it has changed are sent to clients as applied changes
+    now_complete, now_incomplete = recalculate_completeness(changed_node_ids)
+    Change.create_changes(
+        [
+            generate_update_event(
+                node_id, CONTENTNODE, {"complete": True}, channel_id=channel.id
+            )
+            for node_id in now_complete
+        ]
+        + [
+            generate_update_event(
+                node_id, CONTENTNODE, {"complete": False}, channel_id=channel.id
+            )
+            for node_id in now_incomplete
+        ],
+        created_by_id=created_by_id,
+        applied=True,
+    )
 
 
 def sync_node(
@@ -1,6 +1,9 @@
 import logging
 
+from contentcuration.tasks import calculate_pending_user_storage_task
 from contentcuration.tasks import calculate_user_storage_task
+from contentcuration.utils.cache import PendingUserStorageCache
+from contentcuration.utils.cache import USER_STORAGE_CALCULATION_INTERVAL
 
 
 def calculate_user_storage(user_id):
@@ -12,11 +15,23 @@ def calculate_user_storage(user_id):
         delay_user_storage_calculation.add(user_id)
         return
 
+    # Debounce the recalculation when the cache is Redis, which avoids any queries here
+    # unless a recalculation needs to be scheduled
+    scheduled = PendingUserStorageCache().add(user_id) if user_id is not None else None
+    if scheduled is False:
+        return
+
     try:
         if user_id is None:
             raise User.DoesNotExist
         user = User.objects.get(pk=user_id)
-        if not user.is_admin:
+        if scheduled:
+            # The task recalculates the storage of every pending user, but is enqueued for the user
+            # who scheduled it, so that it's tracked and cleaned up like any other task
+            calculate_pending_user_storage_task.enqueue(
+                user, countdown=USER_STORAGE_CALCULATION_INTERVAL
+            )
+        elif not user.is_admin:
             calculate_user_storage_task.fetch_or_enqueue(user, user_id=user_id)
     except User.DoesNotExist:
         logging.error(
@@ -16,6 +16,8 @@ from contentcuration.decorators import browser_is_supported
 from contentcuration.decorators import is_admin
 from contentcuration.tasks import sendcustomemails_task
 from contentcuration.utils.messages import get_messages
+from contentcuration.utils.profiling import clear_profiles
+from contentcuration.utils.profiling import get_profiles
 from contentcuration.views.base import current_user_for_context
 
 
@@ -25,7 +27,10 @@ def send_custom_email(request):
     data = json.loads(request.body)
     try:
         sendcustomemails_task.enqueue(
-            request.user, data["subject"], data["message"], data["query"]
+            request.user,
+            subject=data["subject"],
+            message=data["message"],
+            query=data["query"],
         )
     except KeyError:
         raise ObjectDoesNotExist("Missing attribute from data: {}".format(data))
@@ -33,6 +38,20 @@ def send_custom_email(request):
     return Response({"success": True})
 
 
+@is_admin
+@api_view(["GET", "DELETE"])
+def query_profiles(request):
+    """
+    Returns the query profiles aggregated per view and task, or resets them on DELETE
+    """
+    if request.method == "DELETE":
+        clear_profiles()
+        return Response({"success": True})
+    return Response(
+        {"enabled": settings.QUERY_PROFILER_ENABLED, "profiles": get_profiles()}
+    )
+
+
 @login_required
 @browser_is_supported
 @authentication_classes(
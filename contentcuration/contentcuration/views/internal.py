@@ -48,6 +48,7 @@ from contentcuration.models import StagedFile
 from contentcuration.serializers import GetTreeDataSerializer
 from contentcuration.tasks import apply_channel_changes_task
 from contentcuration.tasks import generatenodediff_task
+from contentcuration.utils.completeness import get_completion_errors_for_nodes
 from contentcuration.utils.files import get_file_diff
 from contentcuration.utils.garbage_collect import get_deleted_chefs_root
 from contentcuration.utils.nodes import map_files_to_assessment_item
@@ -740,6 +741,7 @@ def convert_data_to_nodes(user, content_data, parent_node):  # noqa: C901
     """ Parse dict and create nodes accordingly """
     try:
         root_mapping = {}
+        new_nodes = {}
         parent_node = ContentNode.objects.get(pk=parent_node)
         if parent_node.kind_id != content_kinds.TOPIC:
             raise NodeValidationError(
@@ -791,19 +793,21 @@ def convert_data_to_nodes(user, content_data, parent_node):  # noqa: C901
                                 user, new_node, slides, node_data["files"]
                             )
 
-                    # Wait until after files have been set on the node to check for node completeness
-                    # as some node kinds are counted as incomplete if they lack a default file.
-                    completion_errors = new_node.mark_complete()
-
-                    if completion_errors:
-                        try:
-                            # we need to raise it to get Python to fill out the stack trace.
-                            raise IncompleteNodeError(new_node, completion_errors)
-                        except IncompleteNodeError as e:
-                            report_exception(e)
+                    new_nodes[new_node.pk] = new_node
 
                     # Track mapping between newly created node and node id
                     root_mapping.update({node_data["node_id"]: new_node.pk})
+
+            # Wait until after files have been set on the nodes to check for node completeness
+            # as some node kinds are counted as incomplete if they lack a default file.
+            completion_errors = get_completion_errors_for_nodes(new_nodes.keys())
+            for node_id, errors in completion_errors.items():
+                if errors:
+                    try:
+                        # we need to raise it to get Python to fill out the stack trace.
+                        raise IncompleteNodeError(new_nodes[node_id], errors)
+                    except IncompleteNodeError as e:
+                        report_exception(e)
             return root_mapping
 
     except KeyError as e:
@@ -1,14 +1,10 @@
 import json
-from datetime import datetime
 
-from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Max
 from django.http import Http404
 from django.http import HttpResponse
 from django.http import HttpResponseNotFound
 from django.shortcuts import get_object_or_404
-from django_cte import With
 from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.authentication import TokenAuthentication
@@ -23,6 +19,7 @@ from contentcuration.models import Channel
 from contentcuration.models import ContentNode
 from contentcuration.tasks import generatenodediff_task
 from contentcuration.tasks import getnodedetails_task
+from contentcuration.utils.cache import get_details_revision
 from contentcuration.utils.nodes import get_diff
 
 
@@ -55,52 +52,22 @@ def get_node_details(request, node_id):
 
 
 def get_node_details_cached(user, node, channel):
+    if channel is None:
+        # Nodes outside of a channel have no revision to tell whether their cached details are outdated
+        return node.get_details()
+
     cached_data = cache.get("details_{}".format(node.node_id))
 
     if cached_data:
-        # If channel is a sushi chef channel, use date created for faster query
-        # Otherwise, find the last time anything was updated in the channel
-        if channel and channel.ricecooker_version:
-            last_update = channel.main_tree.created
-        else:
-            # The query should never span across multiple trees, so we can filter by tree_id first.
-            # Since the tree_id is indexed, this should be a fast query, and perfect candidate
-            # for the CTE select query.
-            cte = With(
-                ContentNode.objects.filter(tree_id=node.tree_id)
-                .values(
-                    "id", "modified", "changed", "tree_id", "parent_id", "lft", "rght"
-                )
-                .order_by()
-            )
-            last_update_qs = cte.queryset().with_cte(cte).filter(changed=True)
-
-            # If the node is not the root node, the intent is to calculate node details for the
-            # descendants of this node
-            if node.parent_id is not None:
-                # See MPTTModel.get_descendants for details on the lft/rght query
-                last_update_qs = last_update_qs.filter(
-                    lft__gte=node.lft + 1, rght__lte=node.rght - 1
-                )
-            else:
-                # Maintain that query should not 'include_self'
-                last_update_qs = last_update_qs.filter(parent_id__isnull=False)
-
-            last_update = last_update_qs.aggregate(latest_update=Max("modified")).get(
-                "latest_update"
-            )
-
-        if last_update:
-            last_cache_update = datetime.strptime(
-                json.loads(cached_data)["last_update"], settings.DATE_TIME_FORMAT
-            )
-            if (
-                not user.is_anonymous
-                and last_update.replace(tzinfo=None) > last_cache_update
-            ):
-                # update the stats async, then return the cached value
-                getnodedetails_task.enqueue(user, node_id=node.pk)
-        return json.loads(cached_data)
+        data = json.loads(cached_data)
+        # The details are outdated if any changes have been applied to the channel since they were calculated
+        if not user.is_anonymous and data.get("revision") != get_details_revision(
+            channel.id
+        ):
+            # update the stats async, reusing any update already queued for the node,
+            # then return the cached value
+            getnodedetails_task.fetch_or_enqueue(user, node_id=node.pk)
+        return data
 
     return node.get_details(channel=channel)
 
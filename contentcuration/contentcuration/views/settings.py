@@ -10,10 +10,13 @@ from django.contrib.auth.forms import SetPasswordForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import PasswordChangeView
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.files.storage import default_storage
 from django.core.mail import send_mail
 from django.db.models import Count
+from django.http import FileResponse
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
+from django.http import HttpResponseNotFound
 from django.shortcuts import render
 from django.template.loader import render_to_string
 from django.urls import reverse_lazy
@@ -32,6 +35,7 @@ from contentcuration.forms import StorageRequestForm
 from contentcuration.forms import UsernameChangeForm
 from contentcuration.tasks import generateusercsv_task
 from contentcuration.utils.csv_writer import generate_user_csv_filename
+from contentcuration.utils.csv_writer import generate_user_csv_storage_path
 from contentcuration.utils.messages import get_messages
 from contentcuration.views.base import current_user_for_context
 from contentcuration.views.users import logout
@@ -73,6 +77,19 @@ def export_user_data(request):
     return HttpResponse({"success": True})
 
 
+@login_required
+@api_view(["GET"])
+def download_user_data(request):
+    storage_path = generate_user_csv_storage_path(request.user)
+    if not default_storage.exists(storage_path):
+        return HttpResponseNotFound()
+    return FileResponse(
+        default_storage.open(storage_path, "rb"),
+        as_attachment=True,
+        filename="kolibri_studio_data.csv.gz",
+    )
+
+
 class PostFormMixin(LoginRequiredMixin):
     http_method_names = ["post"]
     success_url = reverse_lazy("settings")
@@ -168,6 +185,9 @@ class DeleteAccountView(PostFormMixin, FormView):
         )  # Remove any generated csvs
         if os.path.exists(csv_path):
             os.unlink(csv_path)
+        storage_path = generate_user_csv_storage_path(self.request.user)
+        if default_storage.exists(storage_path):
+            default_storage.delete(storage_path)
 
         self.request.user.delete()
         logout(self.request)
@@ -3,6 +3,7 @@ import re
 
 from django.db import transaction
 from le_utils.constants import exercises
+from le_utils.constants import file_formats
 from le_utils.constants import format_presets
 from rest_framework import serializers
 from rest_framework.permissions import IsAuthenticated
@@ -12,6 +13,8 @@ from contentcuration.models import AssessmentItem
 from contentcuration.models import ContentNode
 from contentcuration.models import File
 from contentcuration.models import generate_object_storage_name
+from contentcuration.utils.storage_common import get_file_sizes
+from contentcuration.utils.user import calculate_user_storage
 from contentcuration.viewsets.base import BulkCreateMixin
 from contentcuration.viewsets.base import BulkListSerializer
 from contentcuration.viewsets.base import BulkModelSerializer
@@ -41,6 +44,31 @@ class AssessmentItemFilter(RequiredFilterSet):
         )
 
 
+MARKDOWN_FIELDS = ("question", "answers", "hints")
+
+valid_file_formats = dict(file_formats.choices)
+
+
+def load_markdown_fields(assessment_items):
+    """
+    Loads any deferred markdown fields of the assessment items with a single query,
+    rather than one query for each item when its markdown is parsed.
+    """
+    deferred_items = {
+        ai.id: ai
+        for ai in assessment_items
+        if ai.get_deferred_fields().intersection(MARKDOWN_FIELDS)
+    }
+    if not deferred_items:
+        return
+    for values in AssessmentItem.objects.filter(id__in=deferred_items).values(
+        "id", *MARKDOWN_FIELDS
+    ):
+        aitem = deferred_items[values.pop("id")]
+        for field, value in values.items():
+            setattr(aitem, field, value)
+
+
 def get_filenames_from_assessment(assessment_item):
     # Get unique checksums in the assessment item text fields markdown
     # Coerce to a string, for Python 2, as the stored data is in unicode, and otherwise
@@ -135,7 +163,7 @@ class AssessmentItemSerializer(BulkModelSerializer):
             md_fields_modified = {
                 self.id_value_lookup(ai)
                 for ai in all_validated_data
-                if "question" in ai or "hints" in ai or "answers" in ai
+                if any(field in ai for field in MARKDOWN_FIELDS)
             }
         else:
             # If this is a create operation, just check if these fields are not null.
@@ -149,6 +177,8 @@ class AssessmentItemSerializer(BulkModelSerializer):
             ai for ai in all_objects if self.id_value_lookup(ai) in md_fields_modified
         ]
 
+        load_markdown_fields(all_objects)
+
         for file in File.objects.filter(assessment_item__in=all_objects):
             if file.assessment_item_id not in current_files_by_aitem:
                 current_files_by_aitem[file.assessment_item_id] = []
@@ -178,58 +208,84 @@ class AssessmentItemSerializer(BulkModelSerializer):
         if files_to_delete:
             File.objects.filter(id__in=files_to_delete).delete()
         if files_to_update:
+            user = self.context["request"].user
             # Query file objects that this user has uploaded to set the assessment_item attribute
             source_files = list(
                 File.objects.filter(
                     checksum__in=files_to_update.keys(),
-                    uploaded_by=self.context["request"].user,
+                    uploaded_by=user,
                     contentnode__isnull=True,
                     assessment_item__isnull=True,
                 )
             )
 
-            updated_files = []
-
             for file in source_files:
                 if file.checksum in files_to_update and files_to_update[file.checksum]:
                     file_dict = files_to_update[file.checksum].pop()
                     aitem = file_dict["aitem"]
                     file.assessment_item = aitem
-                    updated_files.append(file)
+
+            File.objects.bulk_update(source_files, ["assessment_item"])
+
             # The previous loop will have updated all the files for file objects that already exist.
             # Now we need to create new file objects for the files that do not exist yet.
             # This may have happened because the file object got garbage collected
             # or because the file was uploaded by a different user.
-            for checksum, file_dict_list in files_to_update.items():
-                for file_dict in file_dict_list:
-                    aitem = file_dict["aitem"]
-                    ext = file_dict["ext"]
-                    filepath = generate_object_storage_name(
-                        checksum, f"{checksum}.{ext}", default_ext=ext
-                    )
-                    file = File(
-                        checksum=checksum,
-                        file_on_disk=filepath,
-                        file_format_id=ext,
-                        preset_id=format_presets.EXERCISE_IMAGE,
-                        uploaded_by=self.context["request"].user,
-                    )
-                    try:
-                        file.save()
-                    except FileNotFoundError:
-                        # Not all the files to update had a file, raise an error
-                        raise ValidationError(
-                            "Attempted to set files to an assessment item that do not have a file on the server"
-                        )
-                    file.assessment_item = aitem
-                    updated_files.append(file)
+            self._create_files(
+                [
+                    (checksum, file_dict["ext"], file_dict["aitem"])
+                    for checksum, file_dict_list in files_to_update.items()
+                    for file_dict in file_dict_list
+                ],
+                user,
+            )
 
-            File.objects.bulk_update(source_files, ["assessment_item"])
+    def _create_files(self, files, user):
+        """
+        Creates the file objects for the (checksum, ext, assessment item) tuples in files, checking
+        that each distinct file is in storage once, and recalculating the user's storage once,
+        rather than for each file saved.
+        """
+        if not files:
+            return
+
+        filepaths = {
+            (checksum, ext): generate_object_storage_name(
+                checksum, f"{checksum}.{ext}", default_ext=ext
+            )
+            for checksum, ext, _ in files
+        }
+        file_sizes = get_file_sizes(filepaths.values())
+
+        new_files = []
+        for checksum, ext, aitem in files:
+            filepath = filepaths[(checksum, ext)]
+            if ext not in valid_file_formats or filepath not in file_sizes:
+                # Not all the files to update had a file, raise an error
+                raise ValidationError(
+                    "Attempted to set files to an assessment item that do not have a file on the server"
+                )
+            new_files.append(
+                File(
+                    checksum=checksum,
+                    file_on_disk=filepath,
+                    file_size=file_sizes[filepath],
+                    file_format_id=ext,
+                    preset_id=format_presets.EXERCISE_IMAGE,
+                    uploaded_by=user,
+                    assessment_item=aitem,
+                )
+            )
+
+        File.objects.bulk_create(new_files)
+        calculate_user_storage(user.id)
 
     def create(self, validated_data):
         with transaction.atomic():
             instance = super(AssessmentItemSerializer, self).create(validated_data)
-            self.set_files([instance])
+            # When creating in bulk, files are set for all the items by the list serializer
+            if not isinstance(self.parent, AssessmentListSerializer):
+                self.set_files([instance])
             return instance
 
     def update(self, instance, validated_data):
@@ -238,7 +294,9 @@ class AssessmentItemSerializer(BulkModelSerializer):
                 instance, validated_data
             )
             self.set_id_values(instance, validated_data)
-            self.set_files([instance], [validated_data])
+            # When updating in bulk, files are set for all the items by the list serializer
+            if not isinstance(self.parent, AssessmentListSerializer):
+                self.set_files([instance], [validated_data])
             return instance
 
 
@@ -1,10 +1,12 @@
 import json
+import logging
 import traceback
 import uuid
 from contextlib import contextmanager
 
 from celery import states
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Model
 from django.db.models import Q
 from django.db.utils import IntegrityError
 from django.http import Http404
@@ -130,6 +132,15 @@ class BulkModelSerializer(SimpleReprMixin, ModelSerializer):
                 del obj[attr]
         return obj
 
+    def get_bulk_update_values(self, validated_data):
+        """
+        Override to let the list serializer update all the instances given the same validated_data
+        with a single UPDATE statement, rather than loading them and calling `update` on each.
+        Return a dict of the field values, or expressions, that apply validated_data to any
+        instance, or None if the update depends on the instance.
+        """
+        return None
+
     def to_internal_value(self, data):
         ret = super(BulkModelSerializer, self).to_internal_value(data)
 
@@ -204,6 +215,20 @@ class BulkModelSerializer(SimpleReprMixin, ModelSerializer):
         return instance
 
 
+def _bulk_update_key(validated_data):
+    """
+    Returns a hashable key for validated data, equal for equal validated data
+    """
+    key = []
+    for field, value in sorted(validated_data.items()):
+        if isinstance(value, Model):
+            value = (value._meta.label, value.pk)
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value, sort_keys=True, default=str)
+        key.append((field, value))
+    return tuple(key)
+
+
 # Add mixin first to make sure __repr__ for mixin is first in MRO
 class BulkListSerializer(SimpleReprMixin, ListSerializer):
     def __init__(self, *args, **kwargs):
@@ -269,31 +294,86 @@ class BulkListSerializer(SimpleReprMixin, ListSerializer):
 
         return ret
 
+    def _update_in_bulk(self, queryset, all_validated_data_by_id):
+        """
+        Updates the objects whose validated data the child serializer can apply with
+        `get_bulk_update_values`, with one UPDATE statement for each distinct validated data,
+        and removes them from all_validated_data_by_id
+        :return: A tuple of the updated objects, and the set of their ids
+        """
+        id_attr = self.child.id_attr()
+        if not isinstance(id_attr, str):
+            return [], set()
+
+        values_by_key = {}
+        ids_by_key = {}
+        for obj_id, obj_validated_data in list(all_validated_data_by_id.items()):
+            key = _bulk_update_key(obj_validated_data)
+            if key not in values_by_key:
+                values_by_key[key] = self.child.get_bulk_update_values(
+                    obj_validated_data
+                )
+            if values_by_key[key] is not None:
+                ids_by_key.setdefault(key, []).append(obj_id)
+                del all_validated_data_by_id[obj_id]
+
+        if not ids_by_key:
+            return [], set()
+
+        # this method is handed a queryset that has been pre-filtered
+        # to the specific instance ids in question, by `create_from_updates` on the bulk update mixin
+        lookup = "{}__in".format(id_attr)
+        updated_keys = set(
+            str(obj_id)
+            for obj_id in queryset.filter(
+                **{lookup: [i for ids in ids_by_key.values() for i in ids]}
+            ).values_list(id_attr, flat=True)
+        )
+        for key, ids in ids_by_key.items():
+            ids = [obj_id for obj_id in ids if obj_id in updated_keys]
+            if ids:
+                self.child.Meta.model.objects.filter(**{lookup: ids}).update(
+                    **values_by_key[key]
+                )
+
+        return list(queryset.filter(**{lookup: list(updated_keys)})), updated_keys
+
     def update(self, queryset, all_validated_data):
         concrete_fields = {f.name for f in self.child.Meta.model._meta.concrete_fields}
 
         all_validated_data_by_id = {}
 
-        properties_to_update = set()
-
         for obj in all_validated_data:
             obj_id = self.child.id_value_lookup(obj)
             obj = self.child.remove_id_values(obj)
             if obj.keys():
                 all_validated_data_by_id[obj_id] = obj
-                properties_to_update.update(obj.keys())
+
+        all_keys = set(all_validated_data_by_id.keys())
+
+        # update what we can with set based updates first, falling back to updating the rest
+        # of the objects one by one
+        updated_objects, updated_keys = self._update_in_bulk(
+            queryset, all_validated_data_by_id
+        )
+
+        properties_to_update = set()
+        for obj in all_validated_data_by_id.values():
+            properties_to_update.update(obj.keys())
 
         properties_to_update = properties_to_update.intersection(concrete_fields)
 
         # this method is handed a queryset that has been pre-filtered
         # to the specific instance ids in question, by `create_from_updates` on the bulk update mixin
         objects_to_update = queryset.only(*properties_to_update)
+        if updated_keys:
+            objects_to_update = objects_to_update.exclude(
+                **{"{}__in".format(self.child.id_attr()): list(updated_keys)}
+            )
 
-        updated_objects = []
-
-        updated_keys = set()
+        individually_updated_objects = []
 
-        for obj in objects_to_update:
+        for obj in objects_to_update if all_validated_data_by_id else []:
             # Coerce to string as some ids are of the UUID class
             obj_id = self.child.id_value_lookup(obj)
             obj_validated_data = all_validated_data_by_id.get(obj_id)
@@ -311,22 +391,20 @@ class BulkListSerializer(SimpleReprMixin, ListSerializer):
                 # do not try to run further updates on the model, as there is no
                 # object to update.
                 if instance:
-                    updated_objects.append(instance)
+                    individually_updated_objects.append(instance)
                     updated_keys.add(obj_id)
                     # Collect any registered changes from this run of the loop
                     self.changes.extend(self.child.changes)
 
-        if len(all_validated_data_by_id) != len(updated_keys):
-            self.missing_keys = set(all_validated_data_by_id.keys()).difference(
-                updated_keys
-            )
+        if len(all_keys) != len(updated_keys):
+            self.missing_keys = all_keys.difference(updated_keys)
 
         if len(properties_to_update) > 0:
             self.child.Meta.model.objects.bulk_update(
-                updated_objects, list(properties_to_update)
+                individually_updated_objects, list(properties_to_update)
             )
 
-        return updated_objects
+        return updated_objects + individually_updated_objects
 
     def create(self, validated_data):
         ModelClass = self.child.Meta.model
@@ -970,10 +1048,16 @@ def create_change_tracker(pk, table, channel_id, user, task_name):
         task_id=task_id, channel_id=channel_id, user=user, signature=signature
     )
 
-    def update_progress(progress=None):
+    def update_progress(progress=None, stage_timings=None):
+        update_fields = []
         if progress:
             custom_task_metadata_object.progress = progress
-            custom_task_metadata_object.save()
+            update_fields.append("progress")
+        if stage_timings:
+            custom_task_metadata_object.stage_timings = stage_timings
+            update_fields.append("stage_timings")
+        if update_fields:
+            custom_task_metadata_object.save(update_fields=update_fields)
 
     Change.create_change(
         # These changes are purely for ephemeral progress updating, and do not constitute a publishable change.
@@ -994,6 +1078,12 @@ def create_change_tracker(pk, table, channel_id, user, task_name):
         task_object.save()
         raise
     finally:
+        if tracker.stage_timings:
+            logging.info(
+                "Stage timings for {} {}: {}".format(
+                    task_name, pk, dict(tracker.stage_timings)
+                )
+            )
         if task_object.status == states.STARTED:
             # No error reported, cleanup.
             # Mark as unpublishable, as this is a continuation of the progress updating, and not a publishable change.
@@ -1004,5 +1094,14 @@ def create_change_tracker(pk, table, channel_id, user, task_name):
                 applied=True,
                 unpublishable=True,
             )
-            task_object.delete()
-            custom_task_metadata_object.delete()
+            if tracker.stage_timings:
+                # Keep the finished task, so that its stage timings can be analysed until it is
+                # removed with other completed tasks by garbage collection. Clients are only sent
+                # started and failed tasks, so it is no longer shown to them.
+                custom_task_metadata_object.stage_timings = dict(tracker.stage_timings)
+                custom_task_metadata_object.save(update_fields=["stage_timings"])
+                task_object.status = states.SUCCESS
+                task_object.save()
+            else:
+                task_object.delete()
+                custom_task_metadata_object.delete()
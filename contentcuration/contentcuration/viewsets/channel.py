@@ -47,6 +47,7 @@ from contentcuration.models import File
 from contentcuration.models import generate_storage_url
 from contentcuration.models import SecretToken
 from contentcuration.models import User
+from contentcuration.tasks import getnodedetails_task
 from contentcuration.utils.garbage_collect import get_deleted_chefs_root
 from contentcuration.utils.pagination import CachedListPagination
 from contentcuration.utils.pagination import ValuesViewsetPageNumberPagination
@@ -576,6 +577,11 @@ class ChannelViewSet(ValuesViewset):
                     applied=True,
                     unpublishable=True,
                 )
+                # Refresh the details shown in look-inside previews of the newly published
+                # channel in the background, reusing any refresh already queued for it
+                getnodedetails_task.fetch_or_enqueue(
+                    self.request.user, node_id=channel.main_tree_id
+                )
             except ChannelIncompleteError:
                 Change.create_changes(
                     [
@@ -717,6 +723,7 @@ class ChannelViewSet(ValuesViewset):
                 files,
                 assessment_items,
                 progress_tracker=progress_tracker,
+                created_by_id=self.request.user.id,
             )
 
     def deploy_from_changes(self, changes):
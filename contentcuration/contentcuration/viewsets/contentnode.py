@@ -44,6 +44,7 @@ from contentcuration.constants import (
     completion_criteria as completion_criteria_validator,
 )
 from contentcuration.db.models.expressions import IsNull
+from contentcuration.db.models.expressions import json_object_update
 from contentcuration.db.models.query import RIGHT_JOIN
 from contentcuration.db.models.query import With
 from contentcuration.db.models.query import WithValues
@@ -57,6 +58,7 @@ from contentcuration.models import generate_storage_url
 from contentcuration.models import PrerequisiteContentRelationship
 from contentcuration.models import UUIDField
 from contentcuration.tasks import calculate_resource_size_task
+from contentcuration.utils.completeness import recalculate_completeness
 from contentcuration.utils.nodes import calculate_resource_size
 from contentcuration.utils.nodes import migrate_extra_fields
 from contentcuration.utils.nodes import validate_and_conform_to_schema_threshold_none
@@ -146,7 +148,6 @@ tags_values_cte_fields = {"tag": models.CharField(), "node_id": UUIDField()}
 
 def set_tags(tags_by_id):
     tag_tuples = []
-    tags_relations_to_delete = []
 
     # put all tags into a tuple (tag_name, node_id) to send into SQL
     for target_node_id, tag_names in tags_by_id.items():
@@ -189,10 +190,12 @@ def set_tags(tags_by_id):
             tag_id=tags_cte.col.tag_id,
             has_relation=IsNull("contentnode_id", negate=True),
         )
-        .values("tag_name", "node_id", "tag_id", "has_relation")
+        .values("tag_name", "node_id", "tag_id", "has_relation", "id")
     )
 
-    created_tags = {}
+    tags_to_create = {}
+    relations_to_create = []
+    relation_ids_to_delete = []
     for result in qs:
         tag_name = result["tag_name"]
         node_id = result["node_id"]
@@ -204,32 +207,28 @@ def set_tags(tags_by_id):
 
         # tag wasn't found in the DB, but we're adding it to the node, so create it
         if not tag_id and value:
-            # keep a cache of created tags during the session
-            if tag_name in created_tags:
-                tag_id = created_tags[tag_name]
-            else:
-                tag, _ = ContentTag.objects.get_or_create(
+            if tag_name not in tags_to_create:
+                tags_to_create[tag_name] = ContentTag(
                     tag_name=tag_name, channel_id=None
                 )
-                tag_id = tag.pk
-                created_tags.update({tag_name: tag_id})
+            tag_id = tags_to_create[tag_name].pk
 
         # if we're adding the tag but the relation didn't exist, create it now, otherwise
         # track the tag as one relation we should delete
         if value and not has_relation:
-            ContentNode.tags.through.objects.get_or_create(
-                contentnode_id=node_id, contenttag_id=tag_id
+            relations_to_create.append(
+                ContentNode.tags.through(contentnode_id=node_id, contenttag_id=tag_id)
             )
         elif not value and has_relation:
-            tags_relations_to_delete.append(
-                Q(contentnode_id=node_id, contenttag_id=tag_id)
-            )
+            relation_ids_to_delete.append(result["id"])
 
-    # delete tags
-    if tags_relations_to_delete:
-        ContentNode.tags.through.objects.filter(
-            reduce(lambda x, y: x | y, tags_relations_to_delete)
-        ).delete()
+    # the ids of the tags are generated before they're inserted, so the relations can use them,
+    # and none of these make a query if there is nothing to insert or delete
+    ContentTag.objects.bulk_create(tags_to_create.values())
+    ContentNode.tags.through.objects.bulk_create(
+        relations_to_create, ignore_conflicts=True
+    )
+    ContentNode.tags.through.objects.filter(id__in=relation_ids_to_delete).delete()
 
 
 class ContentNodeListSerializer(BulkListSerializer):
@@ -256,8 +255,46 @@ class ContentNodeListSerializer(BulkListSerializer):
         )
         if tags:
             set_tags(tags)
+        self._ensure_complete(all_objects)
         return all_objects
 
+    def _ensure_complete(self, objects):
+        """
+        Batched equivalent of ContentNodeSerializer._ensure_complete, run once all
+        updates have been saved, so that completeness is checked in a constant number of queries.
+        """
+        complete_ids = ContentNode.objects.filter(
+            id__in=[obj.id for obj in objects], complete=True
+        ).values_list("id", flat=True)
+        _, incomplete_ids = recalculate_completeness(complete_ids, only_incomplete=True)
+        if not incomplete_ids:
+            return
+        channel_ids = dict(
+            ContentNode._annotate_channel_id(
+                ContentNode.objects.filter(id__in=incomplete_ids)
+            ).values_list("id", "channel_id")
+        )
+        user_id = None
+        if "request" in self.context:
+            user_id = self.context["request"].user.id
+        Change.create_changes(
+            [
+                generate_update_event(
+                    node_id,
+                    CONTENTNODE,
+                    {"complete": False},
+                    channel_id=channel_ids[node_id],
+                )
+                for node_id in incomplete_ids
+            ],
+            created_by_id=user_id,
+            applied=True,
+        )
+        incomplete_ids = set(incomplete_ids)
+        for obj in objects:
+            if obj.id in incomplete_ids:
+                obj.complete = False
+
 
 class ThresholdField(Field):
     def to_representation(self, value):
@@ -483,7 +520,10 @@ class ContentNodeSerializer(BulkModelSerializer):
         """
         If an instance is marked as complete, ensure that it is actually complete.
         If it is not, update the value, save, and issue a change event.
+        When updating in bulk, this is deferred to the list serializer.
         """
+        if isinstance(self.parent, ContentNodeListSerializer):
+            return
         if instance.complete:
             instance.mark_complete()
             if not instance.complete:
@@ -544,6 +584,27 @@ class ContentNodeSerializer(BulkModelSerializer):
         self._ensure_complete(instance)
         return instance
 
+    def get_bulk_update_values(self, validated_data):
+        # Completion criteria are checked against each node's kind and extra_fields, and tags
+        # are set separately, so only the remaining fields can be updated across many nodes at once
+        if any(
+            field in validated_data
+            for field in ("extra_fields", "complete", "kind", "tags")
+        ):
+            return None
+        values = {}
+        for field, value in validated_data.items():
+            if field not in self.dict_fields:
+                values[field] = value
+            elif value is not None:
+                # Mirrors JSONFieldDictSerializer.update, None values delete the key
+                values[field] = json_object_update(
+                    field,
+                    {k: v for k, v in value.items() if v is not None},
+                    [k for k, v in value.items() if v is None],
+                )
+        return values
+
 
 def retrieve_thumbail_src(item):
     """Get either the encoding or the url to use as the <img> src attribute"""
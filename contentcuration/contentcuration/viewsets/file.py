@@ -19,6 +19,7 @@ from contentcuration.models import generate_storage_url
 from contentcuration.utils.cache import ResourceSizeCache
 from contentcuration.utils.sentry import report_exception
 from contentcuration.utils.storage_common import get_presigned_upload_url
+from contentcuration.utils.storage_common import get_presigned_upload_urls
 from contentcuration.utils.user import calculate_user_storage
 from contentcuration.viewsets.base import BulkDeleteMixin
 from contentcuration.viewsets.base import BulkListSerializer
@@ -34,6 +35,9 @@ from contentcuration.viewsets.sync.utils import generate_update_event
 
 PRESET_LOOKUP = {p.id: p for p in format_presets.PRESETLIST}
 
+# the maximum number of files that upload URLs can be requested for at once
+MAX_UPLOAD_URLS = 1000
+
 
 class StrictFloatField(serializers.FloatField):
     def to_internal_value(self, data):
@@ -162,6 +166,10 @@ class FileSerializer(BulkModelSerializer):
         list_serializer_class = BulkListSerializer
 
 
+def _checksum_base64(checksum):
+    return codecs.encode(codecs.decode(checksum, "hex"), "base64").decode()
+
+
 def retrieve_storage_url(item):
     """Get the file_on_disk url"""
     return generate_storage_url("{}.{}".format(item["checksum"], item["file_format"]))
@@ -249,11 +257,8 @@ class FileViewSet(BulkDeleteMixin, UpdateModelMixin, ReadOnlyValuesViewset):
         filepath = generate_object_storage_name(
             checksum, filename, default_ext=file_format
         )
-        checksum_base64 = codecs.encode(
-            codecs.decode(checksum, "hex"), "base64"
-        ).decode()
         retval = get_presigned_upload_url(
-            filepath, checksum_base64, 600, content_length=size
+            filepath, _checksum_base64(checksum), 600, content_length=size
         )
 
         file = File(
@@ -275,3 +280,86 @@ class FileViewSet(BulkDeleteMixin, UpdateModelMixin, ReadOnlyValuesViewset):
         )
 
         return Response(retval)
+
+    @action(detail=False, methods=["post"])
+    def upload_urls(self, request):
+        """
+        The batch version of `upload_url`, which takes a list of files and returns a list of
+        the same responses, in the same order, checking the space for all the files at once.
+        """
+        serializer = FileUploadURLSerializer(
+            data=request.data, many=True, max_length=MAX_UPLOAD_URLS
+        )
+        serializer.is_valid(raise_exception=True)
+
+        files_data = serializer.validated_data
+        if not files_data:
+            return Response([])
+
+        sizes = {}
+        for file_data in files_data:
+            sizes[file_data["checksum"]] = float(file_data["size"])
+        try:
+            request.user.check_files_space(sizes)
+        except PermissionDenied:
+            return HttpResponseBadRequest(
+                reason="Not enough space. Check your storage under Settings page.",
+                status=412,
+            )
+
+        existing_checksums = set(
+            File.objects.filter(checksum__in=list(sizes.keys()))
+            .values_list("checksum", flat=True)
+            .distinct()
+        )
+
+        filepaths = [
+            generate_object_storage_name(
+                file_data["checksum"],
+                file_data["name"],
+                default_ext=file_data["file_format"],
+            )
+            for file_data in files_data
+        ]
+        retvals = get_presigned_upload_urls(
+            [
+                (filepath, _checksum_base64(file_data["checksum"]))
+                for filepath, file_data in zip(filepaths, files_data)
+            ],
+            600,
+        )
+
+        files = [
+            File(
+                file_size=file_data["size"],
+                checksum=file_data["checksum"],
+                original_filename=file_data["name"],
+                file_on_disk=filepath,
+                file_format_id=file_data["file_format"],
+                preset_id=file_data["preset"],
+                uploaded_by=request.user,
+                duration=file_data.get("duration"),
+            )
+            for filepath, file_data in zip(filepaths, files_data)
+        ]
+        # bulk_create inserts all the files in a single transaction
+        File.objects.bulk_create(files)
+        calculate_user_storage(request.user.id)
+
+        serialized_files = {
+            file["id"]: file
+            for file in self.serialize(
+                self.filter_queryset(
+                    self.get_queryset().filter(id__in=[file.id for file in files])
+                )
+            )
+        }
+        for retval, file in zip(retvals, files):
+            retval.update(
+                {
+                    "might_skip": file.checksum in existing_checksums,
+                    "file": serialized_files[file.id],
+                }
+            )
+
+        return Response(retvals)
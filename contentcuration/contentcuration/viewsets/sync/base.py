@@ -3,6 +3,7 @@ from collections import OrderedDict
 from search.viewsets.savedsearch import SavedSearchViewSet
 
 from contentcuration.decorators import delay_user_storage_calculation
+from contentcuration.utils.cache import bump_details_revision
 from contentcuration.viewsets.assessmentitem import AssessmentItemViewSet
 from contentcuration.viewsets.bookmark import BookmarkViewSet
 from contentcuration.viewsets.channel import ChannelViewSet
@@ -104,6 +105,7 @@ event_handlers = {
 @delay_user_storage_calculation
 def apply_changes(changes_queryset):
     changes = changes_queryset.order_by("server_rev").select_related("created_by")
+    changed_channel_ids = set()
     for change in changes:
         # Assume an error, this will be updated
         # in the case there isn't!
@@ -126,6 +128,12 @@ def apply_changes(changes_queryset):
                 else:
                     change.applied = True
                     changed_fields = ("applied",)
+                    # Publishing doesn't change the content of a channel, so its details stay the same
+                    if change.channel_id and change_type not in (
+                        PUBLISHED,
+                        PUBLISHED_NEXT,
+                    ):
+                        changed_channel_ids.add(change.channel_id)
         except Exception as e:
             log_sync_exception(
                 e, user=change.created_by, change=change.serialize_to_change_dict()
@@ -133,3 +141,5 @@ def apply_changes(changes_queryset):
             change.errored = True
             change.kwargs["errors"] = [str(e)]
         change.save(update_fields=changed_fields)
+    for channel_id in changed_channel_ids:
+        bump_details_revision(channel_id)
@@ -14,7 +14,6 @@ from django.contrib.postgres.aggregates import BitOr
 from django.core.cache import cache
 from django.db.models import Case
 from django.db.models import F
-from django.db.models import Max
 from django.db.models import Value
 from django.db.models import When
 from le_utils.constants.labels.accessibility_categories import (
@@ -87,43 +86,108 @@ def _get_available_channels(base_queryset):
 # Remove the SQLite Bitwise OR definition as not needed.
 
 
+def _get_label_bitmasks(base_queryset):
+    aggregates = {}
+    for field in bitmask_fieldnames:
+        field_agg = field + "_agg"
+        aggregates[field_agg] = BitOr(field)
+    agg = base_queryset.order_by().aggregate(**aggregates)
+    return {field: agg[field + "_agg"] or 0 for field in bitmask_fieldnames}
+
+
+def _get_labels_from_bitmasks(bitmasks):
+    output = {}
+    for field, values in bitmask_fieldnames.items():
+        bit_value = bitmasks[field]
+        for value in values:
+            if value["field_name"] not in output:
+                output[value["field_name"]] = []
+            if bit_value & value["bits"]:
+                output[value["field_name"]].append(value["label"])
+    return output
+
+
 def get_available_metadata_labels(base_queryset):
-    # Updated to use the kolibri_public ChannelMetadata model
-    from kolibri_public.models import ChannelMetadata
+    # Use the version of the public channels rather than aggregating their last_updated
+    # values, so that the cache can be checked without querying the database.
+    from kolibri_public.utils.cache import get_all_channels_version
 
-    content_cache_key = str(
-        ChannelMetadata.objects.all().aggregate(updated=Max("last_updated"))["updated"]
-    )
     cache_key = "search-labels:{}:{}".format(
-        content_cache_key,
+        get_all_channels_version(),
         hashlib.md5(str(base_queryset.query).encode("utf8")).hexdigest(),
     )
     if cache_key not in cache:
         base_queryset = base_queryset.order_by()
-        aggregates = {}
-        for field in bitmask_fieldnames:
-            field_agg = field + "_agg"
-            aggregates[field_agg] = BitOr(field)
-        output = {}
-        agg = base_queryset.aggregate(**aggregates)
-        for field, values in bitmask_fieldnames.items():
-            bit_value = agg[field + "_agg"]
-            for value in values:
-                if value["field_name"] not in output:
-                    output[value["field_name"]] = []
-                if bit_value is not None and bit_value & value["bits"]:
-                    output[value["field_name"]].append(value["label"])
+        output = _get_labels_from_bitmasks(_get_label_bitmasks(base_queryset))
         output["languages"] = _get_available_languages(base_queryset)
         output["channels"] = _get_available_channels(base_queryset)
         cache.set(cache_key, output, timeout=None)
     return cache.get(cache_key)
 
 
-def get_all_contentnode_label_metadata():
+CHANNEL_LABELS_CACHE_KEY = "search-labels:channel:{}"
+
+
+def _get_channel_label_summary(channel_id):
     # Updated to use the kolibri_public ContentNode model
     from kolibri_public.models import ContentNode
 
-    return get_available_metadata_labels(ContentNode.objects.filter(available=True))
+    base_queryset = ContentNode.objects.filter(
+        channel_id=channel_id, available=True
+    ).order_by()
+    return {
+        "bitmasks": _get_label_bitmasks(base_queryset),
+        "languages": _get_available_languages(base_queryset),
+        "channels": _get_available_channels(base_queryset),
+    }
+
+
+def cache_channel_metadata_labels(channel_id):
+    """
+    Precompute the summary of the labels, languages and channel of the available content
+    in a channel, from which the labels for any set of channels can be composed.
+    """
+    summary = _get_channel_label_summary(channel_id)
+    cache.set(CHANNEL_LABELS_CACHE_KEY.format(channel_id), summary, timeout=None)
+    return summary
+
+
+def get_channels_metadata_labels(channel_ids):
+    """
+    Return the same labels as get_available_metadata_labels for all the available content
+    in the specified channels, by combining the precomputed summaries of each channel.
+    """
+    keys = {
+        channel_id: CHANNEL_LABELS_CACHE_KEY.format(channel_id)
+        for channel_id in channel_ids
+    }
+    cached = cache.get_many(keys.values())
+    bitmasks = {field: 0 for field in bitmask_fieldnames}
+    languages = {}
+    channels = {}
+    for channel_id, key in keys.items():
+        summary = cached.get(key)
+        if summary is None:
+            summary = cache_channel_metadata_labels(channel_id)
+        for field, bit_value in summary["bitmasks"].items():
+            bitmasks[field] |= bit_value
+        for lang in summary["languages"]:
+            languages[lang["id"]] = lang
+        for channel in summary["channels"]:
+            channels[channel["id"]] = channel
+    output = _get_labels_from_bitmasks(bitmasks)
+    output["languages"] = list(languages.values())
+    output["channels"] = list(channels.values())
+    return output
+
+
+def get_all_contentnode_label_metadata():
+    # Updated to use the kolibri_public ChannelMetadata model
+    from kolibri_public.models import ChannelMetadata
+
+    return get_channels_metadata_labels(
+        ChannelMetadata.objects.values_list("id", flat=True)
+    )
 
 
 def annotate_label_bitmasks(queryset):
@@ -7,11 +7,16 @@ from calendar import timegm
 
 from django.core.cache import cache
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.http import http_date
 from kolibri_public import models
+from kolibri_public.search import annotate_label_bitmasks
+from kolibri_public.search import get_available_metadata_labels
 from kolibri_public.tests.base import ChannelBuilder
 from kolibri_public.tests.base import OKAY_TAG
+from kolibri_public.utils.cache import invalidate_channel
 from le_utils.constants import content_kinds
 from rest_framework.test import APITestCase
 
@@ -203,6 +208,31 @@ class ContentNodeAPIBase(object):
                 node_languages.filter(native_name=lang["lang_name"]).exists()
             )
 
+    def _assert_labels_match(self, data, queryset):
+        annotate_label_bitmasks(models.ContentNode.objects.all())
+        response = self._get(reverse("publiccontentnode-list"), data=data)
+        labels = response.data["labels"]
+        expected = get_available_metadata_labels(queryset)
+        for key in ("languages", "channels"):
+            self.assertEqual(
+                sorted(labels.pop(key), key=lambda x: x["id"]),
+                sorted(expected.pop(key), key=lambda x: x["id"]),
+            )
+        self.assertEqual(labels, expected)
+
+    def test_contentnode_list_labels_channels(self):
+        channel_id = models.ChannelMetadata.objects.get().id
+        self._assert_labels_match(
+            {"max_results": 1, "channels": channel_id},
+            models.ContentNode.objects.filter(available=True, channel_id=channel_id),
+        )
+
+    def test_contentnode_list_labels_filtered(self):
+        self._assert_labels_match(
+            {"max_results": 1, "kind": content_kinds.VIDEO},
+            models.ContentNode.objects.filter(available=True, kind=content_kinds.VIDEO),
+        )
+
     def test_contentnode_list_headers(self):
         channel = models.ChannelMetadata.objects.get()
         channel.last_updated = datetime.datetime.now()
@@ -210,6 +240,26 @@ class ContentNodeAPIBase(object):
         response = self._get(reverse("publiccontentnode-list"))
         self._assert_headers(response, channel.last_updated)
 
+    def test_contentnode_list_cached(self):
+        channel = models.ChannelMetadata.objects.get()
+        channel.last_updated = datetime.datetime.now()
+        channel.save()
+        response = self._get(reverse("publiccontentnode-list"))
+        with CaptureQueriesContext(connection) as queries:
+            cached_response = self._get(reverse("publiccontentnode-list"))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached_response.content, response.content)
+        self._assert_headers(cached_response, channel.last_updated)
+
+    def test_contentnode_list_cache_invalidated(self):
+        channel = models.ChannelMetadata.objects.get()
+        response = self._get(reverse("publiccontentnode-list"))
+        total = len(response.data)
+        models.ContentNode.objects.filter(id=self.has_prereq.id).update(available=False)
+        invalidate_channel(channel.id)
+        response = self._get(reverse("publiccontentnode-list"))
+        self.assertEqual(len(response.data), total - 1)
+
     def _recurse_and_assert(self, data, nodes, recursion_depth=0):
         recursion_depths = []
         for actual, expected in zip(data, nodes):
@@ -326,6 +376,45 @@ class ContentNodeAPIBase(object):
         # Should recurse an extra level to find multiple descendants under the first child.
         self.assertEqual(max_depth, 3)
 
+    def _count_tree_queries(self, levels):
+        builder = ChannelBuilder(levels=levels, num_children=1)
+        builder.insert_into_default_db()
+        models.ContentNode.objects.all().update(available=True)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self._get(
+                reverse(
+                    "publiccontentnode_tree-detail",
+                    kwargs={"pk": builder.root_node["id"]},
+                )
+            )
+        return len(queries)
+
+    def test_contentnode_tree_singleton_path_queries(self):
+        self.assertEqual(self._count_tree_queries(2), self._count_tree_queries(6))
+
+    def test_contentnode_tree_next_page(self):
+        builder = ChannelBuilder(levels=2, num_children=15)
+        builder.insert_into_default_db()
+        models.ContentNode.objects.all().update(available=True)
+        root = models.ContentNode.objects.get(id=builder.root_node["id"])
+        response = self._get(
+            reverse("publiccontentnode_tree-detail", kwargs={"pk": root.id})
+        )
+        more = response.data["children"]["more"]
+        response = self._get(
+            reverse("publiccontentnode_tree-detail", kwargs={"pk": more["id"]}),
+            data=more["params"],
+        )
+        self.assertEqual(
+            [child["id"] for child in response.data["children"]["results"]],
+            list(
+                root.get_children()
+                .filter(lft__gt=more["params"]["next__gt"])
+                .values_list("id", flat=True)
+            ),
+        )
+
 
 class ContentNodeAPITestCase(ContentNodeAPIBase, APITestCase):
     """
@@ -1,6 +1,7 @@
 import datetime
 from calendar import timegm
 
+from django.core.cache import cache
 from django.db import connection
 from django.db.models import Q
 from django.urls import reverse
@@ -39,6 +40,10 @@ class ImportMetadataTestCase(APITestCase):
             id__in=cls.through_tags.values_list("contenttag_id", flat=True)
         ).distinct()
 
+    def tearDown(self):
+        cache.clear()
+        super(ImportMetadataTestCase, self).tearDown()
+
     def _assert_data(self, Model, ContentModel, queryset):
         response = self.client.get(
             reverse("publicimportmetadata-detail", kwargs={"pk": self.node.id})
@@ -0,0 +1,124 @@
+"""
+Server side caching for the public content API. The data it serves only changes when a channel is
+mapped into the kolibri_public tables by the ChannelMapper, so rendered responses are cached against
+version tokens that the ChannelMapper replaces once a remap has been committed.
+"""
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from kolibri_public import models
+
+
+LAST_UPDATED_CACHE_KEY = "kolibri_public:last_updated"
+_MISSING = object()
+
+# Responses filtered to a single channel are versioned by that channel,
+# all other responses by a version that changes whenever any channel is remapped
+VERSION_CACHE_KEY = "kolibri_public:version:{}"
+ALL_CHANNELS = "all"
+
+RESPONSE_CACHE_KEY = "kolibri_public:response:{version}:{request_hash}"
+
+# Outdated responses are never served, as their keys have an old version,
+# so the timeout only bounds how long they take up space in the cache
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_last_updated():
+    """
+    :return: The most recent last_updated of all the public channels
+    """
+    # None is a valid value when no channel has a last_updated, so use a sentinel for cache misses
+    last_updated = cache.get(LAST_UPDATED_CACHE_KEY, _MISSING)
+    if last_updated is _MISSING:
+        last_updated = models.ChannelMetadata.objects.all().aggregate(
+            updated=Max("last_updated")
+        )["updated"]
+        cache.set(LAST_UPDATED_CACHE_KEY, last_updated, None)
+    return last_updated
+
+
+def _get_version(scope):
+    key = VERSION_CACHE_KEY.format(scope)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        # Another request may have set the version in the meantime, in which case use theirs
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_all_channels_version():
+    """
+    :return: A token that changes whenever any public channel is remapped
+    """
+    return _get_version(ALL_CHANNELS)
+
+
+def invalidate_channel(channel_id):
+    """
+    Invalidates the cached responses that could include data from the channel
+    """
+    cache.delete_many(
+        [
+            LAST_UPDATED_CACHE_KEY,
+            VERSION_CACHE_KEY.format(channel_id),
+            VERSION_CACHE_KEY.format(ALL_CHANNELS),
+        ]
+    )
+
+
+def _get_response_cache_key(request):
+    channel_id = request.GET.get("channel_id")
+    try:
+        scope = uuid.UUID(channel_id).hex if channel_id else ALL_CHANNELS
+    except ValueError:
+        scope = ALL_CHANNELS
+    request_hash = hashlib.md5(
+        json.dumps(
+            [
+                request.path,
+                sorted(request.GET.lists()),
+                request.META.get("HTTP_ACCEPT"),
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+    return RESPONSE_CACHE_KEY.format(
+        version=_get_version(scope), request_hash=request_hash
+    )
+
+
+def cached_response(view_func):
+    """
+    Decorator for view functions, that serves a previously rendered response for the same path,
+    query parameters and Accept header, and caches successful GET responses once rendered
+    """
+
+    def wrapper_func(request, *args, **kwargs):
+        if request.method != "GET":
+            return view_func(request, *args, **kwargs)
+
+        key = _get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers:
+                response[header] = value
+            return response
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            if hasattr(response, "render"):
+                response.render()
+            cache.set(
+                key, (response.content, list(response.items())), RESPONSE_CACHE_TIMEOUT
+            )
+        return response
+
+    return wrapper_func
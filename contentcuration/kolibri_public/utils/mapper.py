@@ -4,7 +4,9 @@ from kolibri_content import models as kolibri_content_models
 from kolibri_content.base_models import MAX_TAG_LENGTH
 from kolibri_public import models as kolibri_public_models
 from kolibri_public.search import annotate_label_bitmasks
+from kolibri_public.search import cache_channel_metadata_labels
 from kolibri_public.utils.annotation import set_channel_metadata_fields
+from kolibri_public.utils.cache import invalidate_channel
 from le_utils.constants import content_kinds
 
 
@@ -58,6 +60,12 @@ class ChannelMapper(object):
             # Rather than set the ancestors fields after mapping, like it is done in Kolibri
             # here we set it during mapping as we are already recursing through the tree.
             set_channel_metadata_fields(self.mapped_channel.id, public=self.public)
+            # Only update the cached public API data once the new tree is visible
+            transaction.on_commit(self._on_commit)
+
+    def _on_commit(self):
+        invalidate_channel(self.mapped_channel.id)
+        cache_channel_metadata_labels(self.mapped_channel.id)
 
     def _map_model(self, source, Model):
         properties = {}
@@ -13,17 +13,28 @@ from functools import reduce
 from uuid import UUID
 
 from django.core.exceptions import ValidationError
+from django.db.models import BigIntegerField
+from django.db.models import Case
+from django.db.models import Count
 from django.db.models import Exists
+from django.db.models import ExpressionWrapper
 from django.db.models import F
-from django.db.models import Max
+from django.db.models import IntegerField
 from django.db.models import OuterRef
 from django.db.models import Q
+from django.db.models import Value
+from django.db.models import When
+from django.db.models import Window
+from django.db.models.functions import Cast
+from django.db.models.functions import RowNumber
 from django.http import Http404
 from django.utils.cache import patch_cache_control
 from django.utils.cache import patch_response_headers
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import last_modified
+from django_cte import CTEQuerySet
+from django_cte import With
 from django_filters.rest_framework import BaseInFilter
 from django_filters.rest_framework import BooleanFilter
 from django_filters.rest_framework import CharFilter
@@ -33,8 +44,12 @@ from django_filters.rest_framework import FilterSet
 from django_filters.rest_framework import NumberFilter
 from django_filters.rest_framework import UUIDFilter
 from kolibri_public import models
+from kolibri_public.search import get_all_contentnode_label_metadata
 from kolibri_public.search import get_available_metadata_labels
+from kolibri_public.search import get_channels_metadata_labels
 from kolibri_public.stopwords import stopwords_set
+from kolibri_public.utils.cache import cached_response
+from kolibri_public.utils.cache import get_last_updated
 from le_utils.constants import content_kinds
 from rest_framework import status
 from rest_framework.permissions import AllowAny
@@ -51,9 +66,7 @@ logger = logging.getLogger(__name__)
 
 
 def get_last_modified(*args, **kwargs):
-    return models.ChannelMetadata.objects.all().aggregate(updated=Max("last_updated"))[
-        "updated"
-    ]
+    return get_last_updated()
 
 
 def metadata_cache(some_func):
@@ -63,9 +76,11 @@ def metadata_cache(some_func):
     # 5 minutes
     cache_timeout = 300
 
+    cached_func = cached_response(some_func)
+
     @last_modified(get_last_modified)
     def wrapper_func(*args, **kwargs):
-        response = some_func(*args, **kwargs)
+        response = cached_func(*args, **kwargs)
         patch_response_headers(response, cache_timeout=cache_timeout)
         # The above function does call patch_cache_control within it
         # but it is intelligent enough to combine successive invocations.
@@ -523,17 +538,34 @@ class OptionalContentNodePagination(ValuesViewsetCursorPagination):
     def paginate_queryset(self, queryset, request, view=None):
         # Record the queryset for use in returning available filters
         self.queryset = queryset
+        self.filters = set(request.query_params) & set(ContentNodeFilter.base_filters)
+        self.channels = request.query_params.get("channels")
         return super(OptionalContentNodePagination, self).paginate_queryset(
             queryset, request, view=view
         )
 
+    def get_labels(self):
+        # When the content is filtered by nothing other than its channel, the labels
+        # can be composed from those precomputed for each channel.
+        if not self.filters:
+            return get_all_contentnode_label_metadata()
+        if self.filters == {"channels"}:
+            channel_ids = [
+                UUID(channel_id).hex
+                for channel_id in self.channels.split(",")
+                if channel_id
+            ]
+            if channel_ids:
+                return get_channels_metadata_labels(channel_ids)
+        return get_available_metadata_labels(self.queryset)
+
     def get_paginated_response(self, data):
         return Response(
             OrderedDict(
                 [
                     ("more", self.get_more()),
                     ("results", data),
-                    ("labels", get_available_metadata_labels(self.queryset)),
+                    ("labels", self.get_labels()),
                 ]
             )
         )
@@ -575,6 +607,13 @@ class ContentNodeViewset(BaseContentNodeMixin, ReadOnlyValuesViewset):
 NUM_CHILDREN = 12
 NUM_GRANDCHILDREN_PER_CHILD = 12
 
+# The stages of the tree query, for the parent node (and any singleton children
+# collapsed into it), its children, and its grandchildren (and any descendants of
+# singleton grandchildren).
+TREE_PARENT = 0
+TREE_CHILD = 1
+TREE_GRANDCHILD = 2
+
 
 class TreeQueryMixin(object):
     def validate_and_return_params(self, request):
@@ -600,50 +639,86 @@ class TreeQueryMixin(object):
 
         return depth, next__gt
 
-    def _get_gc_by_parent(self, child_ids):
-        # Use this to keep track of how many grand children we have accumulated per child of the parent node
-        gc_by_parent = {}
-        # Iterate through the grand children of the parent node in lft order so we follow the tree traversal order
-        for gc in (
-            self.filter_queryset(self.get_queryset())
-            .filter(parent_id__in=child_ids)
-            .values("id", "parent_id")
-            .order_by("lft")
-        ):
-            # If we have not already added a list of nodes to the gc_by_parent map, initialize it here
-            if gc["parent_id"] not in gc_by_parent:
-                gc_by_parent[gc["parent_id"]] = []
-            gc_by_parent[gc["parent_id"]].append(gc["id"])
-        return gc_by_parent
-
-    def get_grandchild_ids(self, child_ids, depth, page_size):
-        grandchild_ids = []
+    def _make_tree_cte(self, parent_id, depth, next__gt):
+        # Singleton children are only collapsed into their parent when we are not paginating
+        collapse_singletons = next__gt is None
+        queryset = self.get_queryset().order_by()
+        if next__gt is not None:
+            # Any descendants of children before the pagination cursor also have a lft value below it
+            queryset = queryset.filter(lft__gt=next__gt)
+        matched = Exists(
+            self.filter_queryset(self.get_queryset()).filter(id=OuterRef("id"))
+        )
+
+        # Children of a node are expanded if it is the parent node, a singleton child that
+        # is being collapsed into the parent, a child within the page size when we are returning
+        # grandchildren, or a singleton grandchild.
+        expand = Q(parent_stage=TREE_PARENT) | Q(
+            parent_stage=TREE_GRANDCHILD, parent_siblings=1
+        )
+        # Children are counted regardless of the filters, but grandchildren are not
+        unfiltered = Q(parent_stage=TREE_PARENT)
+        if collapse_singletons:
+            expand |= Q(parent_stage=TREE_CHILD, parent_siblings=1)
+            unfiltered |= Q(parent_stage=TREE_CHILD, parent_siblings=1)
         if depth == 2:
-            # Use this to keep track of how many grand children we have accumulated per child of the parent node
-            gc_by_parent = self._get_gc_by_parent(child_ids)
-            singletons = []
-            # Now loop through each of the child_ids we passed in
-            # that have any children, check if any of them have only one
-            # child, and also add up to the page size to the list of
-            # grandchild_ids.
-            for child_id in gc_by_parent:
-                gc_ids = gc_by_parent[child_id]
-                if len(gc_ids) == 1:
-                    singletons.append(gc_ids[0])
-                # Only add up to the page size to the list
-                grandchild_ids.extend(gc_ids[:page_size])
-            if singletons:
-                grandchild_ids.extend(
-                    self.get_grandchild_ids(singletons, depth, page_size)
+            expand |= Q(parent_stage=TREE_CHILD, parent_rank__lte=NUM_CHILDREN)
+
+        def make_cte(cte):
+            stage_whens = [When(parent_stage=TREE_PARENT, then=Value(TREE_CHILD))]
+            if collapse_singletons:
+                stage_whens.append(
+                    When(
+                        parent_stage=TREE_CHILD,
+                        parent_siblings=1,
+                        then=Value(TREE_CHILD),
+                    )
                 )
-        return grandchild_ids
+            return (
+                CTEQuerySet(model=models.ContentNode)
+                .filter(id=parent_id)
+                .values(
+                    "id",
+                    rank=Cast(Value(1), BigIntegerField()),
+                    siblings=Cast(Value(1), BigIntegerField()),
+                    stage=Value(TREE_PARENT, output_field=IntegerField()),
+                )
+                .union(
+                    cte.join(queryset, parent_id=cte.col.id)
+                    .annotate(
+                        # The columns of the recursive reference have no output field to filter on yet
+                        parent_stage=ExpressionWrapper(
+                            cte.col.stage, output_field=IntegerField()
+                        ),
+                        parent_rank=ExpressionWrapper(
+                            cte.col.rank, output_field=BigIntegerField()
+                        ),
+                        parent_siblings=ExpressionWrapper(
+                            cte.col.siblings, output_field=BigIntegerField()
+                        ),
+                        matched=matched,
+                    )
+                    .filter(expand)
+                    .filter(unfiltered | Q(matched=True))
+                    .values(
+                        "id",
+                        rank=Window(
+                            RowNumber(),
+                            partition_by=[F("parent_id")],
+                            order_by=F("lft").asc(),
+                        ),
+                        siblings=Window(Count("id"), partition_by=[F("parent_id")]),
+                        stage=Case(
+                            *stage_whens,
+                            default=Value(TREE_GRANDCHILD),
+                            output_field=IntegerField()
+                        ),
+                    ),
+                    all=True,
+                )
+            )
 
-    def get_child_ids(self, parent_id, next__gt):
-        # Get a list of child_ids of the parent node up to the pagination limit
-        child_qs = self.get_queryset().filter(parent_id=parent_id)
-        if next__gt is not None:
-            child_qs = child_qs.filter(lft__gt=next__gt)
-        return child_qs.values_list("id", flat=True).order_by("lft")[0:NUM_CHILDREN]
+        return With.recursive(make_cte, name="tree")
 
     def get_tree_queryset(self, request, pk):
         # Get the model for the parent node here - we do this so that we trigger a 404 immediately if the node
@@ -658,22 +733,21 @@ class TreeQueryMixin(object):
             raise Http404
         depth, next__gt = self.validate_and_return_params(request)
 
-        child_ids = self.get_child_ids(parent_id, next__gt)
-
-        ancestor_ids = []
-
-        while next__gt is None and len(child_ids) == 1:
-            ancestor_ids.extend(child_ids)
-            child_ids = self.get_child_ids(child_ids[0], next__gt)
-
-        # Get a flat list of ids for grandchildren we will be returning
-        gc_ids = self.get_grandchild_ids(child_ids, depth, NUM_GRANDCHILDREN_PER_CHILD)
-        return self.filter_queryset(self.get_queryset()).filter(
-            Q(id=parent_id)
-            | Q(id__in=ancestor_ids)
-            | Q(id__in=child_ids)
-            | Q(id__in=gc_ids)
+        # Walk down the tree from the parent node in a single recursive query, ranking the nodes
+        # at each level by their lft value, rather than querying each level of the tree separately.
+        tree_cte = self._make_tree_cte(parent_id, depth, next__gt)
+        tree_ids = (
+            tree_cte.join(CTEQuerySet(model=models.ContentNode), id=tree_cte.col.id)
+            .with_cte(tree_cte)
+            .annotate(stage=tree_cte.col.stage, rank=tree_cte.col.rank)
+            .filter(
+                Q(stage=TREE_PARENT)
+                | Q(stage=TREE_CHILD, rank__lte=NUM_CHILDREN)
+                | Q(stage=TREE_GRANDCHILD, rank__lte=NUM_GRANDCHILDREN_PER_CHILD)
+            )
+            .values("id")
         )
+        return self.filter_queryset(self.get_queryset()).filter(id__in=tree_ids)
 
 
 @method_decorator(metadata_cache, name="dispatch")